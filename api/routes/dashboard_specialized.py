@@ -2,11 +2,12 @@
 API Especializada para Dashboard CleanSky
 Endpoint único que carga todos los datos necesarios para el dashboard
 """
-from fastapi import APIRouter, Query, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Query, HTTPException, BackgroundTasks, Request, Response
 from pathlib import Path as PathLib
 import pandas as pd
 import numpy as np
 import json
+import gzip
 from typing import Dict, Any, List, Optional, Union
 import asyncio
 from datetime import datetime
@@ -17,7 +18,7 @@ import os
 # Agregar path para importaciones
 sys.path.append(str(PathLib(__file__).parent.parent.parent))
 
-from config_multicity import SUPPORTED_CITIES, MultiCitySettings
+from config_multicity import SUPPORTED_CITIES, MultiCitySettings, latest_city_data_file, read_city_data
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -28,6 +29,15 @@ router = APIRouter(tags=["Dashboard"], prefix="/api/dashboard")
 # Configuración
 settings = MultiCitySettings()
 
+def count_city_rows(path: PathLib) -> int:
+    """Cuenta filas sin cargar los datos (footer Parquet o líneas del CSV)"""
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, 'rt') as f:
+        return sum(1 for line in f) - 1  # -1 for header
+
 class DashboardDataLoader:
     """Cargador de datos optimizado para el dashboard"""
     
@@ -145,7 +155,7 @@ class DashboardDataLoader:
         
         try:
             # Verificar archivos de datos
-            city_data_file = self.data_dir / city_id / f"{city_id}_latest.csv"
+            city_data_file = latest_city_data_file(self.data_dir / city_id, city_id)
             
             if not city_data_file.exists():
                 # Sin datos
@@ -167,7 +177,7 @@ class DashboardDataLoader:
                 }
             
             # Cargar datos
-            data = pd.read_csv(city_data_file)
+            data = read_city_data(city_data_file)
             
             if len(data) == 0:
                 raise ValueError("Archivo de datos vacío")
@@ -436,8 +446,22 @@ class DashboardDataLoader:
 # Instancia global
 dashboard_loader = DashboardDataLoader()
 
+def dashboard_etag() -> Optional[str]:
+    """ETag (débil) de all-data: cambia sólo cuando cambian los archivos de datos de ciudad"""
+    mtimes = []
+    for city_id in SUPPORTED_CITIES.keys():
+        city_data_file = latest_city_data_file(dashboard_loader.data_dir / city_id, city_id)
+        if city_data_file.exists():
+            mtimes.append(city_data_file.stat().st_mtime_ns)
+    
+    if not mtimes:
+        return None
+    return f'W/"{max(mtimes):x}-{len(mtimes)}"'
+
 @router.get("/all-data", summary="Datos completos para dashboard")
 async def get_dashboard_data(
+    request: Request,
+    response: Response,
     background_tasks: BackgroundTasks,
     force_refresh: bool = Query(False, description="Forzar recarga de datos")
 ):
@@ -450,11 +474,20 @@ async def get_dashboard_data(
     - Datos tabulares
     - Métricas resumidas
     - Distribución de riesgo
+    
+    Soporta GET condicional: con If-None-Match igual al ETag actual responde 304 sin cuerpo.
     """
     
     try:
         logger.info("📊 Solicitando datos completos del dashboard")
         
+        # Los datos no han cambiado desde la última descarga del cliente
+        etag = dashboard_etag()
+        if etag and not force_refresh and request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        if etag:
+            response.headers["ETag"] = etag
+        
         # Cargar todos los datos
         dashboard_data = await dashboard_loader.load_all_dashboard_data()
         
@@ -529,14 +562,11 @@ async def get_dashboard_metrics():
         
         # Verificar rápidamente cada ciudad
         for city_id in SUPPORTED_CITIES.keys():
-            city_data_file = dashboard_loader.data_dir / city_id / f"{city_id}_latest.csv"
+            city_data_file = latest_city_data_file(dashboard_loader.data_dir / city_id, city_id)
             
             if city_data_file.exists():
                 try:
-                    # Solo leer header para contar filas rápidamente
-                    data = pd.read_csv(city_data_file, nrows=0)  # Solo header
-                    with open(city_data_file, 'r') as f:
-                        line_count = sum(1 for line in f) - 1  # -1 for header
+                    line_count = count_city_rows(city_data_file)
                     
                     if line_count > 0:
                         metrics["cities_with_data"] += 1
@@ -22,7 +22,7 @@ from contextlib import asynccontextmanager
 # Agregar path para importaciones
 sys.path.append(str(PathLib(__file__).parent.parent.parent))
 
-from config_multicity import SUPPORTED_CITIES, MultiCitySettings
+from config_multicity import SUPPORTED_CITIES, MultiCitySettings, latest_city_data_file, read_city_data
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -90,7 +90,7 @@ class CityDataManager:
         
         # 3. Cargar desde disco
         try:
-            city_data_file = self.data_dir / city_id / f"{city_id}_latest.csv"
+            city_data_file = latest_city_data_file(self.data_dir / city_id, city_id)
             
             if not city_data_file.exists():
                 raise HTTPException(
@@ -98,8 +98,7 @@ class CityDataManager:
                     detail=f"Datos no encontrados para {city_id}. Ejecutar ETL primero."
                 )
             
-            # Carga optimizada con chunks para archivos grandes
-            data = pd.read_csv(city_data_file)
+            data = read_city_data(city_data_file)
             logger.info(f"💾 Datos cargados desde disco: {city_id} ({len(data)} puntos)")
             
             # Guardar en caches
@@ -0,0 +1,60 @@
+"""
+Stubs de /api/latest, /api/forecast, /api/alerts y /api/tiles para la API
+multi-ciudad (main.py raíz). La API de LA (api/main.py) usa routes.official.
+"""
+from fastapi import APIRouter, HTTPException, Response
+from typing import Dict, Any
+import datetime as dt
+import json
+
+router = APIRouter()
+
+# Cuerpos estáticos construidos una vez; cada petición solo añade el timestamp
+_LATEST_BBOX = [-118.7, 33.6, -117.8, 34.4]
+_LATEST_BODY = {
+    "grid_resolution_deg": 0.05,
+    "variables": ["no2", "pm25", "o3", "temp", "wind", "rain"],
+    "cells": [
+        {"lat": 34.00, "lon": -118.30, "risk_score": 58, "class": "moderate"},
+        {"lat": 34.05, "lon": -118.25, "risk_score": 71, "class": "bad"},
+    ],
+}
+_FORECAST_HOURS = [1, 2, 3, 4, 5, 6]
+_FORECASTS = [{"hour": h, "risk_score": max(0, min(100, 60 + h*2))} for h in _FORECAST_HOURS]
+# /api/forecast es fijo salvo el timestamp: bytes JSON serializados una vez
+_FORECAST_PREFIX = b'{"generated_at":"'
+_FORECAST_SUFFIX = (b'","forecasts":'
+                    + json.dumps(_FORECASTS, separators=(",", ":")).encode()
+                    + b'}')
+_ALERTS = [
+    {
+        "level": "high",
+        "risk_score": 72,
+        "message": "Calidad del aire mala. Evite actividades al aire libre.",
+        "centroid": {"lat": 34.05, "lon": -118.24},
+    }
+]
+
+def _utc_timestamp() -> str:
+    return dt.datetime.utcnow().isoformat() + "Z"
+
+@router.get("/latest")
+def api_latest() -> Dict[str, Any]:
+    # TODO: Reemplazar con lectura real (Zarr/DB). Respuesta de ejemplo.
+    return {"bbox": _LATEST_BBOX, "generated_at": _utc_timestamp(), **_LATEST_BODY}
+
+@router.get("/forecast")
+def api_forecast() -> Response:
+    # TODO: Sustituir por modelo ML/Advección
+    body = _FORECAST_PREFIX + _utc_timestamp().encode() + _FORECAST_SUFFIX
+    return Response(content=body, media_type="application/json")
+
+@router.get("/alerts")
+def api_alerts() -> Dict[str, Any]:
+    # TODO: Generar desde análisis de rejilla
+    return {"generated_at": _utc_timestamp(), "alerts": _ALERTS}
+
+@router.get("/tiles/{z}/{x}/{y}.png")
+def api_tiles(z: int, x: int, y: int):
+    # TODO: Render real de tiles. Por ahora retornamos 404 para indicar stub.
+    raise HTTPException(status_code=404, detail="Tiles not implemented yet")
@@ -83,6 +83,29 @@ SUPPORTED_CITIES = {
     }
 }
 
+def latest_city_data_file(city_dir: Path, city_id: str) -> Path:
+    """
+    Archivo con los últimos datos de una ciudad. Siempre el Parquet si existe
+    (el CSV legacy se escribe después y sería más reciente, pero es más lento y
+    pierde los dtypes); si no, el CSV del ETL antiguo ({city_id}_latest.csv.gz o .csv).
+    """
+    candidates = [
+        city_dir / f"{city_id}_latest.parquet",
+        city_dir / f"{city_id}_latest.csv.gz",
+        city_dir / f"{city_id}_latest.csv",
+    ]
+    for path in candidates:
+        if path.exists():
+            return path
+    return candidates[-1]
+
+def read_city_data(path: Path):
+    """Lee los datos de una ciudad: Parquet (columnar, con dtypes) o CSV/CSV.gz del ETL legacy"""
+    import pandas as pd
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
 class MultiCitySettings:
     """Configuración para el sistema multi-ciudad."""
     
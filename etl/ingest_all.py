@@ -27,12 +27,12 @@ except ImportError as e:
     fetch_merra2_wind_temp = None
     validate_meteorology_data = None
 
-def run_tempo_ingestion() -> Optional[str]:
-    """Ejecutar ingesta TEMPO."""
+def run_tempo_ingestion(max_granules: Optional[int] = 1) -> Optional[str]:
+    """Ejecutar ingesta TEMPO (max_granules: granulos a combinar, None = todos)."""
     log_info("🛰️ Iniciando ingesta TEMPO (NO₂)...")
     
     try:
-        result = fetch_tempo_no2()
+        result = fetch_tempo_no2(max_granules=max_granules)
         
         if result and validate_tempo_data(result):
             log_success("Ingesta TEMPO completada exitosamente")
@@ -160,10 +160,13 @@ def save_ingestion_report(report: Dict[str, Any]) -> str:
     log_info(f"Reporte guardado en: {report_path}")
     return str(report_path)
 
-def run_all() -> Dict[str, Any]:
+def run_all(tempo_granules: Optional[int] = 1) -> Dict[str, Any]:
     """
     Ejecutar toda la ingesta de datos CleanSky LA.
     
+    Args:
+        tempo_granules: Granulos TEMPO a combinar (None = todos los encontrados)
+    
     Returns:
         Diccionario con resultados de cada dataset
     """
@@ -176,7 +179,7 @@ def run_all() -> Dict[str, Any]:
     results = {}
     
     # 1. TEMPO NO₂ (satelital)
-    tempo_result = run_tempo_ingestion()
+    tempo_result = run_tempo_ingestion(tempo_granules)
     results["tempo"] = tempo_result
     
     # 2. OpenAQ (estaciones terrestres)
@@ -258,8 +261,11 @@ if __name__ == "__main__":
                        help="Saltar verificación de prerequisitos")
     parser.add_argument("--only", choices=["tempo", "openaq", "meteorology"],
                        help="Ejecutar solo un tipo de ingesta")
+    parser.add_argument("--tempo-granules", type=int, default=1,
+                       help="Granulos TEMPO a abrir en paralelo y combinar (0 = todos)")
     
     args = parser.parse_args()
+    tempo_granules = args.tempo_granules or None
     
     # Verificar prerequisitos (unless skipped)
     if not args.skip_check and not check_prerequisites():
@@ -268,7 +274,7 @@ if __name__ == "__main__":
     
     # Ejecutar ingesta específica o completa
     if args.only == "tempo":
-        result = run_tempo_ingestion()
+        result = run_tempo_ingestion(tempo_granules)
         sys.exit(0 if result else 1)
     elif args.only == "openaq":
         result = run_openaq_ingestion()
@@ -279,7 +285,7 @@ if __name__ == "__main__":
         sys.exit(0 if success else 1)
     else:
         # Ingesta completa
-        results = run_all()
+        results = run_all(tempo_granules)
         
         # Exit code basado en éxito
         successful_count = sum(1 for r in results.values() if r)
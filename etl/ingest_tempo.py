@@ -3,7 +3,12 @@ Descarga datos TEMPO NO₂ NRT desde EarthData (NASA).
 """
 import earthaccess
 import xarray as xr
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Tuple, Optional
 try:
     from .utils import (
@@ -18,6 +23,19 @@ except ImportError:
         log_info, log_error, log_success, validate_bbox
     )
 
+# Nombres aceptados para las coordenadas espaciales
+_LON_NAMES = frozenset({"lon", "longitude"})
+_LAT_NAMES = frozenset({"lat", "latitude"})
+
+# Nombres alternativos de la variable NO₂ (en orden de preferencia)
+_POSSIBLE_NO2 = (
+    "nitrogendioxide_tropospheric_column",
+    "no2_tropospheric_column",
+    "NO2_column",
+    "ColumnAmountNO2Trop"
+)
+_POSSIBLE_NO2_SET = frozenset(_POSSIBLE_NO2)
+
 def authenticate_earthdata() -> bool:
     """Autenticar con NASA EarthData."""
     try:
@@ -28,10 +46,120 @@ def authenticate_earthdata() -> bool:
         log_error(f"Error de autenticación EarthData: {e}")
         return False
 
+def write_tempo_references(granule, file_obj, output_path) -> str:
+    """
+    Generar referencias Kerchunk (JSON) para un granulo TEMPO HDF5.
+    
+    El JSON mapea las claves Zarr a rangos de bytes del archivo original,
+    por lo que no se copia ningún dato.
+    
+    Args:
+        granule: Resultado de earthaccess.search_data
+        file_obj: Archivo abierto con earthaccess.open
+        output_path: Ruta del JSON de referencias
+        
+    Returns:
+        Path del JSON creado
+    """
+    from kerchunk.hdf import SingleHdf5ToZarr
+    
+    url = granule.data_links()[0]
+    refs = SingleHdf5ToZarr(file_obj, url, inline_threshold=300).translate()
+    
+    with open(output_path, "w") as f:
+        json.dump(refs, f)
+    
+    return str(output_path)
+
+def open_tempo_references(refs_path: str) -> xr.Dataset:
+    """Abrir un JSON de referencias Kerchunk como Dataset perezoso."""
+    import fsspec
+    
+    fs = fsspec.filesystem(
+        "reference",
+        fo=refs_path,
+        fs={"https": earthaccess.get_fsspec_https_session()}
+    )
+    return xr.open_dataset(
+        fs.get_mapper(""), engine="zarr", consolidated=False, chunks={}
+    )
+
+@lru_cache(maxsize=16)
+def detect_coord_names(coords: Tuple[str, ...]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Detectar los nombres de longitud/latitud entre las coordenadas.
+    
+    Los nombres son fijos para un mismo producto, así que el resultado se
+    memoiza por tupla de coordenadas.
+    
+    Returns:
+        Tuple con (lon_name, lat_name); None si no se encuentra
+    """
+    lon_name = None
+    lat_name = None
+    
+    for coord in coords:
+        coord_lower = coord.lower()
+        if coord_lower in _LON_NAMES:
+            lon_name = coord
+        elif coord_lower in _LAT_NAMES:
+            lat_name = coord
+    
+    return lon_name, lat_name
+
+def crop_tempo_granule(
+    ds: xr.Dataset,
+    bbox: Tuple[float, float, float, float],
+    var_name: str
+) -> Optional[xr.DataArray]:
+    """
+    Recortar un granulo TEMPO al bbox y extraer la variable NO₂.
+    
+    Args:
+        ds: Dataset del granulo (perezoso)
+        bbox: Bounding box (west, south, east, north)
+        var_name: Nombre preferido de la variable NO₂
+        
+    Returns:
+        DataArray NO₂ recortado o None si falla
+    """
+    # Recortar a bounding box - detectar nombres de coordenadas
+    west, south, east, north = bbox
+    
+    # Detectar nombres de coordenadas (pueden ser lon/longitude, lat/latitude)
+    lon_name, lat_name = detect_coord_names(tuple(ds.coords))
+    
+    if not lon_name or not lat_name:
+        log_error(f"Coordenadas no encontradas. Coordenadas disponibles: {list(ds.coords)}")
+        return None
+    
+    log_info(f"Usando coordenadas: {lon_name}, {lat_name}")
+    
+    # Recortar usando los nombres correctos
+    ds_cropped = ds.sel(
+        {lon_name: slice(west, east), 
+         lat_name: slice(south, north)}
+    )
+    
+    # Extraer variable NO₂
+    if var_name not in ds_cropped:
+        # Intentar nombres alternativos
+        found = _POSSIBLE_NO2_SET.intersection(ds_cropped.data_vars)
+        
+        if not found:
+            log_error(f"Variable NO₂ no encontrada. Variables disponibles: {list(ds_cropped.data_vars)}")
+            return None
+        
+        var_name = next(name for name in _POSSIBLE_NO2 if name in found)
+    
+    return ds_cropped[var_name]
+
 def fetch_tempo_no2(
     bbox: Tuple[float, float, float, float] = BBOX_LA,
     start: Optional[str] = None,
-    end: Optional[str] = None
+    end: Optional[str] = None,
+    as_references: bool = False,
+    max_granules: Optional[int] = 1
 ) -> Optional[str]:
     """
     Descargar datos TEMPO NO₂ y guardar en Zarr.
@@ -40,16 +168,30 @@ def fetch_tempo_no2(
         bbox: Bounding box (west, south, east, north)
         start: Fecha inicio YYYY-MM-DD (default: ayer)
         end: Fecha fin YYYY-MM-DD (default: hoy)
+        as_references: Guardar solo referencias Kerchunk (JSON) al HDF5
+            original en lugar de copiar el recorte a Zarr (un solo granulo)
+        max_granules: Número de granulos a combinar a lo largo de "time"
+            (None: todos los encontrados); debe ser 1 con as_references
         
     Returns:
-        Path del archivo Zarr creado o None si falla
+        Path del archivo Zarr (o JSON de referencias) creado o None si falla
     """
+    short_name = TEMPO_CONFIG["short_name"]
+    var_name = TEMPO_CONFIG["variable_name"]
+    output_name = TEMPO_CONFIG["output_name"]
+    zarr_path = TEMPO_CONFIG["zarr_path"]
+    
     ensure_data_dirs()
     
     if not validate_bbox(bbox):
         log_error("Bounding box inválido")
         return None
     
+    if as_references and max_granules != 1:
+        # El JSON de referencias describe un único archivo HDF5
+        log_error("as_references solo admite max_granules=1")
+        return None
+    
     if not start or not end:
         start, end = get_recent_date_range(days_back=2)
     
@@ -60,122 +202,115 @@ def fetch_tempo_no2(
         return None
     
     try:
-        # Buscar datos TEMPO
-        results = earthaccess.search_data(
-            short_name=TEMPO_CONFIG["short_name"],
-            temporal=(start, end),
-            bounding_box=bbox
-        )
-        
-        if not results:
-            log_error("No se encontraron archivos TEMPO para el rango especificado")
-            return None
-        
-        log_info(f"Encontrados {len(results)} archivos TEMPO")
-        
-        # Abrir primer dataset (streaming virtual)
-        log_info("Abriendo dataset TEMPO...")
-        files = earthaccess.open(results[0:1])  # Solo el primer archivo
-        ds = xr.open_dataset(files[0])
-        
-        # Recortar a bounding box - detectar nombres de coordenadas
-        west, south, east, north = bbox
-        
-        # Detectar nombres de coordenadas (pueden ser lon/longitude, lat/latitude)
-        lon_name = None
-        lat_name = None
-        
-        for coord in ds.coords:
-            if coord.lower() in ['lon', 'longitude']:
-                lon_name = coord
-            elif coord.lower() in ['lat', 'latitude']: 
-                lat_name = coord
-        
-        if not lon_name or not lat_name:
-            log_error(f"Coordenadas no encontradas. Coordenadas disponibles: {list(ds.coords)}")
-            return None
-        
-        log_info(f"Usando coordenadas: {lon_name}, {lat_name}")
-        
-        # Recortar usando los nombres correctos
-        ds_cropped = ds.sel(
-            {lon_name: slice(west, east), 
-             lat_name: slice(south, north)}
-        )
-        
-        # Extraer variable NO₂
-        var_name = TEMPO_CONFIG["variable_name"]
-        if var_name not in ds_cropped:
-            # Intentar nombres alternativos
-            possible_names = [
-                "nitrogendioxide_tropospheric_column",
-                "no2_tropospheric_column", 
-                "NO2_column",
-                "ColumnAmountNO2Trop"
-            ]
-            
-            found_var = None
-            for name in possible_names:
-                if name in ds_cropped:
-                    found_var = name
-                    break
-            
-            if not found_var:
-                log_error(f"Variable NO₂ no encontrada. Variables disponibles: {list(ds_cropped.variables)}")
+        # ExitStack cierra cada dataset abierto al salir, con o sin error
+        with ExitStack() as stack:
+            # Buscar datos TEMPO
+            results = earthaccess.search_data(
+                short_name=short_name,
+                temporal=(start, end),
+                bounding_box=bbox
+            )
+            
+            if not results:
+                log_error("No se encontraron archivos TEMPO para el rango especificado")
                 return None
             
-            var_name = found_var
-        
-        no2_data = ds_cropped[var_name]
-        
-        # Crear dataset con metadatos
-        output_ds = no2_data.to_dataset(name=TEMPO_CONFIG["output_name"])
-        
-        # Agregar metadatos
-        output_ds.attrs.update({
-            "title": "TEMPO NO2 Tropospheric Column",
-            "source": "NASA TEMPO",
-            "bbox": bbox,
-            "temporal_range": f"{start} to {end}",
-            "processing_date": str(xr.core.utils.datetime.datetime.now()),
-            "units": getattr(no2_data, "units", "mol/m²")
-        })
-        
-        # Guardar como Zarr
-        output_path = DATA_DIR / TEMPO_CONFIG["zarr_path"]
-        output_ds.to_zarr(output_path, mode="w")
-        
-        log_success(f"TEMPO NO₂ guardado en {output_path}")
-        log_info(f"Dimensiones: {dict(output_ds.dims)}")
-        
-        return str(output_path)
+            log_info(f"Encontrados {len(results)} archivos TEMPO")
+            
+            # Abrir datasets (streaming virtual): solo los granulos que se usan
+            log_info("Abriendo dataset TEMPO...")
+            if as_references:
+                refs_path = DATA_DIR / zarr_path.replace(".zarr", ".json")
+                files = earthaccess.open(results[:1])
+                write_tempo_references(results[0], files[0], refs_path)
+                log_success(f"Referencias TEMPO NO₂ guardadas en {refs_path}")
+                return str(refs_path)
+            
+            files = earthaccess.open(results[:max_granules])
+            
+            def open_and_crop(file_obj) -> Tuple[xr.Dataset, Optional[xr.DataArray]]:
+                # Apertura perezosa con Dask: el recorte con .sel no materializa el granulo
+                ds = xr.open_dataset(file_obj, chunks="auto")
+                try:
+                    return ds, crop_tempo_granule(ds, bbox, var_name)
+                except BaseException:
+                    ds.close()
+                    raise
+            
+            # Abrir y recortar granulos en paralelo: la latencia de red de cada
+            # apertura se solapa con la de los demás
+            with ThreadPoolExecutor(max_workers=min(4, len(files))) as executor:
+                futures = [executor.submit(open_and_crop, file_obj) for file_obj in files]
+            
+            # Registrar los datasets abiertos en el ExitStack desde este hilo
+            # (también los de granulos correctos si otro falló)
+            arrays, errors = [], []
+            for future in futures:
+                try:
+                    ds, arr = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                stack.callback(ds.close)
+                arrays.append(arr)
+            
+            if errors:
+                raise errors[0]
+            
+            if any(arr is None for arr in arrays):
+                return None
+            
+            no2_data = arrays[0] if len(arrays) == 1 else xr.concat(arrays, dim="time")
+            
+            # Re-chunk uniforme (requisito de Zarr) para escribir por bloques
+            no2_data = no2_data.chunk("auto")
+            
+            # Crear dataset con metadatos
+            output_ds = no2_data.to_dataset(name=output_name)
+            
+            # Agregar metadatos
+            output_ds.attrs.update({
+                "title": "TEMPO NO2 Tropospheric Column",
+                "source": "NASA TEMPO",
+                "bbox": bbox,
+                "temporal_range": f"{start} to {end}",
+                "processing_date": datetime.now(timezone.utc).isoformat(),
+                "units": getattr(no2_data, "units", "mol/m²")
+            })
+            
+            # Guardar como Zarr
+            output_path = DATA_DIR / zarr_path
+            # consolidated=True: un único .zmetadata para aperturas en una lectura
+            output_ds.to_zarr(output_path, mode="w", consolidated=True)
+            
+            log_success(f"TEMPO NO₂ guardado en {output_path}")
+            log_info(f"Dimensiones: {dict(output_ds.dims)}")
+            
+            return str(output_path)
         
     except Exception as e:
         log_error(f"Error descargando TEMPO: {e}")
         return None
-    
-    finally:
-        # Cerrar datasets
-        try:
-            if 'ds' in locals():
-                ds.close()
-            if 'ds_cropped' in locals():
-                ds_cropped.close()
-        except:
-            pass
 
 def validate_tempo_data(zarr_path: str) -> bool:
     """Validar que los datos TEMPO se guardaron correctamente."""
     try:
-        ds = xr.open_zarr(zarr_path)
+        if str(zarr_path).endswith(".json"):
+            # Referencias Kerchunk: la variable conserva su nombre original
+            ds = open_tempo_references(zarr_path)
+            candidates = (TEMPO_CONFIG["variable_name"],) + _POSSIBLE_NO2
+            var_name = next((name for name in candidates if name in ds), None)
+        else:
+            ds = xr.open_zarr(zarr_path, consolidated=True, chunks={})
+            var_name = TEMPO_CONFIG["output_name"]
         
         # Verificar que tiene la variable NO₂
-        if TEMPO_CONFIG["output_name"] not in ds:
+        if var_name is None or var_name not in ds:
             log_error("Variable NO₂ no encontrada en archivo Zarr")
             return False
         
         # Verificar dimensiones mínimas
-        no2_var = ds[TEMPO_CONFIG["output_name"]]
+        no2_var = ds[var_name]
         if no2_var.size == 0:
             log_error("Dataset NO₂ está vacío")
             return False
@@ -189,6 +324,13 @@ def validate_tempo_data(zarr_path: str) -> bool:
 
 if __name__ == "__main__":
     # Test standalone
-    result = fetch_tempo_no2()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Ingesta TEMPO NO₂")
+    parser.add_argument("--granules", type=int, default=1,
+                       help="Granulos a abrir en paralelo y combinar (0 = todos)")
+    args = parser.parse_args()
+    
+    result = fetch_tempo_no2(max_granules=args.granules or None)
     if result:
         validate_tempo_data(result)
@@ -7,14 +7,19 @@ Este script orquesta todo el proceso de fusión y cálculo del índice AIR Risk
 
 import sys
 import os
+import time
 import traceback
 from datetime import datetime
-import xarray as xr
+from importlib.util import find_spec
+from typing import TYPE_CHECKING
 
 # Añadir el directorio actual al path para importar módulos locales
 sys.path.insert(0, os.path.dirname(__file__))
 
-from process_fusion import process_fusion
+# xarray/numpy/pandas se importan dentro de las funciones que los usan para
+# que `make_snapshot.py test` y las salidas por error arranquen sin su coste
+if TYPE_CHECKING:
+    import xarray as xr
 
 def print_banner():
     """Imprime banner de inicio de Fase 2."""
@@ -25,25 +30,27 @@ def print_banner():
     print(f"⏰ Inicio: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print()
 
-def print_dataset_summary(ds: xr.Dataset):
+def print_dataset_summary(ds: "xr.Dataset"):
     """
     Imprime un resumen detallado del dataset procesado.
     
     Args:
         ds: Dataset procesado
     """
-    print("\n" + "=" * 60)
-    print("📊 RESUMEN DEL DATASET PROCESADO")
-    print("=" * 60)
+    lines = []
+    
+    lines.append("\n" + "=" * 60)
+    lines.append("📊 RESUMEN DEL DATASET PROCESADO")
+    lines.append("=" * 60)
     
     # Información básica
-    print(f"Dimensiones: {dict(ds.dims)}")
-    print(f"Coordenadas: {list(ds.coords.keys())}")
-    print(f"Variables de datos: {len(ds.data_vars)}")
-    print()
+    lines.append(f"Dimensiones: {dict(ds.dims)}")
+    lines.append(f"Coordenadas: {list(ds.coords.keys())}")
+    lines.append(f"Variables de datos: {len(ds.data_vars)}")
+    lines.append("")
     
     # Variables principales
-    print("🔍 Variables incluidas:")
+    lines.append("🔍 Variables incluidas:")
     for var_name, var_data in ds.data_vars.items():
         try:
             min_val = float(var_data.min())
@@ -52,48 +59,53 @@ def print_dataset_summary(ds: xr.Dataset):
             
             units = var_data.attrs.get('units', 'sin unidad')
             
-            print(f"   • {var_name:12s}: [{min_val:8.2f}, {max_val:8.2f}] μ={mean_val:8.2f} ({units})")
+            lines.append(f"   • {var_name:12s}: [{min_val:8.2f}, {max_val:8.2f}] μ={mean_val:8.2f} ({units})")
             
         except Exception as e:
-            print(f"   • {var_name:12s}: Error calculando estadísticas: {e}")
+            lines.append(f"   • {var_name:12s}: Error calculando estadísticas: {e}")
     
-    print()
+    lines.append("")
     
     # Risk Score específico
     if "risk_score" in ds.data_vars:
-        risk = ds.risk_score
-        print("🎯 AIR Risk Score:")
-        print(f"   • Rango: [{float(risk.min()):.1f}, {float(risk.max()):.1f}]")
-        print(f"   • Promedio: {float(risk.mean()):.1f}")
-        print(f"   • Desviación: {float(risk.std()):.1f}")
-        print()
+        # Cargar el array una sola vez y reducir en una única pasada
+        from utils_math import compute_risk_stats
+        risk_min, risk_max, risk_mean, risk_std = compute_risk_stats(ds.risk_score.values)
+        lines.append("🎯 AIR Risk Score:")
+        lines.append(f"   • Rango: [{risk_min:.1f}, {risk_max:.1f}]")
+        lines.append(f"   • Promedio: {risk_mean:.1f}")
+        lines.append(f"   • Desviación: {risk_std:.1f}")
+        lines.append("")
     
     # Risk Class específico
     if "risk_class" in ds.data_vars:
         risk_class = ds.risk_class
-        print("🚦 Clasificación de riesgo:")
+        lines.append("🚦 Clasificación de riesgo:")
         
         # Contar valores únicos
         try:
-            import numpy as np
-            unique_classes, counts = np.unique(risk_class.values, return_counts=True)
-            total_points = len(risk_class.values.flatten())
+            from utils_math import risk_class_counts
+            counts = risk_class_counts(risk_class)
+            total_points = risk_class.size
             
-            for cls, count in zip(unique_classes, counts):
+            for cls, count in counts.items():
                 percentage = (count / total_points) * 100
-                print(f"   • {cls:10s}: {count:5d} puntos ({percentage:5.1f}%)")
+                lines.append(f"   • {str(cls):10s}: {count:5d} puntos ({percentage:5.1f}%)")
         except Exception as e:
-            print(f"   • Error contando clases: {e}")
+            lines.append(f"   • Error contando clases: {e}")
         
-        print()
+        lines.append("")
     
     # Metadatos
     if ds.attrs:
-        print("📋 Metadatos:")
+        lines.append("📋 Metadatos:")
         for key, value in ds.attrs.items():
             if isinstance(value, str) and len(value) > 60:
                 value = value[:60] + "..."
-            print(f"   • {key}: {value}")
+            lines.append(f"   • {key}: {value}")
+    
+    # Una sola escritura en stdout en lugar de un print por línea
+    sys.stdout.write("\n".join(lines) + "\n")
 
 def validate_requirements():
     """
@@ -105,14 +117,11 @@ def validate_requirements():
     print("🔍 Verificando requisitos...")
     
     # Verificar dependencias
-    try:
-        import xarray
-        import numpy
-        import pandas
-        print("   ✅ Dependencias Python disponibles")
-    except ImportError as e:
-        print(f"   ❌ Dependencia faltante: {e}")
+    missing = [name for name in ("xarray", "numpy", "pandas") if find_spec(name) is None]
+    if missing:
+        print(f"   ❌ Dependencia faltante: {', '.join(missing)}")
         return False
+    print("   ✅ Dependencias Python disponibles")
     
     # Verificar estructura de directorios
     base_dir = os.path.dirname(__file__)
@@ -158,11 +167,16 @@ def main():
     try:
         # Ejecutar procesamiento principal
         print("🚀 Iniciando procesamiento...")
+        from process_fusion import process_fusion, zarr_store_size
+        
+        t0 = time.perf_counter()
         dataset = process_fusion()
+        elapsed = time.perf_counter() - t0
         
         print("\n" + "🎉" * 20)
         print("✅ FASE 2 COMPLETADA CORRECTAMENTE")
         print("🎉" * 20)
+        print(f"⏱️  Tiempo de procesamiento: {elapsed:.2f} s")
         
         # Mostrar resumen
         print_dataset_summary(dataset)
@@ -174,12 +188,7 @@ def main():
             print(f"   • Ubicación: {output_path}")
             
             # Calcular tamaño
-            total_size = 0
-            for dirpath, _, filenames in os.walk(output_path):
-                for filename in filenames:
-                    filepath = os.path.join(dirpath, filename)
-                    total_size += os.path.getsize(filepath)
-            
+            total_size = zarr_store_size(output_path)
             size_mb = total_size / (1024 * 1024)
             print(f"   • Tamaño: {size_mb:.2f} MB")
             
@@ -218,20 +227,24 @@ def test_quick():
             return False
         
         print("🧪 Prueba rápida de consistencia...")
-        ds = xr.open_zarr(output_path)
+        import xarray as xr
+        
+        ds = xr.open_zarr(output_path, consolidated=True, chunks={})
         
         # Verificaciones básicas
         assert "risk_score" in ds.data_vars, "Variable risk_score faltante"
         assert "risk_class" in ds.data_vars, "Variable risk_class faltante"
         
-        risk_mean = float(ds.risk_score.mean())
+        # Leer ambos arrays del store una sola vez y operar en memoria
+        sub = ds[["risk_score", "risk_class"]].load()
+        
+        risk_mean = float(sub.risk_score.mean())
         print(f"✅ Risk score promedio: {risk_mean:.1f}")
         
         # Contar clases
         try:
-            import numpy as np
-            unique_classes, counts = np.unique(ds.risk_class.values, return_counts=True)
-            class_counts = dict(zip(unique_classes, counts))
+            from utils_math import risk_class_counts
+            class_counts = risk_class_counts(sub.risk_class)
             print(f"✅ Risk classes: {class_counts}")
         except:
             print("⚠️  No se pudieron contar las clases")
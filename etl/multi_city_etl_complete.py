@@ -9,12 +9,21 @@ import logging
 import pandas as pd
 import numpy as np
 import xarray as xr
+from scipy.interpolate import RegularGridInterpolator
+from scipy.spatial import cKDTree
 from datetime import datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
 import json
 from typing import Dict, List, Tuple, Optional
 import sys
 import os
+import shutil
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Agregar el directorio padre al path para importar módulos
 sys.path.append(str(Path(__file__).parent.parent))
@@ -24,7 +33,7 @@ from etl.ingest_tempo import fetch_tempo_data
 from etl.ingest_openaq import fetch_openaq_data
 from etl.ingest_meteorology import fetch_merra2_data
 from etl.utils import setup_logging, save_to_netcdf, save_to_csv
-from etl.utils_math import interpolate_grid, calculate_air_quality_index
+from etl.utils_math import interpolate_grid, calculate_air_quality_index, bilinear2d_regular
 
 # Configuración de logging
 logging.basicConfig(
@@ -33,6 +42,141 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Breakpoints EPA para PM2.5: límite superior de cada tramo, AQI inicial,
+# concentración base y pendiente (el último tramo es > 250.4 μg/m³)
+PM25_AQI_UPPER = np.array([12.0, 35.4, 55.4, 150.4, 250.4])
+PM25_AQI_LOW = np.array([0.0, 50.0, 100.0, 150.0, 200.0, 300.0])
+PM25_AQI_BASE = np.array([0.0, 12.1, 35.5, 55.5, 150.5, 250.5])
+PM25_AQI_SLOPE = np.array([
+    50 / 12.0,
+    (100 - 50) / (35.4 - 12.1),
+    (150 - 100) / (55.4 - 35.5),
+    (200 - 150) / (150.4 - 55.5),
+    (300 - 200) / (250.4 - 150.5),
+    (500 - 300) / (500.4 - 250.5),
+])
+
+# Breakpoints EPA para NO2 (ppb aproximados; el último tramo es > 649)
+NO2_AQI_UPPER = np.array([53.0, 100.0, 360.0, 649.0])
+NO2_AQI_LOW = np.array([0.0, 50.0, 100.0, 150.0, 200.0])
+NO2_AQI_BASE = np.array([0.0, 54.0, 101.0, 361.0, 650.0])
+NO2_AQI_SLOPE = np.array([
+    50 / 53,
+    (100 - 50) / (100 - 54),
+    (150 - 100) / (360 - 101),
+    (200 - 150) / (649 - 361),
+    1 / 10,
+])
+
+# Categorías AQI: límite superior de cada tramo (a, b] y su etiqueta textual;
+# el código len(AQI_CATEGORY_UPPER) + 1 corresponde a "No Data"
+AQI_CATEGORY_UPPER = np.array([50.0, 100.0, 150.0, 200.0, 300.0])
+AQI_CATEGORY_LABELS = [
+    "Good",
+    "Moderate",
+    "Unhealthy for Sensitive Groups",
+    "Unhealthy",
+    "Very Unhealthy",
+    "Hazardous",
+    "No Data",
+]
+
+@lru_cache(maxsize=1)
+def _aqi_kernel():
+    """
+    Compila (una vez) el kernel Numba que calcula AQI PM2.5, AQI NO2, AQI
+    combinado y código de categoría en una sola pasada paralela. Devuelve
+    None si Numba no está instalado.
+    """
+    try:
+        from numba import njit, prange
+    except ImportError:
+        return None
+    
+    @njit(parallel=True)
+    def compute_aqi(pm25, no2_column,
+                    pm_upper, pm_low, pm_base, pm_slope,
+                    no2_upper, no2_low, no2_base, no2_slope,
+                    cat_upper, aqi_pm, aqi_no2, aqi_comb, cat_idx):
+        for i in prange(pm25.size):
+            # PM2.5: tramo = primer límite superior >= valor
+            x = pm25[i]
+            if np.isnan(x):
+                a = np.nan
+            else:
+                k = 0
+                while k < pm_upper.size and pm_upper[k] < x:
+                    k += 1
+                offset = x - pm_base[k]
+                if k == pm_upper.size:
+                    offset = min(offset, 249.9)
+                a = pm_low[k] + pm_slope[k] * offset
+            
+            # NO2: columna -> ppb aproximados
+            y = no2_column[i] / 2.69e15 * 100
+            if np.isnan(y):
+                b = np.nan
+            else:
+                k = 0
+                while k < no2_upper.size and no2_upper[k] < y:
+                    k += 1
+                b = no2_low[k] + no2_slope[k] * (y - no2_base[k])
+                if k == no2_upper.size:
+                    b = min(b, 300.0)
+            
+            # Combinado: máximo ignorando NaN
+            if np.isnan(a):
+                c = b
+            elif np.isnan(b):
+                c = a
+            else:
+                c = max(a, b)
+            
+            if np.isnan(c):
+                code = cat_upper.size + 1
+            else:
+                code = 0
+                while code < cat_upper.size and cat_upper[code] < c:
+                    code += 1
+            
+            aqi_pm[i] = a
+            aqi_no2[i] = b
+            aqi_comb[i] = c
+            cat_idx[i] = code
+    
+    return compute_aqi
+
+def _json_bytes(obj) -> bytes:
+    """
+    Serializa a JSON indentado (2 espacios). Usa orjson si está instalado
+    (encoder nativo, acepta escalares NumPy); si no, el módulo json estándar.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, indent=2).encode()
+
+@lru_cache(maxsize=64)
+def _flat_grid(bbox: tuple, resolution: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Coordenadas aplanadas de la grilla (orden fila = latitud), sin
+    materializar el meshgrid 2-D. Se cachea por (bbox, resolución) porque
+    cada ejecución horaria usa las mismas ciudades.
+    """
+    west, south, east, north = bbox
+    
+    # Crear grilla de alta densidad
+    # float32: ~1 m de precisión, suficiente para una grilla de ~800 m
+    lons_1d = np.arange(west, east + resolution, resolution, dtype=np.float32)
+    lats_1d = np.arange(south, north + resolution, resolution, dtype=np.float32)
+    
+    lons = np.tile(lons_1d, lats_1d.size)
+    lats = np.repeat(lats_1d, lons_1d.size)
+    
+    # Arrays compartidos entre llamadas: solo lectura
+    lons.setflags(write=False)
+    lats.setflags(write=False)
+    return lons, lats
+
 class MultiCityETL:
     """ETL completo para múltiples ciudades"""
     
@@ -49,6 +193,19 @@ class MultiCityETL:
             "processing_time": 0,
             "errors": []
         }
+        
+        # Límite de peticiones simultáneas por fuente de datos
+        self.endpoint_semaphores = {
+            "tempo": asyncio.Semaphore(4),
+            "openaq": asyncio.Semaphore(4),
+            "merra2": asyncio.Semaphore(4)
+        }
+        
+        # Caché de estaciones OpenAQ por (bbox, hora): cambian lentamente
+        self._openaq_cache: Dict[Tuple[tuple, datetime], pd.DataFrame] = {}
+        
+        # Precompilar el kernel de interpolación con una grilla mínima
+        bilinear2d_regular(np.zeros((4, 4)), 0.0, 1.0, 0.0, 1.0, np.zeros(1), np.zeros(1))
     
     def generate_high_density_grid(self, bbox: List[float], resolution: float = 0.01) -> Tuple[np.ndarray, np.ndarray]:
         """
@@ -59,20 +216,13 @@ class MultiCityETL:
             resolution: Resolución en grados (0.01 = ~1km)
         
         Returns:
-            Tuple de arrays (lons, lats)
+            Tuple de arrays 1-D aplanados (lons, lats), uno por punto
         """
-        west, south, east, north = bbox
+        lons, lats = _flat_grid(tuple(bbox), resolution)
         
-        # Crear grilla de alta densidad
-        lons = np.arange(west, east + resolution, resolution)
-        lats = np.arange(south, north + resolution, resolution)
+        logger.info(f"Grilla generada: {lons.size} puntos")
         
-        # Crear meshgrid
-        lon_grid, lat_grid = np.meshgrid(lons, lats)
-        
-        logger.info(f"Grilla generada: {len(lons)} x {len(lats)} = {len(lons) * len(lats)} puntos")
-        
-        return lon_grid, lat_grid
+        return lons, lats
     
     async def process_city_data(self, city_id: str, city_config: Dict) -> Dict:
         """
@@ -87,42 +237,35 @@ class MultiCityETL:
         """
         logger.info(f"🏙️  Procesando {city_config['name']} ({city_id})")
         
+        # Obtener timestamp actual (único para datos, archivos y resumen)
+        timestamp = datetime.utcnow()
+        
         try:
             # Generar grilla de alta densidad
-            lon_grid, lat_grid = self.generate_high_density_grid(
+            lons, lats = self.generate_high_density_grid(
                 city_config['bbox'], 
                 resolution=0.008  # ~800m resolution for 3000+ points
             )
             
-            # Obtener timestamp actual
-            timestamp = datetime.utcnow()
-            
-            # 1. Datos TEMPO (NO2, O3)
-            logger.info(f"  📡 Obteniendo datos TEMPO...")
-            tempo_data = await self.fetch_tempo_for_city(city_config['bbox'], timestamp)
-            
-            # 2. Datos OpenAQ (estaciones terrestres)
-            logger.info(f"  🏭 Obteniendo datos OpenAQ...")
-            openaq_data = await self.fetch_openaq_for_city(city_config['bbox'], timestamp)
-            
-            # 3. Datos meteorológicos MERRA-2
-            logger.info(f"  🌤️  Obteniendo datos MERRA-2...")
-            merra2_data = await self.fetch_merra2_for_city(city_config['bbox'], timestamp)
-            
-            # 4. Interpolar y fusionar datos
-            logger.info(f"  🔄 Interpolando y fusionando datos...")
-            fused_data = self.fuse_data_sources(
-                lon_grid, lat_grid, 
-                tempo_data, openaq_data, merra2_data,
-                timestamp
+            # 1-3. Datos TEMPO (NO2, O3), OpenAQ (estaciones terrestres) y
+            # meteorológicos MERRA-2, solicitados en paralelo
+            logger.info(f"  📡 Obteniendo datos TEMPO, OpenAQ y MERRA-2...")
+            tempo_data, openaq_data, merra2_data = await asyncio.gather(
+                self.fetch_tempo_for_city(city_config['bbox'], timestamp),
+                self.fetch_openaq_for_city(city_config['bbox'], timestamp),
+                self.fetch_merra2_for_city(city_config['bbox'], timestamp)
             )
             
-            # 5. Calcular índices de calidad del aire
-            logger.info(f"  📊 Calculando AQI...")
-            fused_data = self.calculate_air_quality_metrics(fused_data)
+            # 4-5. Interpolar y fusionar datos y calcular índices de calidad
+            # del aire; en un hilo para no bloquear el event loop
+            logger.info(f"  🔄 Interpolando, fusionando datos y calculando AQI...")
+            fused_data = await asyncio.to_thread(
+                self._fuse_and_compute,
+                lons, lats, tempo_data, openaq_data, merra2_data, timestamp
+            )
             
             # 6. Guardar datos
-            await self.save_city_data(city_id, city_config, fused_data)
+            await self.save_city_data(city_id, city_config, fused_data, timestamp)
             
             # Actualizar estadísticas
             self.stats["cities_processed"] += 1
@@ -155,17 +298,28 @@ class MultiCityETL:
         """Obtiene datos TEMPO para una ciudad"""
         try:
             # Usar el módulo existente de TEMPO
-            tempo_data = await fetch_tempo_data(bbox, timestamp)
+            async with self.endpoint_semaphores['tempo']:
+                tempo_data = await fetch_tempo_data(bbox, timestamp)
             return tempo_data
         except Exception as e:
             logger.warning(f"Error obteniendo TEMPO: {e}")
             return None
     
     async def fetch_openaq_for_city(self, bbox: List[float], timestamp: datetime) -> Optional[pd.DataFrame]:
-        """Obtiene datos OpenAQ para una ciudad"""
+        """Obtiene datos OpenAQ para una ciudad (reutiliza la descarga de la misma hora)"""
+        cache_key = (tuple(bbox), timestamp.replace(minute=0, second=0, microsecond=0))
+        if cache_key in self._openaq_cache:
+            return self._openaq_cache[cache_key]
+        
         try:
             # Usar el módulo existente de OpenAQ
-            openaq_data = await fetch_openaq_data(bbox)
+            async with self.endpoint_semaphores['openaq']:
+                openaq_data = await fetch_openaq_data(bbox)
+            
+            if openaq_data is not None:
+                # Descartar entradas de horas anteriores
+                self._openaq_cache = {k: v for k, v in self._openaq_cache.items() if k[1] == cache_key[1]}
+                self._openaq_cache[cache_key] = openaq_data
             return openaq_data
         except Exception as e:
             logger.warning(f"Error obteniendo OpenAQ: {e}")
@@ -175,13 +329,23 @@ class MultiCityETL:
         """Obtiene datos MERRA-2 para una ciudad"""
         try:
             # Usar el módulo existente de MERRA-2
-            merra2_data = await fetch_merra2_data(bbox, timestamp)
+            async with self.endpoint_semaphores['merra2']:
+                merra2_data = await fetch_merra2_data(bbox, timestamp)
             return merra2_data
         except Exception as e:
             logger.warning(f"Error obteniendo MERRA-2: {e}")
             return None
-    
-    def fuse_data_sources(self, lon_grid: np.ndarray, lat_grid: np.ndarray, 
+
+    def _fuse_and_compute(self, lons: np.ndarray, lats: np.ndarray,
+                          tempo_data: Optional[xr.Dataset],
+                          openaq_data: Optional[pd.DataFrame],
+                          merra2_data: Optional[xr.Dataset],
+                          timestamp: datetime) -> pd.DataFrame:
+        """Etapa de cálculo de una ciudad: fusión de fuentes + métricas AQI"""
+        fused_data = self.fuse_data_sources(lons, lats, tempo_data, openaq_data, merra2_data, timestamp)
+        return self.calculate_air_quality_metrics(fused_data)
+
+    def fuse_data_sources(self, lons: np.ndarray, lats: np.ndarray,
                          tempo_data: Optional[xr.Dataset], 
                          openaq_data: Optional[pd.DataFrame],
                          merra2_data: Optional[xr.Dataset],
@@ -189,234 +353,273 @@ class MultiCityETL:
         """
         Fusiona datos de diferentes fuentes en una grilla unificada
         """
-        # Crear DataFrame base con la grilla
-        points_data = []
-        
-        for i in range(lon_grid.shape[0]):
-            for j in range(lon_grid.shape[1]):
-                lon = lon_grid[i, j]
-                lat = lat_grid[i, j]
-                
-                point = {
-                    'longitude': lon,
-                    'latitude': lat,
-                    'timestamp': timestamp,
-                    # Inicializar con valores por defecto
-                    'no2_column': np.nan,
-                    'o3_column': np.nan,
-                    'pm25_surface': np.nan,
-                    'temperature': np.nan,
-                    'humidity': np.nan,
-                    'wind_speed': np.nan,
-                    'wind_direction': np.nan,
-                    'pressure': np.nan,
-                    'data_quality': 0.0
-                }
-                
-                # Interpolar datos TEMPO si están disponibles
-                if tempo_data is not None:
-                    point.update(self.interpolate_tempo_data(tempo_data, lon, lat))
-                
-                # Usar datos OpenAQ cercanos si están disponibles
-                if openaq_data is not None:
-                    point.update(self.interpolate_openaq_data(openaq_data, lon, lat))
-                
-                # Interpolar datos MERRA-2 si están disponibles
-                if merra2_data is not None:
-                    point.update(self.interpolate_merra2_data(merra2_data, lon, lat))
-                
-                points_data.append(point)
-        
-        df = pd.DataFrame(points_data)
+        # Crear DataFrame base con la grilla aplanada
+        n_points = lons.size
+        
+        # Una columna = un array 1-D contiguo propio (copy=False evita
+        # consolidarlas en un único bloque 2-D); NaN / 0.0 por defecto
+        df = pd.DataFrame({
+            'longitude': lons,
+            'latitude': lats,
+            'timestamp': timestamp,
+            **{col: np.full(n_points, np.nan, dtype=np.float32)
+               for col in ('no2_column', 'o3_column', 'pm25_surface', 'temperature',
+                           'humidity', 'wind_speed', 'wind_direction', 'pressure')},
+            'data_quality': np.zeros(n_points, dtype=np.float32)
+        }, copy=False)
+        
+        # Interpolar datos TEMPO si están disponibles
+        if tempo_data is not None:
+            tempo_df = self.interpolate_tempo_batch(tempo_data, lons, lats)
+            for col in tempo_df.columns:
+                df[col] = tempo_df[col].to_numpy(dtype=np.float32)
+        
+        # Usar datos OpenAQ cercanos si están disponibles
+        if openaq_data is not None:
+            df.update(self.interpolate_openaq_batch(openaq_data, lons, lats).astype(np.float32))
+        
+        # Interpolar datos MERRA-2 si están disponibles
+        if merra2_data is not None:
+            merra2_df = self.interpolate_merra2_batch(merra2_data, lons, lats)
+            for col in merra2_df.columns:
+                df[col] = merra2_df[col].to_numpy(dtype=np.float32)
         
         # Aplicar filtros de calidad
         df = self.apply_quality_filters(df)
         
         return df
     
-    def interpolate_tempo_data(self, tempo_data: xr.Dataset, lon: float, lat: float) -> Dict:
-        """Interpola datos TEMPO para un punto específico"""
+    def interpolate_regular_grid(self, ds: xr.Dataset, variables: List[str],
+                                 lons: np.ndarray, lats: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Interpola variables de una grilla regular lat/lon en todos los puntos
+        
+        Si la grilla es regular usa el kernel bilineal de utils_math; si no,
+        construye un RegularGridInterpolator por variable. En ambos casos se
+        evalúan todos los puntos en una sola llamada vectorizada.
+        """
+        # Ambos métodos requieren coordenadas crecientes
+        ds = ds.sortby(['latitude', 'longitude'])
+        lat = ds['latitude'].values
+        lon = ds['longitude'].values
+        
+        regular = lat.size > 1 and lon.size > 1
+        if regular:
+            dlat = (lat[-1] - lat[0]) / (lat.size - 1)
+            dlon = (lon[-1] - lon[0]) / (lon.size - 1)
+            regular = np.allclose(np.diff(lat), dlat) and np.allclose(np.diff(lon), dlon)
+        
+        points = np.column_stack([lats, lons])
+        
+        result = {}
+        for var in variables:
+            values = ds[var].transpose('latitude', 'longitude').values
+            if regular:
+                result[var] = bilinear2d_regular(values, lat[0], dlat, lon[0], dlon, lats, lons)
+            else:
+                interpolator = RegularGridInterpolator(
+                    (lat, lon), values, method='linear', bounds_error=False, fill_value=np.nan
+                )
+                result[var] = interpolator(points)
+        
+        return result
+    
+    def interpolate_tempo_batch(self, tempo_data: xr.Dataset, lons: np.ndarray, lats: np.ndarray) -> pd.DataFrame:
+        """Interpola datos TEMPO para todos los puntos de la grilla en una sola llamada"""
         try:
-            # Interpolar NO2 y O3
-            no2_val = float(tempo_data['no2_column'].interp(longitude=lon, latitude=lat, method='linear'))
-            o3_val = float(tempo_data['o3_column'].interp(longitude=lon, latitude=lat, method='linear'))
+            # Interpolar NO2 y O3 sobre todos los puntos
+            points = self.interpolate_regular_grid(tempo_data, ['no2_column', 'o3_column'], lons, lats)
             
-            return {
-                'no2_column': no2_val if not np.isnan(no2_val) else np.nan,
-                'o3_column': o3_val if not np.isnan(o3_val) else np.nan,
+            return pd.DataFrame({
+                'no2_column': points['no2_column'],
+                'o3_column': points['o3_column'],
                 'data_quality': 0.8  # TEMPO tiene alta calidad
-            }
+            })
         except:
-            return {'data_quality': 0.1}
+            return pd.DataFrame({'data_quality': np.full(len(lons), 0.1)})
     
-    def interpolate_openaq_data(self, openaq_data: pd.DataFrame, lon: float, lat: float) -> Dict:
-        """Interpola datos OpenAQ para un punto específico usando estaciones cercanas"""
+    def interpolate_openaq_batch(self, openaq_data: pd.DataFrame, lons: np.ndarray, lats: np.ndarray) -> pd.DataFrame:
+        """Interpola datos OpenAQ para todos los puntos usando las estaciones más cercanas (KD-tree)"""
         try:
-            # Encontrar estaciones dentro de un radio de 50km
-            distances = np.sqrt((openaq_data['longitude'] - lon)**2 + (openaq_data['latitude'] - lat)**2)
-            nearby = openaq_data[distances < 0.5]  # ~50km
+            # Buscar hasta 8 estaciones dentro de un radio de 50km
+            tree = cKDTree(openaq_data[['longitude', 'latitude']].values)
+            k = min(8, len(openaq_data))
+            distances, idx = tree.query(np.column_stack([lons, lats]), k=k, distance_upper_bound=0.5)  # ~50km
+            distances = distances.reshape(len(lons), k)
+            idx = idx.reshape(len(lons), k)
+            
+            # Usar promedio ponderado por distancia inversa (vecinos ausentes pesan 0)
+            found = np.isfinite(distances)
+            weights = np.where(found, 1.0 / (distances + 0.001), 0.0)
+            pm25_values = np.append(openaq_data['pm25'].fillna(0).to_numpy(dtype=float), 0.0)
+            n_nearby = found.sum(axis=1)
             
-            if len(nearby) > 0:
-                # Usar promedio ponderado por distancia inversa
-                weights = 1.0 / (distances[distances < 0.5] + 0.001)
-                
-                pm25_val = np.average(nearby['pm25'].fillna(0), weights=weights)
-                
-                return {
-                    'pm25_surface': pm25_val,
-                    'data_quality': min(1.0, 0.6 + len(nearby) * 0.1)  # Más estaciones = mejor calidad
-                }
+            with np.errstate(invalid='ignore', divide='ignore'):
+                pm25_val = (weights * pm25_values[idx]).sum(axis=1) / weights.sum(axis=1)
+            
+            return pd.DataFrame({
+                'pm25_surface': np.where(n_nearby > 0, pm25_val, np.nan),
+                'data_quality': np.where(n_nearby > 0, np.minimum(1.0, 0.6 + n_nearby * 0.1), np.nan)  # Más estaciones = mejor calidad
+            })
         except:
-            pass
-        
-        return {}
+            return pd.DataFrame(index=range(len(lons)))
     
-    def interpolate_merra2_data(self, merra2_data: xr.Dataset, lon: float, lat: float) -> Dict:
-        """Interpola datos MERRA-2 para un punto específico"""
+    def interpolate_merra2_batch(self, merra2_data: xr.Dataset, lons: np.ndarray, lats: np.ndarray) -> pd.DataFrame:
+        """Interpola datos MERRA-2 para todos los puntos de la grilla en una sola llamada"""
         try:
-            temp_val = float(merra2_data['temperature'].interp(longitude=lon, latitude=lat, method='linear'))
-            humidity_val = float(merra2_data['humidity'].interp(longitude=lon, latitude=lat, method='linear'))
-            wind_speed_val = float(merra2_data['wind_speed'].interp(longitude=lon, latitude=lat, method='linear'))
-            wind_dir_val = float(merra2_data['wind_direction'].interp(longitude=lon, latitude=lat, method='linear'))
-            pressure_val = float(merra2_data['pressure'].interp(longitude=lon, latitude=lat, method='linear'))
+            points = self.interpolate_regular_grid(
+                merra2_data, ['temperature', 'humidity', 'wind_speed', 'wind_direction', 'pressure'], lons, lats
+            )
             
-            return {
-                'temperature': temp_val - 273.15 if not np.isnan(temp_val) else np.nan,  # K to C
-                'humidity': humidity_val if not np.isnan(humidity_val) else np.nan,
-                'wind_speed': wind_speed_val if not np.isnan(wind_speed_val) else np.nan,
-                'wind_direction': wind_dir_val if not np.isnan(wind_dir_val) else np.nan,
-                'pressure': pressure_val if not np.isnan(pressure_val) else np.nan
-            }
+            return pd.DataFrame({
+                'temperature': points['temperature'] - 273.15,  # K to C
+                'humidity': points['humidity'],
+                'wind_speed': points['wind_speed'],
+                'wind_direction': points['wind_direction'],
+                'pressure': points['pressure']
+            })
         except:
-            return {}
+            return pd.DataFrame(index=range(len(lons)))
     
     def apply_quality_filters(self, df: pd.DataFrame) -> pd.DataFrame:
         """Aplica filtros de calidad a los datos"""
-        # Filtrar valores extremos
-        df.loc[df['no2_column'] < 0, 'no2_column'] = np.nan
-        df.loc[df['no2_column'] > 1e16, 'no2_column'] = np.nan
-        
-        df.loc[df['pm25_surface'] < 0, 'pm25_surface'] = np.nan
-        df.loc[df['pm25_surface'] > 500, 'pm25_surface'] = np.nan
-        
-        df.loc[df['temperature'] < -50, 'temperature'] = np.nan
-        df.loc[df['temperature'] > 60, 'temperature'] = np.nan
+        # Filtrar valores extremos (fuera de [mínimo, máximo] -> NaN)
+        for col, lo, hi in (('no2_column', 0, 1e16),
+                            ('pm25_surface', 0, 500),
+                            ('temperature', -50, 60)):
+            arr = df[col].to_numpy(copy=True)
+            arr[(arr < lo) | (arr > hi)] = np.nan
+            df[col] = arr
         
         return df
     
     def calculate_air_quality_metrics(self, df: pd.DataFrame) -> pd.DataFrame:
         """Calcula métricas de calidad del aire"""
-        # AQI para PM2.5 (EPA standard)
-        df['aqi_pm25'] = df['pm25_surface'].apply(self.pm25_to_aqi)
+        pm25 = df['pm25_surface'].to_numpy(dtype=np.float64)
+        no2_column = df['no2_column'].to_numpy(dtype=np.float64)
+        
+        kernel = _aqi_kernel()
+        if kernel is not None:
+            # Una sola pasada: AQI PM2.5 / NO2, combinado y categoría
+            n_points = len(df)
+            aqi_pm25 = np.empty(n_points, dtype=np.float32)
+            aqi_no2 = np.empty(n_points, dtype=np.float32)
+            aqi_combined = np.empty(n_points, dtype=np.float32)
+            category = np.empty(n_points, dtype=np.int8)
+            kernel(pm25, no2_column,
+                   PM25_AQI_UPPER, PM25_AQI_LOW, PM25_AQI_BASE, PM25_AQI_SLOPE,
+                   NO2_AQI_UPPER, NO2_AQI_LOW, NO2_AQI_BASE, NO2_AQI_SLOPE,
+                   AQI_CATEGORY_UPPER, aqi_pm25, aqi_no2, aqi_combined, category)
+        else:
+            # AQI para PM2.5 (EPA standard)
+            aqi_pm25 = self.pm25_array_to_aqi(pm25).astype(np.float32)
+            
+            # AQI para NO2 (basado en columna troposférica)
+            aqi_no2 = self.no2_column_array_to_aqi(no2_column).astype(np.float32)
+            
+            # AQI combinado (tomar el máximo)
+            aqi_combined = np.fmax(aqi_pm25, aqi_no2)
+            
+            # Categoría de calidad del aire
+            category = np.where(
+                np.isnan(aqi_combined),
+                len(AQI_CATEGORY_UPPER) + 1,
+                np.searchsorted(AQI_CATEGORY_UPPER, aqi_combined, side='left')
+            ).astype(np.int8)
+        
+        df['aqi_pm25'] = aqi_pm25
+        df['aqi_no2'] = aqi_no2
+        df['aqi_combined'] = aqi_combined
+        df['air_quality_category'] = pd.Categorical.from_codes(
+            category, categories=AQI_CATEGORY_LABELS, ordered=True
+        )
         
-        # AQI para NO2 (basado en columna troposférica)
-        df['aqi_no2'] = df['no2_column'].apply(self.no2_column_to_aqi)
+        return df
+    
+    def pm25_array_to_aqi(self, pm25: np.ndarray) -> np.ndarray:
+        """Convierte PM2.5 (μg/m³) a AQI para un array completo"""
+        pm25 = np.asarray(pm25, dtype=float)
         
-        # AQI combinado (tomar el máximo)
-        df['aqi_combined'] = df[['aqi_pm25', 'aqi_no2']].max(axis=1)
+        # Tramo EPA de cada valor: primer límite superior >= valor
+        seg = np.searchsorted(PM25_AQI_UPPER, pm25, side='left')
+        seg = np.minimum(seg, len(PM25_AQI_UPPER))
         
-        # Categoría de calidad del aire
-        df['air_quality_category'] = df['aqi_combined'].apply(self.aqi_to_category)
+        # El último tramo (> 250.4) satura a 249.9 μg/m³ sobre su base
+        offset = pm25 - PM25_AQI_BASE[seg]
+        offset = np.where(seg == len(PM25_AQI_UPPER), np.minimum(offset, 249.9), offset)
         
-        return df
-    
-    def pm25_to_aqi(self, pm25_val: float) -> float:
-        """Convierte PM2.5 (μg/m³) a AQI"""
-        if pd.isna(pm25_val):
-            return np.nan
-        
-        # Breakpoints EPA para PM2.5
-        if pm25_val <= 12.0:
-            return (50 / 12.0) * pm25_val
-        elif pm25_val <= 35.4:
-            return 50 + ((100 - 50) / (35.4 - 12.1)) * (pm25_val - 12.1)
-        elif pm25_val <= 55.4:
-            return 100 + ((150 - 100) / (55.4 - 35.5)) * (pm25_val - 35.5)
-        elif pm25_val <= 150.4:
-            return 150 + ((200 - 150) / (150.4 - 55.5)) * (pm25_val - 55.5)
-        elif pm25_val <= 250.4:
-            return 200 + ((300 - 200) / (250.4 - 150.5)) * (pm25_val - 150.5)
-        else:
-            return 300 + ((500 - 300) / (500.4 - 250.5)) * min(pm25_val - 250.5, 249.9)
+        aqi = PM25_AQI_LOW[seg] + PM25_AQI_SLOPE[seg] * offset
+        return np.where(np.isnan(pm25), np.nan, aqi)
     
-    def no2_column_to_aqi(self, no2_column: float) -> float:
-        """Convierte columna troposférica NO2 a AQI aproximado"""
-        if pd.isna(no2_column):
-            return np.nan
-        
+    def no2_column_array_to_aqi(self, no2_column: np.ndarray) -> np.ndarray:
+        """Convierte columna troposférica NO2 a AQI aproximado para un array completo"""
         # Conversión aproximada basada en correlaciones con surface NO2
         # NO2 column (molec/cm²) -> surface NO2 (ppb) -> AQI
-        surface_no2_approx = no2_column / 2.69e15 * 100  # Aproximación
-        
-        # Breakpoints EPA para NO2
-        if surface_no2_approx <= 53:
-            return (50 / 53) * surface_no2_approx
-        elif surface_no2_approx <= 100:
-            return 50 + ((100 - 50) / (100 - 54)) * (surface_no2_approx - 54)
-        elif surface_no2_approx <= 360:
-            return 100 + ((150 - 100) / (360 - 101)) * (surface_no2_approx - 101)
-        elif surface_no2_approx <= 649:
-            return 150 + ((200 - 150) / (649 - 361)) * (surface_no2_approx - 361)
-        else:
-            return 200 + min((surface_no2_approx - 650) / 10, 100)
-    
-    def aqi_to_category(self, aqi_val: float) -> str:
-        """Convierte AQI a categoría textual"""
-        if pd.isna(aqi_val):
-            return "No Data"
-        elif aqi_val <= 50:
-            return "Good"
-        elif aqi_val <= 100:
-            return "Moderate"
-        elif aqi_val <= 150:
-            return "Unhealthy for Sensitive Groups"
-        elif aqi_val <= 200:
-            return "Unhealthy"
-        elif aqi_val <= 300:
-            return "Very Unhealthy"
-        else:
-            return "Hazardous"
+        surface_no2_approx = np.asarray(no2_column, dtype=float) / 2.69e15 * 100  # Aproximación
+        
+        # Tramo EPA de cada valor: primer límite superior >= valor
+        seg = np.searchsorted(NO2_AQI_UPPER, surface_no2_approx, side='left')
+        seg = np.minimum(seg, len(NO2_AQI_UPPER))
+        
+        aqi = NO2_AQI_LOW[seg] + NO2_AQI_SLOPE[seg] * (surface_no2_approx - NO2_AQI_BASE[seg])
+        
+        # Por encima de 649 ppb el incremento se limita a 100 puntos
+        aqi = np.where(seg == len(NO2_AQI_UPPER), np.minimum(aqi, 300.0), aqi)
+        return np.where(np.isnan(surface_no2_approx), np.nan, aqi)
     
-    async def save_city_data(self, city_id: str, city_config: Dict, data: pd.DataFrame):
+    async def save_city_data(self, city_id: str, city_config: Dict, data: pd.DataFrame,
+                             timestamp: datetime):
         """Guarda datos de una ciudad en múltiples formatos"""
         city_dir = self.output_dir / city_id
         city_dir.mkdir(exist_ok=True)
         
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        # 1. CSV con timestamp (se serializa una sola vez)
+        csv_timestamped = city_dir / f"{city_id}_{timestamp.strftime('%Y%m%d_%H%M%S')}.csv"
+        data.to_csv(csv_timestamped, index=False)
         
-        # 1. CSV para frontend
+        # 2. CSV para frontend: enlace duro al anterior (copia si el FS no lo soporta)
         csv_file = city_dir / f"{city_id}_latest.csv"
-        data.to_csv(csv_file, index=False)
-        
-        # 2. CSV con timestamp
-        csv_timestamped = city_dir / f"{city_id}_{timestamp}.csv"
-        data.to_csv(csv_timestamped, index=False)
+        csv_file.unlink(missing_ok=True)
+        try:
+            os.link(csv_timestamped, csv_file)
+        except OSError:
+            shutil.copyfile(csv_timestamped, csv_file)
+        
+        # 3. Parquet columnar para lecturas posteriores (más compacto que CSV)
+        parquet_file = city_dir / f"{city_id}_latest.parquet"
+        data.to_parquet(parquet_file, engine='pyarrow', compression='zstd', index=False)
+        
+        # 4. JSON resumen para API (cada máscara de NaN se calcula una sola vez)
+        points_with_tempo = int(np.count_nonzero(~np.isnan(data['no2_column'].to_numpy())))
+        points_with_openaq = int(np.count_nonzero(~np.isnan(data['pm25_surface'].to_numpy())))
+        points_with_weather = int(np.count_nonzero(~np.isnan(data['temperature'].to_numpy())))
+        aqi = data['aqi_combined'].to_numpy()
+        aqi_valid = aqi[~np.isnan(aqi)]
+        category_mode = data['air_quality_category'].mode()
         
-        # 3. JSON resumen para API
         summary = {
             "city_id": city_id,
             "name": city_config['name'],
             "bbox": city_config['bbox'],
             "population": city_config['population'],
             "timezone": city_config['timezone'],
-            "last_update": datetime.utcnow().isoformat(),
+            "last_update": timestamp.isoformat(),
             "total_points": len(data),
             "data_quality": {
                 "mean_quality": float(data['data_quality'].mean()),
-                "points_with_tempo": int((~data['no2_column'].isna()).sum()),
-                "points_with_openaq": int((~data['pm25_surface'].isna()).sum()),
-                "points_with_weather": int((~data['temperature'].isna()).sum())
+                "points_with_tempo": points_with_tempo,
+                "points_with_openaq": points_with_openaq,
+                "points_with_weather": points_with_weather
             },
             "air_quality_summary": {
-                "mean_aqi": float(data['aqi_combined'].mean()) if not data['aqi_combined'].isna().all() else None,
-                "max_aqi": float(data['aqi_combined'].max()) if not data['aqi_combined'].isna().all() else None,
-                "dominant_category": data['air_quality_category'].mode().iloc[0] if len(data['air_quality_category'].mode()) > 0 else "No Data"
+                "mean_aqi": float(aqi_valid.mean()) if aqi_valid.size else None,
+                "max_aqi": float(aqi_valid.max()) if aqi_valid.size else None,
+                "dominant_category": category_mode.iloc[0] if len(category_mode) > 0 else "No Data"
             }
         }
         
         summary_file = city_dir / f"{city_id}_summary.json"
-        with open(summary_file, 'w') as f:
-            json.dump(summary, f, indent=2)
+        summary_file.write_bytes(_json_bytes(summary))
         
         logger.info(f"  💾 Datos guardados en {city_dir}")
     
@@ -438,8 +641,9 @@ class MultiCityETL:
         
         logger.info(f"📍 Procesando {len(cities_to_process)} ciudades: {list(cities_to_process.keys())}")
         
-        # Procesar ciudades en paralelo (limitado para no sobrecargar APIs)
-        semaphore = asyncio.Semaphore(3)  # Máximo 3 ciudades simultáneas
+        # Procesar ciudades en paralelo; cada fuente de datos limita sus
+        # propias peticiones simultáneas (endpoint_semaphores)
+        semaphore = asyncio.Semaphore(8)  # Máximo 8 ciudades simultáneas
         
         async def process_city_with_semaphore(city_id, city_config):
             async with semaphore:
@@ -451,17 +655,18 @@ class MultiCityETL:
             for city_id, city_config in cities_to_process.items()
         ]
         
-        # Ejecutar todas las tareas
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Procesar resultados
+        # Procesar resultados a medida que cada ciudad termina
         successful = []
         failed = []
         
-        for result in results:
-            if isinstance(result, Exception):
-                failed.append(str(result))
-            elif result.get('status') == 'success':
+        for future in asyncio.as_completed(tasks):
+            try:
+                result = await future
+            except Exception as e:
+                failed.append(str(e))
+                continue
+            
+            if result.get('status') == 'success':
                 successful.append(result)
             else:
                 failed.append(result)
@@ -500,15 +705,14 @@ class MultiCityETL:
             "next_scheduled_run": (end_time + timedelta(hours=1)).isoformat()
         }
         
-        # Guardar reporte
+        # Guardar reporte (serializado una sola vez)
+        report_bytes = _json_bytes(report)
         report_file = self.output_dir / f"etl_report_{end_time.strftime('%Y%m%d_%H%M%S')}.json"
-        with open(report_file, 'w') as f:
-            json.dump(report, f, indent=2)
+        report_file.write_bytes(report_bytes)
         
         # También guardar como "latest"
         latest_report = self.output_dir / "etl_report_latest.json"
-        with open(latest_report, 'w') as f:
-            json.dump(report, f, indent=2)
+        latest_report.write_bytes(report_bytes)
         
         logger.info(f"📊 Reporte guardado: {report_file}")
         
@@ -534,15 +738,13 @@ async def main():
     
     args = parser.parse_args()
     
-    # Inicializar ETL
-    etl = MultiCityETL()
-    
     if args.test:
         logger.info("🧪 Ejecutando en modo TEST con datos sintéticos")
         # En modo test, usar generadores de datos sintéticos
     
-    # Ejecutar ETL
+    # Inicializar y ejecutar ETL
     try:
+        etl = MultiCityETL()
         stats = await etl.run_complete_etl(cities=args.cities)
         logger.info(f"🎯 ETL completado: {stats}")
         return 0
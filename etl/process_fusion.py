@@ -10,24 +10,64 @@ import os
 import pandas as pd
 import xarray as xr
 import numpy as np
+import dask
 from datetime import datetime
-from typing import Optional, Dict, Any
+from functools import lru_cache
+from typing import Optional, Dict, Any, Tuple
 import warnings
+import threading
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from scipy.spatial import cKDTree
+from numcodecs import Blosc
+import pyarrow.parquet as pq
+import zarr
+
+try:
+    from joblib import Memory
+except ImportError:
+    Memory = None
 
 from utils_math import (
     compute_wind_speed, 
     compute_risk, 
     classify_risk,
-    validate_risk_dataset
+    risk_class_counts,
+    validate_risk_dataset,
+    RISK_CLASS_LABELS
 )
+from utils import load_demo_table, CACHE_DIR
 
 # Configuración de rutas
 DATA_RAW = os.path.join(os.path.dirname(__file__), "../data/zarr_store")
 DATA_OUT = os.path.join(os.path.dirname(__file__), "../data/processed")
 
+# Parámetros y columnas de OpenAQ usados en la fusión
+GROUND_PARAMETERS = ["pm25", "no2", "o3", "pm10", "so2", "co"]
+OPENAQ_COLUMNS = ["parameter", "value", "lat", "lon"]
+
+# Chunks espaciales para escritura Zarr (256x256 float64 ≈ 0.5 MB sin comprimir)
+ZARR_SPATIAL_CHUNK = 256
+
 # Crear directorio de salida
 os.makedirs(DATA_OUT, exist_ok=True)
 
+# Caché en disco de etapas costosas (desactivada si joblib no está instalado)
+memory = Memory(str(CACHE_DIR / "fusion"), verbose=0) if Memory is not None else None
+_cached = memory.cache if memory is not None else (lambda func: func)
+
+_print_lock = threading.Lock()
+
+def _log(*args, **kwargs):
+    """print protegido por lock para las cargas concurrentes."""
+    with _print_lock:
+        print(*args, **kwargs)
+
+def _file_key(path: str) -> Tuple[str, float, int]:
+    """Clave de caché barata para un archivo: (ruta, mtime, tamaño)."""
+    stat = os.stat(path)
+    return path, stat.st_mtime, stat.st_size
+
 def load_dataset_safe(path: str, description: str = "") -> Optional[xr.Dataset]:
     """
     Abre un dataset Zarr/NetCDF de forma segura con manejo de errores.
@@ -40,23 +80,52 @@ def load_dataset_safe(path: str, description: str = "") -> Optional[xr.Dataset]:
         Dataset o None si falla
     """
     try:
-        print(f"📂 Cargando {description}: {os.path.basename(path)}")
+        _log(f"📂 Cargando {description}: {os.path.basename(path)}")
         
+        # Apertura perezosa respetando los chunks en disco
         if path.endswith('.zarr'):
-            ds = xr.open_zarr(path)
+            try:
+                ds = xr.open_zarr(path, chunks={}, consolidated=True)
+            except (KeyError, FileNotFoundError):
+                # Store sin .zmetadata (escrito sin consolidar)
+                ds = xr.open_zarr(path, chunks={}, consolidated=False)
         elif path.endswith(('.nc', '.nc4')):
-            ds = xr.open_dataset(path)
+            ds = xr.open_dataset(path, chunks={}, engine="h5netcdf")
         else:
-            print(f"⚠️  Formato no reconocido: {path}")
+            _log(f"⚠️  Formato no reconocido: {path}")
             return None
             
-        print(f"✅ {description} cargado: {dict(ds.dims)} variables: {list(ds.data_vars.keys())}")
+        _log(f"✅ {description} cargado: {dict(ds.dims)} variables: {list(ds.data_vars.keys())}")
         return ds
         
     except Exception as e:
-        print(f"❌ Error cargando {description} desde {path}: {e}")
+        _log(f"❌ Error cargando {description} desde {path}: {e}")
         return None
 
+@_cached
+def _read_openaq(path: str, mtime: float, size: int) -> pd.DataFrame:
+    """Lee un archivo OpenAQ; mtime y size solo forman parte de la clave de caché."""
+    if path.endswith('.parquet'):
+        # Proyección de columnas y filtro por parámetro aplicados al leer el archivo
+        available = set(pq.read_schema(path).names)
+        columns = [c for c in OPENAQ_COLUMNS if c in available]
+        filters = None
+        if "parameter" in available:
+            wanted = GROUND_PARAMETERS + [p.upper() for p in GROUND_PARAMETERS]
+            filters = [("parameter", "in", wanted)]
+        table = pq.read_table(path, columns=columns, filters=filters,
+                              read_dictionary=["parameter"] if "parameter" in available else None)
+        df = table.to_pandas()
+    else:
+        # Lector CSV multihilo de pyarrow con columnas y tipos explícitos
+        header = pd.read_csv(path, nrows=0).columns
+        columns = [c for c in OPENAQ_COLUMNS if c in header]
+        dtypes = {"parameter": "category", "value": "float32", "lat": "float64", "lon": "float64"}
+        df = pd.read_csv(path, engine="pyarrow", usecols=columns,
+                         dtype={c: t for c, t in dtypes.items() if c in columns})
+    df.attrs["source_path"] = path
+    return df
+
 def load_openaq_data() -> Optional[pd.DataFrame]:
     """
     Carga datos de OpenAQ desde archivos Parquet o CSV.
@@ -75,21 +144,18 @@ def load_openaq_data() -> Optional[pd.DataFrame]:
     for path in possible_paths:
         if os.path.exists(path):
             try:
-                print(f"📂 Cargando OpenAQ: {os.path.basename(path)}")
+                _log(f"📂 Cargando OpenAQ: {os.path.basename(path)}")
                 
-                if path.endswith('.parquet'):
-                    df = pd.read_parquet(path)
-                else:
-                    df = pd.read_csv(path)
+                df = _read_openaq(*_file_key(path))
                 
-                print(f"✅ OpenAQ cargado: {len(df)} registros, parámetros: {df['parameter'].unique()}")
+                _log(f"✅ OpenAQ cargado: {len(df)} registros, parámetros: {df['parameter'].unique()}")
                 return df
                 
             except Exception as e:
-                print(f"⚠️  Error cargando {path}: {e}")
+                _log(f"⚠️  Error cargando {path}: {e}")
                 continue
     
-    print("⚠️  No se encontraron datos de OpenAQ")
+    _log("⚠️  No se encontraron datos de OpenAQ")
     return None
 
 def interpolate_ground_data(df: pd.DataFrame, target_grid: xr.DataArray, 
@@ -106,42 +172,72 @@ def interpolate_ground_data(df: pd.DataFrame, target_grid: xr.DataArray,
         Dict con DataArrays interpolados por parámetro
     """
     if parameters is None:
-        parameters = ["pm25", "no2", "o3", "pm10", "so2", "co"]
+        parameters = GROUND_PARAMETERS
     
     interpolated = {}
     
-    for param in parameters:
-        param_data = df[df["parameter"].str.lower() == param.lower()]
+    # Puntos de la rejilla objetivo (se calculan una sola vez para todos los parámetros)
+    grid_lat = target_grid["lat"].values
+    grid_lon = target_grid["lon"].values
+    lat2d, lon2d = np.meshgrid(grid_lat, grid_lon, indexing="ij")
+    targets = np.column_stack([lat2d.ravel(), lon2d.ravel()])
+    
+    # Filas de los parámetros pedidos, con código de parámetro y de estación
+    names = [param.lower() for param in parameters]
+    param_codes = pd.Categorical(df["parameter"].str.lower(), categories=names).codes
+    rows = param_codes >= 0
+    param_codes = param_codes[rows]
+    lats = df["lat"].to_numpy(dtype=np.float64)[rows]
+    lons = df["lon"].to_numpy(dtype=np.float64)[rows]
+    values = df["value"].to_numpy(dtype=np.float64)[rows]
+    station_codes, stations = pd.factorize(pd.MultiIndex.from_arrays([lats, lons]))
+    n_stations = len(stations)
+    
+    # Tabla densa (parámetro, estación); lecturas repetidas se promedian
+    flat = param_codes.astype(np.int64) * n_stations + station_codes
+    size = len(names) * n_stations
+    counts = np.bincount(flat, minlength=size)
+    sums = np.bincount(flat, weights=values, minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        table = (sums / counts).astype(np.float32).reshape(len(names), n_stations)
+    
+    # Un único KD-tree sobre todas las estaciones y una única consulta de k vecinos
+    if n_stations:
+        station_coords = np.column_stack([
+            stations.get_level_values(0).to_numpy(dtype=np.float64),
+            stations.get_level_values(1).to_numpy(dtype=np.float64)
+        ])
+        tree = cKDTree(station_coords)
+        k = min(8, n_stations)
+        _, neighbors = tree.query(targets, k=k, workers=-1)
+        neighbors = neighbors.reshape(len(targets), k)
+    
+    for i, param in enumerate(parameters):
+        reporting = ~np.isnan(table[i]) if n_stations else np.zeros(0, dtype=bool)
         
-        if param_data.empty:
+        if not reporting.any():
             print(f"⚠️  No hay datos para {param}")
             continue
         
-        # Crear DataArray con coordenadas
         try:
-            values = param_data["value"].values
-            lats = param_data["lat"].values
-            lons = param_data["lon"].values
+            # Estación más cercana que reporta el parámetro entre los k vecinos
+            candidates = table[i][neighbors]
+            valid = ~np.isnan(candidates)
+            result = candidates[np.arange(len(targets)), valid.argmax(axis=1)]
             
-            # Crear array temporal con coordenadas de estaciones
-            station_data = xr.DataArray(
-                values,
-                dims=["station"],
-                coords={
-                    "lat": ("station", lats),
-                    "lon": ("station", lons)
-                }
-            )
+            # Celdas sin ninguna estación del parámetro entre los k vecinos
+            missing = ~valid.any(axis=1)
+            if missing.any():
+                subset = np.flatnonzero(reporting)
+                _, idx = cKDTree(station_coords[subset]).query(targets[missing], k=1, workers=-1)
+                result[missing] = table[i][subset[idx]]
             
-            # Interpolar a la rejilla objetivo
-            interpolated_data = station_data.interp_like(
-                target_grid, 
-                method="nearest", 
-                kwargs={"fill_value": np.nan}
+            interpolated[param] = xr.DataArray(
+                result.reshape(lat2d.shape),
+                dims=["lat", "lon"],
+                coords={"lat": grid_lat, "lon": grid_lon}
             )
-            
-            interpolated[param] = interpolated_data
-            print(f"✅ {param.upper()} interpolado: {len(param_data)} estaciones → rejilla")
+            print(f"✅ {param.upper()} interpolado: {int(reporting.sum())} estaciones → rejilla")
             
         except Exception as e:
             print(f"❌ Error interpolando {param}: {e}")
@@ -149,6 +245,58 @@ def interpolate_ground_data(df: pd.DataFrame, target_grid: xr.DataArray,
     
     return interpolated
 
+@_cached
+def _interpolate_openaq(path: str, mtime: float, size: int,
+                        grid_lat: np.ndarray, grid_lon: np.ndarray) -> Dict[str, xr.DataArray]:
+    """
+    Versión cacheable de interpolate_ground_data, indexada por el archivo
+    OpenAQ (ruta, mtime, tamaño) y las coordenadas de la rejilla.
+    """
+    df = _read_openaq(path, mtime, size)
+    return interpolate_ground_data(df, xr.Dataset(coords={"lat": grid_lat, "lon": grid_lon}))
+
+def df_to_grid(df: pd.DataFrame, value_cols: list = None) -> xr.Dataset:
+    """
+    Convierte una tabla de puntos (latitude, longitude, valores...) en un
+    Dataset lat/lon sin pasar por MultiIndex + to_xarray.
+    
+    Las celdas sin puntos quedan en NaN; los puntos duplicados en la misma
+    coordenada se promedian.
+    
+    Args:
+        df: DataFrame con columnas 'latitude' y 'longitude'
+        value_cols: Columnas a convertir (por defecto todas las demás)
+        
+    Returns:
+        Dataset float32 con dimensiones (lat, lon)
+    """
+    if value_cols is None:
+        value_cols = [c for c in df.columns if c not in ("latitude", "longitude")]
+    
+    lats, lat_idx = np.unique(df["latitude"].to_numpy(), return_inverse=True)
+    lons, lon_idx = np.unique(df["longitude"].to_numpy(), return_inverse=True)
+    shape = (len(lats), len(lons))
+    flat_idx = lat_idx * len(lons) + lon_idx
+    counts = np.bincount(flat_idx, minlength=len(lats) * len(lons))
+    
+    data_vars = {}
+    for col in value_cols:
+        sums = np.bincount(flat_idx, weights=df[col].to_numpy(dtype=np.float64),
+                           minlength=counts.size)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            grid = (sums / counts).astype(np.float32)
+        data_vars[col] = (("lat", "lon"), grid.reshape(shape))
+    
+    return xr.Dataset(data_vars, coords={"lat": lats, "lon": lons})
+
+@lru_cache(maxsize=32)
+def _lowercase_names(names: Tuple[str, ...]) -> Dict[str, str]:
+    """Índice {nombre en minúsculas: nombre original} de las variables de un dataset."""
+    lower_map = {}
+    for name in names:
+        lower_map.setdefault(str(name).lower(), name)
+    return lower_map
+
 def extract_variable_safe(ds: xr.Dataset, var_patterns: list) -> Optional[xr.DataArray]:
     """
     Extrae una variable de un dataset usando patrones de búsqueda.
@@ -163,22 +311,257 @@ def extract_variable_safe(ds: xr.Dataset, var_patterns: list) -> Optional[xr.Dat
     if ds is None:
         return None
     
+    lower_map = _lowercase_names(tuple(ds.data_vars))
+    
     for pattern in var_patterns:
         # Búsqueda exacta
         if pattern in ds.data_vars:
             return ds[pattern]
         
+        # Búsqueda exacta sin distinguir mayúsculas
+        pattern_lower = pattern.lower()
+        if pattern_lower in lower_map:
+            return ds[lower_map[pattern_lower]]
+        
         # Búsqueda por contenido (case-insensitive)
-        for var_name in ds.data_vars:
-            if pattern.lower() in var_name.lower():
+        for name_lower, var_name in lower_map.items():
+            if pattern_lower in name_lower:
                 return ds[var_name]
     
     return None
 
-def process_fusion() -> xr.Dataset:
+def _half_spacing(index: pd.Index) -> float:
+    """Mitad del paso de una coordenada regular (inf si tiene un solo punto)."""
+    if len(index) < 2:
+        return np.inf
+    return float(np.abs(np.diff(index.to_numpy(dtype=np.float64))).max()) / 2 * 1.001
+
+def align_to_reference_grid(variables: Dict[str, xr.DataArray],
+                            tolerance: Optional[float] = None) -> xr.Dataset:
+    """
+    Combina variables de fuentes con rejillas distintas sobre una rejilla común.
+    
+    La rejilla de referencia es la más fina (más celdas lat/lon); el resto se
+    reindexa por vecino más cercano. Por defecto la tolerancia es medio paso
+    de la rejilla de origen, de modo que solo quedan en NaN las celdas fuera
+    de su cobertura. Con entradas Dask el reindexado queda perezoso hasta la
+    escritura.
+    
+    Args:
+        variables: Dict {nombre: DataArray}
+        tolerance: Distancia máxima en grados (None = medio paso de origen)
+        
+    Returns:
+        Dataset con todas las variables sobre la rejilla de referencia
+    """
+    spatial = [da for da in variables.values() if "lat" in da.dims and "lon" in da.dims]
+    if not spatial:
+        return xr.Dataset(variables)
+    
+    reference = max(spatial, key=lambda da: da.sizes["lat"] * da.sizes["lon"])
+    ref_lat = reference.indexes["lat"]
+    ref_lon = reference.indexes["lon"]
+    
+    aligned = []
+    for name, da in variables.items():
+        if "lat" in da.dims and "lon" in da.dims:
+            for dim, ref_index in (("lat", ref_lat), ("lon", ref_lon)):
+                index = da.indexes[dim]
+                if index.equals(ref_index):
+                    continue
+                dim_tolerance = tolerance if tolerance is not None else _half_spacing(index)
+                da = da.reindex({dim: ref_index}, method="nearest", tolerance=dim_tolerance)
+        aligned.append(da.to_dataset(name=name))
+    
+    return xr.merge(aligned, compat="override")
+
+def encode_risk_for_storage(ds: xr.Dataset) -> Tuple[xr.Dataset, Dict[str, dict]]:
+    """
+    Prepara risk_score y risk_class para guardarse cuantizados en enteros de 8 bits.
+    
+    risk_score (0-100) se empaqueta en uint8 con scale_factor/add_offset CF,
+    de modo que xarray lo decodifica a float al leer. risk_class se guarda
+    como códigos int8 con atributos CF flag_values/flag_meanings.
+    
+    Args:
+        ds: Dataset con risk_score/risk_class en memoria
+        
+    Returns:
+        Tuple con (dataset a guardar, encoding para to_zarr)
+    """
+    out = ds.copy()
+    encoding = {}
+    
+    if "risk_score" in out.data_vars:
+        out["risk_score"] = out["risk_score"].clip(0, 100)
+        encoding["risk_score"] = {
+            "dtype": "uint8",
+            "scale_factor": 1.0,
+            "add_offset": 0.0,
+            "_FillValue": np.uint8(255)
+        }
+    
+    if "risk_class" in out.data_vars:
+        risk_class = out["risk_class"]
+        if risk_class.dtype.kind in "USO":
+            # Etiquetas en texto -> códigos (-1 sin clase)
+            codes = pd.Categorical(
+                np.asarray(risk_class.values).ravel(), categories=RISK_CLASS_LABELS
+            ).codes.astype(np.int8)
+            out["risk_class"] = xr.DataArray(
+                codes.reshape(risk_class.shape),
+                coords=risk_class.coords,
+                dims=risk_class.dims,
+                attrs={
+                    "flag_values": list(range(len(RISK_CLASS_LABELS))),
+                    "flag_meanings": " ".join(RISK_CLASS_LABELS)
+                }
+            )
+        encoding["risk_class"] = {"dtype": "int8"}
+    
+    return out, encoding
+
+def add_zarr_chunk_encoding(ds: xr.Dataset, encoding: Dict[str, dict]) -> Tuple[xr.Dataset, Dict[str, dict]]:
+    """
+    Fija chunks y compresión Blosc/LZ4 para escribir el dataset en Zarr.
+    
+    lat/lon se trocean en bloques de ZARR_SPATIAL_CHUNK; el resto de
+    dimensiones se guardan completas en cada chunk. Los floats usan
+    bit-shuffle y los enteros byte-shuffle.
+    
+    Args:
+        ds: Dataset a guardar
+        encoding: Encoding previo (p.ej. de encode_risk_for_storage)
+        
+    Returns:
+        Tuple con (dataset troceado, encoding completo para to_zarr)
+    """
+    chunks = {
+        dim: min(size, ZARR_SPATIAL_CHUNK) if dim in ("lat", "lon") else size
+        for dim, size in ds.sizes.items()
+    }
+    encoding = {name: dict(enc) for name, enc in encoding.items()}
+    
+    for name, da in ds.data_vars.items():
+        dtype = np.dtype(encoding.get(name, {}).get("dtype", da.dtype))
+        if dtype.kind not in "fiub":
+            continue
+        shuffle = Blosc.BITSHUFFLE if dtype.kind == "f" else Blosc.SHUFFLE
+        encoding.setdefault(name, {}).update({
+            "chunks": tuple(chunks[dim] for dim in da.dims),
+            "compressor": Blosc(cname="lz4", clevel=5, shuffle=shuffle)
+        })
+    
+    return ds.chunk(chunks), encoding
+
+def write_zarr_atomic(ds: xr.Dataset, out_path: str, encoding: Dict[str, dict]) -> None:
+    """
+    Escribe un Zarr en un directorio temporal y lo intercambia con el destino.
+    
+    Los lectores ven siempre un store completo (el anterior o el nuevo); el
+    store anterior se borra después del intercambio, fuera del camino crítico.
+    
+    Args:
+        ds: Dataset a guardar
+        out_path: Ruta final del store
+        encoding: Encoding para to_zarr
+    """
+    tmp_path = out_path + ".tmp"
+    old_path = out_path + ".old"
+    for path in (tmp_path, old_path):
+        if os.path.exists(path):
+            shutil.rmtree(path)
+    
+    ds.to_zarr(tmp_path, mode="w", encoding=encoding, consolidated=True)
+    
+    if os.path.exists(out_path):
+        os.replace(out_path, old_path)
+    os.replace(tmp_path, out_path)
+    
+    if os.path.exists(old_path):
+        shutil.rmtree(old_path, ignore_errors=True)
+
+def _scan_size(path: str) -> int:
+    """Suma recursiva del tamaño de un directorio con os.scandir."""
+    total = 0
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                total += _scan_size(entry.path)
+            else:
+                total += entry.stat(follow_symlinks=False).st_size
+    return total
+
+def zarr_store_size(path: str) -> int:
+    """
+    Tamaño en bytes de un store Zarr en disco.
+    
+    Suma nbytes_stored de los arrays del store; si no es un grupo Zarr
+    legible o algún array no informa su tamaño (-1), recorre el directorio
+    con os.scandir.
+    """
+    try:
+        group = zarr.open_group(zarr.DirectoryStore(path), mode="r")
+        sizes = [array.nbytes_stored for _, array in group.arrays()]
+        if sizes and min(sizes) >= 0:
+            return sum(sizes)
+    except (ValueError, KeyError):
+        pass
+    return _scan_size(path)
+
+def load_tempo_fallback() -> Optional[xr.Dataset]:
+    """
+    Carga TEMPO desde el Zarr demo o, si no existe, desde la tabla demo.
+    
+    Returns:
+        Dataset TEMPO o None
+    """
+    _log("⚠️  TEMPO no disponible, intentando cargar datos demo...")
+    ds_tempo = load_dataset_safe(os.path.join(DATA_RAW, "tempo_demo.zarr"), "TEMPO Demo")
+    if ds_tempo is not None:
+        return ds_tempo
+    
+    # También probar archivos CSV demo si no hay Zarr
+    tempo_csv = os.path.join(DATA_RAW, "tempo_no2_demo.csv")
+    if os.path.exists(tempo_csv) or os.path.exists(tempo_csv[:-4] + ".parquet"):
+        _log("📂 Cargando TEMPO desde archivo demo...")
+        df_tempo = load_demo_table(tempo_csv, ["latitude", "longitude", "no2_tropospheric_column"])
+        if not df_tempo.empty:
+            ds_tempo = df_to_grid(df_tempo)
+            _log(f"✅ TEMPO CSV cargado: {len(df_tempo)} puntos")
+    
+    return ds_tempo
+
+def load_merra2_fallback() -> Optional[xr.Dataset]:
+    """
+    Carga MERRA-2 desde la tabla demo.
+    
+    Returns:
+        Dataset MERRA-2 o None
+    """
+    _log("⚠️  MERRA-2 no disponible, intentando cargar datos demo...")
+    # Buscar archivo correcto
+    merra2_csv = os.path.join(DATA_RAW, "merra2_weather_demo.csv")
+    if not (os.path.exists(merra2_csv) or os.path.exists(merra2_csv[:-4] + ".parquet")):
+        merra2_csv = os.path.join(DATA_RAW, "merra2_meteo_demo.csv")
+    
+    ds_merra2 = None
+    if os.path.exists(merra2_csv) or os.path.exists(merra2_csv[:-4] + ".parquet"):
+        _log("📂 Cargando MERRA-2 desde archivo demo...")
+        df_merra2 = load_demo_table(merra2_csv, ["latitude", "longitude", "T2M", "U2M", "V2M"])
+        if not df_merra2.empty:
+            ds_merra2 = df_to_grid(df_merra2)
+            _log(f"✅ MERRA-2 CSV cargado: {len(df_merra2)} puntos")
+    
+    return ds_merra2
+
+def process_fusion(verbose: bool = True) -> xr.Dataset:
     """
     Función principal de fusión de datasets.
     
+    Args:
+        verbose: Calcular y mostrar el tamaño en disco del store final
+        
     Returns:
         Dataset unificado con índice de riesgo
     """
@@ -187,47 +570,26 @@ def process_fusion() -> xr.Dataset:
     
     # ========== CARGA DE DATASETS ==========
     
-    # Cargar datasets satelitales
-    ds_tempo = load_dataset_safe(os.path.join(DATA_RAW, "tempo_no2.zarr"), "TEMPO NO₂")
-    ds_merra2 = load_dataset_safe(os.path.join(DATA_RAW, "merra2_meteo.zarr"), "MERRA-2 Meteorología")
-    ds_imerg = load_dataset_safe(os.path.join(DATA_RAW, "imerg_precip.zarr"), "IMERG Precipitación")
-    
-    # Verificar datasets críticos
-    if ds_tempo is None:
-        print("⚠️  TEMPO no disponible, intentando cargar datos demo...")
-        ds_tempo = load_dataset_safe(os.path.join(DATA_RAW, "tempo_demo.zarr"), "TEMPO Demo")
-    
-    # También probar archivos CSV demo si no hay Zarr
-    if ds_tempo is None:
-        tempo_csv = os.path.join(DATA_RAW, "tempo_no2_demo.csv")
-        if os.path.exists(tempo_csv):
-            print("📂 Cargando TEMPO desde CSV demo...")
-            df_tempo = pd.read_csv(tempo_csv)
-            if not df_tempo.empty:
-                # Convertir a xarray usando nombres completos de coordenadas
-                ds_tempo = df_tempo.set_index(['latitude', 'longitude']).to_xarray()
-                # Renombrar coordenadas para consistencia
-                ds_tempo = ds_tempo.rename({'latitude': 'lat', 'longitude': 'lon'})
-                print(f"✅ TEMPO CSV cargado: {len(df_tempo)} puntos")
-    
-    if ds_merra2 is None:
-        print("⚠️  MERRA-2 no disponible, intentando cargar datos demo...")
-        # Buscar archivo correcto
-        merra2_csv = os.path.join(DATA_RAW, "merra2_weather_demo.csv")
-        if not os.path.exists(merra2_csv):
-            merra2_csv = os.path.join(DATA_RAW, "merra2_meteo_demo.csv")
+    # Cargas independientes (I/O) en paralelo; los fallbacks demo se lanzan
+    # en el mismo pool en cuanto se sabe que faltan los datos principales
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = {
+            "tempo": executor.submit(load_dataset_safe, os.path.join(DATA_RAW, "tempo_no2.zarr"), "TEMPO NO₂"),
+            "merra2": executor.submit(load_dataset_safe, os.path.join(DATA_RAW, "merra2_meteo.zarr"), "MERRA-2 Meteorología"),
+            "imerg": executor.submit(load_dataset_safe, os.path.join(DATA_RAW, "imerg_precip.zarr"), "IMERG Precipitación"),
+            "openaq": executor.submit(load_openaq_data)
+        }
+        
+        fallbacks = {}
+        if futures["tempo"].result() is None:
+            fallbacks["tempo"] = executor.submit(load_tempo_fallback)
+        if futures["merra2"].result() is None:
+            fallbacks["merra2"] = executor.submit(load_merra2_fallback)
         
-        if os.path.exists(merra2_csv):
-            print("📂 Cargando MERRA-2 desde CSV demo...")
-            df_merra2 = pd.read_csv(merra2_csv)
-            if not df_merra2.empty:
-                ds_merra2 = df_merra2.set_index(['latitude', 'longitude']).to_xarray()
-                # Renombrar coordenadas para consistencia
-                ds_merra2 = ds_merra2.rename({'latitude': 'lat', 'longitude': 'lon'})
-                print(f"✅ MERRA-2 CSV cargado: {len(df_merra2)} puntos")
-    
-    # Cargar datos terrestres
-    df_openaq = load_openaq_data()
+        ds_tempo = (fallbacks.get("tempo") or futures["tempo"]).result()
+        ds_merra2 = (fallbacks.get("merra2") or futures["merra2"]).result()
+        ds_imerg = futures["imerg"].result()
+        df_openaq = futures["openaq"].result()
     
     # ========== VERIFICAR DISPONIBILIDAD ==========
     
@@ -253,6 +615,12 @@ def process_fusion() -> xr.Dataset:
     v_wind = extract_variable_safe(ds_merra2, ["V2M", "v", "v_wind"])
     rain = extract_variable_safe(ds_imerg, ["precip", "precipitation", "rain"])
     
+    # float32 basta para el índice 0-100 y reduce a la mitad memoria y ancho de banda
+    no2_sat, temp, u_wind, v_wind, rain = (
+        arr.astype(np.float32, copy=False) if arr is not None else None
+        for arr in (no2_sat, temp, u_wind, v_wind, rain)
+    )
+    
     # ========== CREAR DATASET BASE ==========
     
     print("🧩 Construyendo dataset base...")
@@ -283,18 +651,25 @@ def process_fusion() -> xr.Dataset:
     if not base_vars:
         raise RuntimeError("❌ No se pudieron extraer variables satelitales")
     
-    base_ds = xr.Dataset(base_vars)
+    base_ds = align_to_reference_grid(base_vars)
     
     # ========== INTERPOLACIÓN DE DATOS TERRESTRES ==========
     
     if df_openaq is not None:
         print("🌍 Interpolando datos terrestres de OpenAQ...")
         
-        # Usar la primera variable disponible como referencia para la rejilla
-        reference_var = list(base_vars.values())[0]
+        # Usar la rejilla común del dataset base como referencia
+        reference_var = base_ds
         
-        # Interpolar datos terrestres
-        ground_data = interpolate_ground_data(df_openaq, reference_var)
+        # Interpolar datos terrestres (cacheado por archivo fuente y rejilla)
+        source_path = df_openaq.attrs.get("source_path")
+        if source_path is not None and os.path.exists(source_path):
+            ground_data = _interpolate_openaq(
+                *_file_key(source_path),
+                reference_var["lat"].values, reference_var["lon"].values
+            )
+        else:
+            ground_data = interpolate_ground_data(df_openaq, reference_var)
         
         # Agregar al dataset base
         for param, data in ground_data.items():
@@ -313,6 +688,11 @@ def process_fusion() -> xr.Dataset:
     
     print("🧮 Calculando índice AIR Risk Score...")
     
+    # Trocear la rejilla para que Dask evalúe el riesgo por bloques en paralelo
+    base_ds = base_ds.chunk({
+        dim: ZARR_SPATIAL_CHUNK for dim in ("lat", "lon") if dim in base_ds.dims
+    })
+    
     # Extraer variables para el cálculo
     no2_final = base_ds.get("no2")
     o3_final = base_ds.get("o3") 
@@ -349,12 +729,16 @@ def process_fusion() -> xr.Dataset:
         
         risk_class = classify_risk(risk_score)
         
-        # Agregar al dataset
+        # Agregar al dataset y evaluar el grafo una sola vez (multihilo)
         base_ds["risk_score"] = risk_score
         base_ds["risk_class"] = risk_class
+        with dask.config.set(scheduler="threads", num_workers=os.cpu_count()):
+            base_ds = base_ds.persist()
+        risk_score = base_ds["risk_score"]
+        risk_class = base_ds["risk_class"]
         
         print(f"   ✅ Risk Score: [{float(risk_score.min()):.1f}, {float(risk_score.max()):.1f}]")
-        print(f"   ✅ Risk Class: {np.unique(risk_class.values)}")
+        print(f"   ✅ Risk Class: {risk_class_counts(risk_class)}")
         
     except Exception as e:
         print(f"❌ Error calculando riesgo: {e}")
@@ -378,23 +762,17 @@ def process_fusion() -> xr.Dataset:
     print(f"💾 Guardando dataset unificado...")
     
     try:
-        # Eliminar archivo existente si existe
-        if os.path.exists(out_path):
-            import shutil
-            shutil.rmtree(out_path)
-        
-        base_ds.to_zarr(out_path, mode="w")
+        store_ds, encoding = encode_risk_for_storage(base_ds)
+        store_ds, encoding = add_zarr_chunk_encoding(store_ds, encoding)
+        write_zarr_atomic(store_ds, out_path, encoding)
         print(f"✅ Dataset final guardado en {out_path}")
         
         # Mostrar estadísticas finales
-        file_size = sum(os.path.getsize(os.path.join(dirpath, filename))
-                       for dirpath, dirnames, filenames in os.walk(out_path)
-                       for filename in filenames) / (1024 * 1024)
-        
         print(f"📊 Estadísticas finales:")
         print(f"   • Dimensiones: {dict(base_ds.dims)}")
         print(f"   • Variables: {len(base_ds.data_vars)}")
-        print(f"   • Tamaño: {file_size:.1f} MB")
+        if verbose:
+            print(f"   • Tamaño: {zarr_store_size(out_path) / (1024 * 1024):.1f} MB")
         
     except Exception as e:
         print(f"❌ Error guardando dataset: {e}")
@@ -3,22 +3,23 @@
 Prueba mínima para identificar el problema
 """
 
-import pandas as pd
 import xarray as xr
 import numpy as np
 import os
 
+from utils import load_demo_table
+
 def simple_test():
     print("🧪 Prueba mínima")
     
     # 1. Cargar datos CSV
     data_path = "../data/zarr_store/tempo_no2_demo.csv"
-    if not os.path.exists(data_path):
+    if not (os.path.exists(data_path) or os.path.exists(data_path[:-4] + ".parquet")):
         print("❌ Archivo no encontrado")
         return False
     
-    print("📂 Cargando CSV...")
-    df = pd.read_csv(data_path)
+    print("📂 Cargando datos demo...")
+    df = load_demo_table(data_path, ["latitude", "longitude", "no2_tropospheric_column"])
     print(f"   ✅ {len(df)} registros cargados")
     
     # 2. Convertir a xarray
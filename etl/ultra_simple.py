@@ -7,22 +7,25 @@ import pandas as pd
 import numpy as np
 import os
 
+from utils import load_demo_table
+from utils_math import risk_class_codes, RISK_CLASS_LABELS
+
 def ultra_simple():
     print("🔍 Debug ultra-simple")
     
     # 1. Solo TEMPO
     print("1. Cargando TEMPO...")
-    df_tempo = pd.read_csv("../data/zarr_store/tempo_no2_demo.csv")
+    df_tempo = load_demo_table("../data/zarr_store/tempo_no2_demo.csv",
+                               ["latitude", "longitude", "no2_tropospheric_column"])
     print(f"   ✅ {len(df_tempo)} registros")
     
     # 2. Crear riesgo básico solo con pandas
     print("2. Calculando riesgo...")
-    no2_values = df_tempo['no2_tropospheric_column'].values
+    no2_values = df_tempo['no2_tropospheric_column'].to_numpy(dtype=np.float32, copy=False)
     no2_norm = (no2_values - no2_values.min()) / (no2_values.max() - no2_values.min())
     risk_score = no2_norm * 100
     
-    risk_class = np.where(risk_score < 34, "good",
-                         np.where(risk_score <= 66, "moderate", "bad"))
+    risk_class = pd.Categorical.from_codes(risk_class_codes(risk_score), RISK_CLASS_LABELS)
     
     print(f"   ✅ Risk Score: [{risk_score.min():.1f}, {risk_score.max():.1f}]")
     
@@ -42,9 +45,9 @@ def ultra_simple():
     print(f"   • Archivo: ../data/processed/airs_risk_simple.csv")
     
     # Estadísticas
-    unique_classes, counts = np.unique(risk_class, return_counts=True)
-    for cls, count in zip(unique_classes, counts):
-        print(f"   • {cls}: {count} puntos")
+    for cls, count in risk_class.value_counts().items():
+        if count:
+            print(f"   • {cls}: {count} puntos")
 
 if __name__ == "__main__":
     ultra_simple()
\ No newline at end of file
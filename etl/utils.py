@@ -4,7 +4,10 @@ Utilidades comunes para ingesta de datos CleanSky LA.
 import os
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Tuple, Optional
+from functools import lru_cache
+from typing import Tuple, Optional, List
+import numpy as np
+import pandas as pd
 from dotenv import load_dotenv
 
 # Cargar variables de entorno
@@ -73,6 +76,65 @@ def log_success(message: str):
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     print(f"[{timestamp}] ✅ {message}")
 
+def load_demo_table(csv_path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Carga un archivo demo priorizando su copia Parquet junto al CSV.
+    
+    Si el Parquet no existe o es más antiguo que el CSV, se lee el CSV una vez
+    y se convierte a Parquet (snappy) para las siguientes ejecuciones. Dentro
+    de un mismo proceso las lecturas se reutilizan mientras no cambien los
+    archivos (clave: rutas + mtime).
+    
+    Args:
+        csv_path: Ruta al CSV demo
+        columns: Columnas a leer (las que no existan se ignoran)
+        
+    Returns:
+        DataFrame con las columnas solicitadas (valores en float32)
+    """
+    csv_path = Path(csv_path)
+    parquet_path = csv_path.with_suffix(".parquet")
+    csv_mtime = csv_path.stat().st_mtime if csv_path.exists() else None
+    parquet_mtime = parquet_path.stat().st_mtime if parquet_path.exists() else None
+    
+    df = _load_demo_table_cached(
+        str(csv_path), csv_mtime, parquet_mtime,
+        tuple(columns) if columns is not None else None
+    )
+    # Copia superficial: el llamador puede añadir columnas sin tocar la caché
+    return df.copy(deep=False)
+
+@lru_cache(maxsize=16)
+def _load_demo_table_cached(csv_path: str, csv_mtime: Optional[float],
+                            parquet_mtime: Optional[float],
+                            columns: Optional[Tuple[str, ...]]) -> pd.DataFrame:
+    """Lectura real de load_demo_table; los mtime solo forman parte de la clave."""
+    csv_path = Path(csv_path)
+    parquet_path = csv_path.with_suffix(".parquet")
+    
+    if parquet_mtime is not None and (csv_mtime is None or parquet_mtime >= csv_mtime):
+        if columns is not None:
+            import pyarrow.parquet as pq
+            available = set(pq.read_schema(parquet_path).names)
+            columns = [c for c in columns if c in available]
+        df = pd.read_parquet(parquet_path, columns=columns, engine="pyarrow")
+    else:
+        df = pd.read_csv(csv_path, engine="pyarrow")
+        try:
+            df.to_parquet(parquet_path, index=False, engine="pyarrow", compression="snappy")
+        except Exception as e:
+            log_error(f"No se pudo convertir {csv_path.name} a Parquet: {e}")
+        
+        if columns is not None:
+            df = df[[c for c in columns if c in df.columns]]
+    
+    # Coordenadas en float64 (se usan como claves de rejilla); valores en float32
+    value_cols = [c for c in df.columns
+                  if c not in ("latitude", "longitude") and df[c].dtype == np.float64]
+    if value_cols:
+        df = df.astype({c: np.float32 for c in value_cols})
+    return df
+
 # Configuraciones específicas por dataset
 TEMPO_CONFIG = {
     "short_name": "TEMPO_NO2_L3_NRT",
@@ -4,28 +4,51 @@ CleanSky Los Ángeles - Fase 2: Procesamiento AIR Risk Score
 """
 
 import numpy as np
+import warnings
 import xarray as xr
-from typing import Optional
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
 
-def minmax_normalize(da: xr.DataArray) -> xr.DataArray:
+def _f32(da: xr.DataArray) -> xr.DataArray:
+    """Convierte a float32 (sin copia si ya lo es)."""
+    return da.astype(np.float32, copy=False)
+
+def minmax_normalize(da: xr.DataArray,
+                     stats: Optional[Tuple[float, float]] = None) -> xr.DataArray:
     """
     Normaliza una variable entre 0 y 1 evitando NaN.
     
     Args:
         da: DataArray a normalizar
+        stats: (min, max) ya conocidos (p. ej. climatología); evita las reducciones
         
     Returns:
-        DataArray normalizado entre 0-1
+        DataArray normalizado entre 0-1 (float32)
     """
-    min_val = da.min()
-    max_val = da.max()
+    if stats is not None:
+        min_val, max_val = (float(v) for v in stats)
+    elif da.chunks is not None:
+        # Dask: ambas reducciones en un único recorrido del grafo
+        import dask
+        min_val, max_val = (float(v) for v in dask.compute(da.min(), da.max()))
+    else:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # todo NaN
+            min_val = float(np.nanmin(da.values)) if da.size else np.nan
+            max_val = float(np.nanmax(da.values)) if da.size else np.nan
     range_val = max_val - min_val
     
     # Evitar división por cero
     if range_val == 0 or np.isnan(range_val):
-        return xr.zeros_like(da)
+        return xr.zeros_like(da, dtype=np.float32)
+    
+    if da.chunks is not None:
+        return (da - min_val).astype(np.float32) / np.float32(range_val + 1e-9)
     
-    return (da - min_val) / (range_val + 1e-9)
+    # Transformación afín con un único temporal float32 (resta y división in-place)
+    out = np.subtract(da.values, min_val, dtype=np.float32)
+    np.divide(out, range_val + 1e-9, out=out)
+    return xr.DataArray(out, coords=da.coords, dims=da.dims, name=da.name)
 
 def compute_wind_speed(u: xr.DataArray, v: xr.DataArray) -> xr.DataArray:
     """
@@ -38,7 +61,89 @@ def compute_wind_speed(u: xr.DataArray, v: xr.DataArray) -> xr.DataArray:
     Returns:
         Velocidad del viento (m/s)
     """
-    return np.sqrt(u**2 + v**2)
+    # np.hypot: una sola pasada sin temporales u², v² ni su suma
+    return xr.apply_ufunc(np.hypot, u, v, dask="allowed")
+
+@lru_cache(maxsize=1)
+def _bilinear2d_kernel():
+    """
+    Compila (una vez) el kernel Numba de interpolación bilineal sobre una
+    grilla regular lat/lon. Devuelve None si Numba no está instalado.
+    """
+    try:
+        from numba import njit, prange
+    except ImportError:
+        return None
+    
+    @njit(parallel=True)
+    def bilinear2d(values, lat0, dlat, lon0, dlon, lats, lons, out):
+        nlat, nlon = values.shape
+        for p in prange(lats.size):
+            fi = (lats[p] - lat0) / dlat
+            fj = (lons[p] - lon0) / dlon
+            # Fuera de la grilla -> NaN (igual que bounds_error=False)
+            if fi < -1e-9 or fi > nlat - 1 + 1e-9 or fj < -1e-9 or fj > nlon - 1 + 1e-9:
+                out[p] = np.nan
+                continue
+            i = min(max(int(fi), 0), nlat - 2)
+            j = min(max(int(fj), 0), nlon - 2)
+            ti = fi - i
+            tj = fj - j
+            out[p] = ((1.0 - ti) * ((1.0 - tj) * values[i, j] + tj * values[i, j + 1])
+                      + ti * ((1.0 - tj) * values[i + 1, j] + tj * values[i + 1, j + 1]))
+        return out
+    
+    return bilinear2d
+
+def bilinear2d_regular(values: np.ndarray, lat0: float, dlat: float, lon0: float, dlon: float,
+                       lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """
+    Interpolación bilineal de una grilla regular (lat, lon) en puntos dispersos.
+    
+    Usa un kernel Numba paralelo si está disponible; si no, la misma fórmula
+    vectorizada con NumPy. Los puntos fuera de la grilla devuelven NaN.
+    
+    Args:
+        values: Array 2-D (lat, lon) con al menos 2 celdas por eje
+        lat0, dlat: Primera latitud y paso de la grilla
+        lon0, dlon: Primera longitud y paso de la grilla
+        lats, lons: Coordenadas de los puntos a interpolar
+        
+    Returns:
+        Array 1-D con los valores interpolados
+    """
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    lats = np.ascontiguousarray(lats, dtype=np.float64).ravel()
+    lons = np.ascontiguousarray(lons, dtype=np.float64).ravel()
+    
+    kernel = _bilinear2d_kernel()
+    if kernel is not None:
+        return kernel(values, float(lat0), float(dlat), float(lon0), float(dlon),
+                      lats, lons, np.empty(lats.size))
+    
+    nlat, nlon = values.shape
+    fi = (lats - lat0) / dlat
+    fj = (lons - lon0) / dlon
+    outside = (fi < -1e-9) | (fi > nlat - 1 + 1e-9) | (fj < -1e-9) | (fj > nlon - 1 + 1e-9)
+    i = np.clip(np.nan_to_num(fi).astype(np.intp), 0, nlat - 2)
+    j = np.clip(np.nan_to_num(fj).astype(np.intp), 0, nlon - 2)
+    ti = fi - i
+    tj = fj - j
+    out = ((1.0 - ti) * ((1.0 - tj) * values[i, j] + tj * values[i, j + 1])
+           + ti * ((1.0 - tj) * values[i + 1, j] + tj * values[i + 1, j + 1]))
+    out[outside] = np.nan
+    return out
+
+# Etiquetas de clase de riesgo; el índice es el código entero almacenado
+RISK_CLASS_LABELS = ("good", "moderate", "bad")
+
+def risk_class_codes(score: np.ndarray) -> np.ndarray:
+    """
+    Códigos int8 de clase de riesgo para un array NumPy de scores
+    (0: <34, 1: 34-66, 2: >66; NaN -> 0), sin ramas ni arrays de texto.
+    """
+    score = np.asarray(score)
+    return np.add(score >= 34, score > 66, dtype=np.int8)
 
 def classify_risk(score: xr.DataArray) -> xr.DataArray:
     """
@@ -48,17 +153,51 @@ def classify_risk(score: xr.DataArray) -> xr.DataArray:
         score: Array de scores de riesgo (0-100)
         
     Returns:
-        Array de categorías: 'good', 'moderate', 'bad'
+        Array int8 de códigos (0='good', 1='moderate', 2='bad') con atributos
+        CF flag_values/flag_meanings
     """
-    # Crear array de strings con la misma forma
-    result = xr.full_like(score, "good", dtype="<U8")
-    
-    # Aplicar condiciones
-    result = xr.where(score >= 34, "moderate", result)
-    result = xr.where(score > 66, "bad", result)
+    result = xr.apply_ufunc(
+        risk_class_codes, score,
+        dask="parallelized",
+        output_dtypes=[np.int8]
+    )
+    result.attrs = {
+        "flag_values": list(range(len(RISK_CLASS_LABELS))),
+        "flag_meanings": " ".join(RISK_CLASS_LABELS)
+    }
     
     return result
 
+def risk_class_counts(risk_class: xr.DataArray) -> dict:
+    """
+    Cuenta celdas por clase de riesgo, aceptando códigos enteros o strings.
+    
+    Args:
+        risk_class: Array de clases (códigos de classify_risk o etiquetas)
+        
+    Returns:
+        Dict {etiqueta: número de celdas}; las clases desconocidas se cuentan
+        con su valor original
+    """
+    values = np.asarray(risk_class.values).ravel()
+    counts = dict.fromkeys(RISK_CLASS_LABELS, 0)
+    
+    if values.dtype.kind in "iu":
+        # Conteo lineal con bincount (sin ordenar como np.unique)
+        n_labels = len(RISK_CLASS_LABELS)
+        known = (values >= 0) & (values < n_labels)
+        for label, count in zip(RISK_CLASS_LABELS,
+                                np.bincount(values[known], minlength=n_labels).tolist()):
+            counts[label] = count
+        if not known.all():
+            codes, n = np.unique(values[~known], return_counts=True)
+            counts.update(zip(codes.tolist(), n.tolist()))
+    else:
+        for label, count in zip(*np.unique(values.astype(str), return_counts=True)):
+            counts[str(label)] = int(count)
+    
+    return counts
+
 def compute_aqi_component(value: xr.DataArray, thresholds: list, aqi_breaks: list) -> xr.DataArray:
     """
     Calcula componente AQI para un contaminante específico.
@@ -71,23 +210,140 @@ def compute_aqi_component(value: xr.DataArray, thresholds: list, aqi_breaks: lis
     Returns:
         Componente AQI (0-500)
     """
-    aqi = xr.zeros_like(value)
+    xp = np.asarray(thresholds, dtype=np.float64)
+    fp = np.asarray(aqi_breaks, dtype=np.float64)
+    
+    def _interp(values):
+        # Interpolación lineal por tramos en una sola pasada; por debajo del
+        # primer umbral y sin dato (NaN) el componente vale 0
+        aqi = np.interp(values, xp, fp, left=0.0, right=fp[-1])
+        aqi[np.isnan(values)] = 0.0
+        return aqi.astype(values.dtype, copy=False) if values.dtype.kind == "f" else aqi
+    
+    return xr.apply_ufunc(
+        _interp, value,
+        dask="parallelized",
+        output_dtypes=[value.dtype if value.dtype.kind == "f" else np.float64]
+    )
+
+# Unidades CF de temperatura -> offset a °C
+KELVIN_UNITS = {"k", "kelvin", "kelvins", "degk", "deg_k"}
+CELSIUS_UNITS = {"c", "°c", "degc", "deg_c", "celsius", "degree_celsius", "degrees_celsius"}
+
+def temperature_offset(temp: xr.DataArray) -> Optional[float]:
+    """
+    Offset para pasar la temperatura a °C según el atributo 'units'
+    (273.15 en Kelvin, 0 en Celsius). None si las unidades no se reconocen.
+    """
+    units = str(temp.attrs.get("units", "")).strip().lower()
+    if units in KELVIN_UNITS:
+        return 273.15
+    if units in CELSIUS_UNITS:
+        return 0.0
+    return None
+
+# Variables normalizadas min–max en el índice de riesgo (claves de normalization_stats)
+NORMALIZED_VARS = ("no2", "o3", "pm25", "aerosol")
+
+@lru_cache(maxsize=1)
+def _risk_kernels():
+    """
+    Compila (una vez) los kernels Numba del índice de riesgo. Devuelve None
+    si Numba no está instalado.
+    
+    - risk_ranges: una sola pasada paralela con min/max de NO₂, O₃, PM2.5 y
+      aerosoles, y suma/conteo de temperatura (para detectar Kelvin).
+    - risk_combine: una pasada por celda con el índice ponderado completo.
+    - risk_combine_block: igual que risk_combine pero secuencial y sin GIL,
+      para ejecutarse por bloque dentro de los hilos de Dask.
+    """
+    try:
+        from numba import njit, prange
+    except ImportError:
+        return None
     
-    for i in range(len(thresholds) - 1):
-        mask = (value >= thresholds[i]) & (value < thresholds[i + 1])
-        if mask.any():
-            # Interpolación linear dentro del rango
-            aqi_range = aqi_breaks[i + 1] - aqi_breaks[i]
-            conc_range = thresholds[i + 1] - thresholds[i]
-            aqi = xr.where(mask, 
-                          aqi_breaks[i] + (value - thresholds[i]) * aqi_range / conc_range,
-                          aqi)
+    @njit(parallel=True)
+    def risk_ranges(no2, o3, pm25, aerosol, temp, has, n):
+        mn0 = np.inf
+        mx0 = -np.inf
+        mn1 = np.inf
+        mx1 = -np.inf
+        mn2 = np.inf
+        mx2 = -np.inf
+        mn3 = np.inf
+        mx3 = -np.inf
+        t_sum = 0.0
+        t_n = 0
+        for i in prange(n):
+            if has[0]:
+                v = no2[i]
+                if not np.isnan(v):
+                    mn0 = min(mn0, v)
+                    mx0 = max(mx0, v)
+            if has[1]:
+                v = o3[i]
+                if not np.isnan(v):
+                    mn1 = min(mn1, v)
+                    mx1 = max(mx1, v)
+            if has[2]:
+                v = pm25[i]
+                if not np.isnan(v):
+                    mn2 = min(mn2, v)
+                    mx2 = max(mx2, v)
+            if has[3]:
+                v = aerosol[i]
+                if not np.isnan(v):
+                    mn3 = min(mn3, v)
+                    mx3 = max(mx3, v)
+            if has[4]:
+                v = temp[i]
+                if not np.isnan(v):
+                    t_sum += v
+                    t_n += 1
+        return mn0, mx0, mn1, mx1, mn2, mx2, mn3, mx3, t_sum, t_n
     
-    # Valores por encima del último umbral
-    mask = value >= thresholds[-1]
-    aqi = xr.where(mask, aqi_breaks[-1], aqi)
+    def combine(no2, o3, pm25, temp, wind, aerosol, rain, has, norm,
+                mins, ranges, temp_offset, total_weight, out):
+        for i in prange(out.size):
+            risk = 0.0
+            # NO₂ (30%), O₃ (25%), PM2.5 (20%): min-max normalizados
+            if has[0] and norm[0]:
+                risk += 0.30 * ((no2[i] - mins[0]) / (ranges[0] + 1e-9))
+            if has[1] and norm[1]:
+                risk += 0.25 * ((o3[i] - mins[1]) / (ranges[1] + 1e-9))
+            if has[2] and norm[2]:
+                risk += 0.20 * ((pm25[i] - mins[2]) / (ranges[2] + 1e-9))
+            # Temperatura (10%): riesgo lineal sobre 25 °C, limitado a 1
+            if has[3]:
+                t = temp[i] - temp_offset
+                t_risk = (t - 25) / 15 if t > 25 else 0.0
+                risk += 0.10 * (1.0 if t_risk > 1 else t_risk)
+            # Viento (10%): viento bajo penaliza
+            if has[4]:
+                w = wind[i]
+                risk += 0.10 * (1.0 if w < 2.0 else ((5.0 - w) / 3.0 if w < 5.0 else 0.0))
+            # Aerosoles (5%)
+            if has[5] and norm[3]:
+                risk += 0.05 * ((aerosol[i] - mins[3]) / (ranges[3] + 1e-9))
+            # Precipitación: factor reductor (washout)
+            if has[6]:
+                r = rain[i]
+                risk *= 0.9 if r > 1.0 else (0.95 if r > 0.1 else 1.0)
+            
+            if total_weight > 0:
+                risk = (risk / total_weight) * 100
+            
+            # Asegurar rango 0-100 (NaN se conserva)
+            if risk < 0:
+                risk = 0.0
+            elif risk > 100:
+                risk = 100.0
+            out[i] = risk
     
-    return aqi
+    risk_combine = njit(parallel=True)(combine)
+    risk_combine_block = njit(nogil=True)(combine)
+    
+    return risk_ranges, risk_combine, risk_combine_block
 
 def compute_risk_enhanced(no2: Optional[xr.DataArray] = None,
                          o3: Optional[xr.DataArray] = None, 
@@ -95,7 +351,8 @@ def compute_risk_enhanced(no2: Optional[xr.DataArray] = None,
                          temp: Optional[xr.DataArray] = None,
                          wind: Optional[xr.DataArray] = None,
                          aerosol: Optional[xr.DataArray] = None,
-                         rain: Optional[xr.DataArray] = None) -> xr.DataArray:
+                         rain: Optional[xr.DataArray] = None,
+                         normalization_stats: Optional[Dict[str, Tuple[float, float]]] = None) -> xr.DataArray:
     """
     Calcula el índice de riesgo atmosférico ponderado (0–100).
     Los pesos están basados en impacto ambiental y dispersión.
@@ -104,72 +361,219 @@ def compute_risk_enhanced(no2: Optional[xr.DataArray] = None,
         no2: Concentración NO₂ (molec/cm² o ppb)
         o3: Concentración O₃ (ppb)
         pm25: Concentración PM2.5 (µg/m³)
-        temp: Temperatura (K)
+        temp: Temperatura (K o °C según attrs['units']; sin unidades se infiere por la media)
         wind: Velocidad del viento (m/s)
         aerosol: Aerosoles (opcional)
         rain: Precipitación (opcional, mm/hr)
+        normalization_stats: (min, max) por variable ('no2', 'o3', 'pm25',
+            'aerosol') ya conocidos; esas variables no se reducen
         
     Returns:
         Risk score (0-100)
     """
-    risk = xr.zeros_like(list(filter(None, [no2, o3, pm25, temp, wind]))[0])
+    kernels = _risk_kernels()
+    if kernels is None:
+        return _compute_risk_xarray(no2, o3, pm25, temp, wind, aerosol, rain,
+                                    normalization_stats)
+    risk_ranges, risk_combine, risk_combine_block = kernels
+    
+    inputs = (no2, o3, pm25, temp, wind, aerosol, rain)
+    has = tuple(v is not None for v in inputs)
+    # Con 'units' reconocible no hace falta la media para detectar Kelvin
+    temp_offset = temperature_offset(temp) if temp is not None else 0.0
+    # El índice se calcula en float32 (0-100 con 3 cifras significativas)
+    present = [_f32(v) for v in inputs if v is not None]
+    if not present:
+        raise ValueError("compute_risk requiere al menos una variable")
+    
+    # Alinear y expandir todas las variables a una misma rejilla
+    present = xr.broadcast(*xr.align(*present, join="inner"))
+    template = present[0]
+    present = [da.transpose(*template.dims) for da in present]
+    by_name = dict(zip([i for i, h in enumerate(has) if h], present))
+    total_weight = (0.30 * has[0] + 0.25 * has[1] + 0.20 * has[2]
+                    + 0.10 * has[3] + 0.10 * has[4] + 0.05 * has[5])
+    
+    # Pasada 1: rangos de normalización (NO₂, O₃, PM2.5, aerosoles) y media de temperatura;
+    # sólo se reducen las variables sin estadísticas conocidas
+    stats = normalization_stats or {}
+    norm_idx = (0, 1, 2, 5)
+    reduce = tuple(has[idx] and NORMALIZED_VARS[k] not in stats
+                   for k, idx in enumerate(norm_idx)) + (has[3] and temp_offset is None,)
+    dtype = np.float32
+    lazy = any(da.chunks is not None for da in present)
+    bounds = np.full(8, np.nan)
+    temp_mean = np.nan
+    if lazy:
+        reductions = {}
+        for k, idx in enumerate(norm_idx):
+            if reduce[k]:
+                reductions[2 * k] = by_name[idx].min()
+                reductions[2 * k + 1] = by_name[idx].max()
+        if reduce[4]:
+            reductions[8] = by_name[3].mean()
+        if reductions:
+            import dask
+            values = dask.compute(*reductions.values())
+            for pos, value in zip(reductions, values):
+                if pos == 8:
+                    temp_mean = float(value)
+                else:
+                    bounds[pos] = float(value)
+    else:
+        arrays = [
+            np.ascontiguousarray(by_name[idx].values, dtype=dtype).ravel()
+            if h else np.empty(1, dtype=dtype)
+            for idx, h in enumerate(has)
+        ]
+        if any(reduce):
+            *computed, t_sum, t_n = risk_ranges(
+                arrays[0], arrays[1], arrays[2], arrays[5], arrays[3],
+                reduce, template.size
+            )
+            bounds[:] = computed
+            temp_mean = t_sum / t_n if t_n > 0 else np.nan
+    for k, name in enumerate(NORMALIZED_VARS):
+        if has[norm_idx[k]] and name in stats:
+            bounds[2 * k:2 * k + 2] = [float(v) for v in stats[name]]
+    mins = bounds[0::2]
+    ranges = bounds[1::2] - mins
+    
+    # Rango nulo o sin datos -> la variable normalizada vale 0 (minmax_normalize)
+    norm = tuple(bool(np.isfinite(r) and r != 0) for r in ranges)
+    if temp_offset is None:
+        temp_offset = 273.15 if temp_mean > 200 else 0.0
+    
+    # Pasada 2: índice ponderado por celda
+    if lazy:
+        def combine_block(*blocks):
+            blocks = iter(blocks)
+            arrays = [
+                np.ascontiguousarray(next(blocks), dtype=dtype) if h else None
+                for h in has
+            ]
+            shape = next(a for a in arrays if a is not None).shape
+            arrays = [a.ravel() if a is not None else np.empty(1, dtype=dtype) for a in arrays]
+            out = np.empty(int(np.prod(shape)), dtype=dtype)
+            risk_combine_block(*arrays, has, norm, mins, ranges, temp_offset, total_weight, out)
+            return out.reshape(shape)
+        
+        # Un bloque por chunk espacial, planificado por Dask (se evalúa al escribir)
+        return xr.apply_ufunc(
+            combine_block, *present,
+            dask="parallelized",
+            output_dtypes=[dtype]
+        )
+    
+    out = np.empty(template.size, dtype=dtype)
+    risk_combine(*arrays, has, norm, mins, ranges, temp_offset, total_weight, out)
+    
+    return xr.DataArray(out.reshape(template.shape), coords=template.coords, dims=template.dims)
+
+def _ramp(values: np.ndarray, lo: float, hi: float) -> np.ndarray:
+    """
+    Rampa lineal 0→1 entre lo y hi (lo > hi para rampas decrecientes),
+    acotada a [0, 1]; NaN vale 0. Un único temporal, operaciones in-place.
+    """
+    out = np.subtract(values, lo, dtype=np.float32)
+    out *= np.float32(1.0 / (hi - lo))
+    np.fmax(out, 0.0, out=out)  # fmax descarta NaN -> 0
+    np.fmin(out, 1.0, out=out)
+    return out
+
+def _rain_factor(values: np.ndarray) -> np.ndarray:
+    """Factor de lavado por lluvia: 0.9 (>1 mm/hr), 0.95 (>0.1 mm/hr), 1 en otro caso."""
+    return np.select([values > 1.0, values > 0.1], [0.9, 0.95], 1.0).astype(np.float32)
+
+def _elementwise(func, da: xr.DataArray, *args) -> xr.DataArray:
+    """Aplica una función NumPy por bloques (perezosa con Dask)."""
+    return xr.apply_ufunc(func, da, *args, dask="parallelized", output_dtypes=[np.float32])
+
+def _accumulate(risk: Optional[xr.DataArray], weight: float,
+                term: xr.DataArray) -> xr.DataArray:
+    """Suma ponderada incremental; el primer término inicializa el acumulador."""
+    return weight * term if risk is None else risk + weight * term
+
+def _compute_risk_xarray(no2: Optional[xr.DataArray] = None,
+                         o3: Optional[xr.DataArray] = None, 
+                         pm25: Optional[xr.DataArray] = None,
+                         temp: Optional[xr.DataArray] = None,
+                         wind: Optional[xr.DataArray] = None,
+                         aerosol: Optional[xr.DataArray] = None,
+                         rain: Optional[xr.DataArray] = None,
+                         normalization_stats: Optional[Dict[str, Tuple[float, float]]] = None) -> xr.DataArray:
+    """
+    Implementación con operaciones xarray de compute_risk_enhanced
+    (se usa cuando Numba no está instalado).
+    """
+    stats = normalization_stats or {}
+    no2, o3, pm25, temp, wind, aerosol, rain = (
+        _f32(v) if v is not None else None
+        for v in (no2, o3, pm25, temp, wind, aerosol, rain)
+    )
+    # El acumulador se crea con el primer término (sin rejilla de ceros previa)
+    risk = None
     total_weight = 0
     
     # NO₂ (30% peso) - Contaminante primario
     if no2 is not None:
-        no2_norm = minmax_normalize(no2)
-        risk += 0.30 * no2_norm
+        no2_norm = minmax_normalize(no2, stats.get('no2'))
+        risk = _accumulate(risk, 0.30, no2_norm)
         total_weight += 0.30
     
     # O₃ (25% peso) - Ozono troposférico
     if o3 is not None:
-        o3_norm = minmax_normalize(o3)
-        risk += 0.25 * o3_norm
+        o3_norm = minmax_normalize(o3, stats.get('o3'))
+        risk = _accumulate(risk, 0.25, o3_norm)
         total_weight += 0.25
     
     # PM2.5 (20% peso) - Material particulado
     if pm25 is not None:
-        pm25_norm = minmax_normalize(pm25)
-        risk += 0.20 * pm25_norm
+        pm25_norm = minmax_normalize(pm25, stats.get('pm25'))
+        risk = _accumulate(risk, 0.20, pm25_norm)
         total_weight += 0.20
     
     # Temperatura (10% peso) - Factor de dispersión
     if temp is not None:
         # Temperaturas altas favorecen reacciones fotoquímicas
-        temp_celsius = temp - 273.15 if temp.mean() > 200 else temp
-        temp_risk = xr.where(temp_celsius > 25, (temp_celsius - 25) / 15, 0)
-        temp_risk = xr.where(temp_risk > 1, 1, temp_risk)  # Limitar a 1
-        risk += 0.10 * temp_risk
+        offset = temperature_offset(temp)
+        if offset is None:
+            offset = 273.15 if temp.mean() > 200 else 0.0
+        temp_celsius = temp - offset
+        temp_risk = _elementwise(_ramp, temp_celsius, 25.0, 40.0)  # 0 bajo 25 °C, 1 desde 40 °C
+        risk = _accumulate(risk, 0.10, temp_risk)
         total_weight += 0.10
     
     # Viento (10% peso) - Factor de dispersión (inverso)
     if wind is not None:
         # Viento bajo penaliza (menos dispersión)
-        wind_risk = xr.where(wind < 2.0, 1.0, xr.where(wind < 5.0, (5.0 - wind) / 3.0, 0.0))
-        risk += 0.10 * wind_risk
+        wind_risk = _elementwise(_ramp, wind, 5.0, 2.0)  # 1 bajo 2 m/s, 0 desde 5 m/s
+        risk = _accumulate(risk, 0.10, wind_risk)
         total_weight += 0.10
     
     # Aerosoles (5% peso) - Opcional
     if aerosol is not None:
-        aerosol_norm = minmax_normalize(aerosol)
-        risk += 0.05 * aerosol_norm
+        aerosol_norm = minmax_normalize(aerosol, stats.get('aerosol'))
+        risk = _accumulate(risk, 0.05, aerosol_norm)
         total_weight += 0.05
     
+    if risk is None:
+        if rain is None:
+            raise ValueError("compute_risk requiere al menos una variable")
+        risk = xr.zeros_like(rain, dtype=np.float32)
+    
     # Precipitación (factor reductor) - Opcional
     if rain is not None:
         # La lluvia reduce el riesgo (washout)
-        rain_factor = xr.where(rain > 1.0, 0.9, xr.where(rain > 0.1, 0.95, 1.0))
+        rain_factor = _elementwise(_rain_factor, rain)
         risk *= rain_factor
     
     # Normalizar por peso total y escalar a 0-100
     if total_weight > 0:
         risk = (risk / total_weight) * 100
     
-    # Asegurar rango 0-100
-    risk = xr.where(risk < 0, 0, risk)
-    risk = xr.where(risk > 100, 100, risk)
-    
-    return risk
+    # Asegurar rango 0-100 (NaN se conserva)
+    return risk.clip(0, 100)
 
 def compute_risk_simple(no2: Optional[xr.DataArray] = None,
                        o3: Optional[xr.DataArray] = None,
@@ -177,15 +581,79 @@ def compute_risk_simple(no2: Optional[xr.DataArray] = None,
                        temp: Optional[xr.DataArray] = None,
                        wind: Optional[xr.DataArray] = None,
                        aerosol: Optional[xr.DataArray] = None,
-                       rain: Optional[xr.DataArray] = None) -> xr.DataArray:
+                       rain: Optional[xr.DataArray] = None,
+                       normalization_stats: Optional[Dict[str, Tuple[float, float]]] = None) -> xr.DataArray:
     """
     Versión simplificada del cálculo de riesgo para compatibilidad.
     """
-    return compute_risk_enhanced(no2, o3, pm25, temp, wind, aerosol, rain)
+    return compute_risk_enhanced(no2, o3, pm25, temp, wind, aerosol, rain,
+                                 normalization_stats)
 
 # Alias para compatibilidad
 compute_risk = compute_risk_simple
 
+@lru_cache(maxsize=1)
+def _risk_stats_kernel():
+    """
+    Compila (una vez) el kernel Numba que calcula min/max/suma/suma² en una
+    sola pasada paralela. Devuelve None si Numba no está instalado.
+    """
+    try:
+        from numba import njit, prange
+    except ImportError:
+        return None
+    
+    @njit(parallel=True)
+    def risk_stats(scores):
+        mn = np.inf
+        mx = -np.inf
+        s = 0.0
+        s2 = 0.0
+        n = 0
+        for i in prange(scores.size):
+            v = scores[i]
+            if not np.isnan(v):
+                mn = min(mn, v)
+                mx = max(mx, v)
+                s += v
+                s2 += v * v
+                n += 1
+        return mn, mx, s, s2, n
+    
+    return risk_stats
+
+def compute_risk_stats(values: np.ndarray) -> Tuple[float, float, float, float]:
+    """
+    Calcula min, max, media y desviación (ignorando NaN) de un array.
+    
+    Con Numba disponible las cuatro reducciones se fusionan en un único
+    recorrido multihilo; si no, se usan las reducciones nan* de NumPy.
+    
+    Args:
+        values: Array de risk_score (cualquier forma)
+        
+    Returns:
+        Tuple (min, max, mean, std); NaN si no hay valores válidos
+    """
+    arr = np.ascontiguousarray(values, dtype=np.float64).ravel()
+    kernel = _risk_stats_kernel()
+    
+    if kernel is None:
+        if not arr.size:
+            return np.nan, np.nan, np.nan, np.nan
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # todo NaN
+            return (float(np.nanmin(arr)), float(np.nanmax(arr)),
+                    float(np.nanmean(arr)), float(np.nanstd(arr)))
+    
+    mn, mx, s, s2, n = kernel(arr)
+    if n == 0:
+        return np.nan, np.nan, np.nan, np.nan
+    
+    mean = s / n
+    std = np.sqrt(max(s2 / n - mean * mean, 0.0))
+    return float(mn), float(mx), float(mean), float(std)
+
 def validate_risk_dataset(ds: xr.Dataset) -> dict:
     """
     Valida que el dataset de riesgo tenga la estructura esperada.
@@ -212,8 +680,15 @@ def validate_risk_dataset(ds: xr.Dataset) -> dict:
     
     # Verificar rango de risk_score
     if "risk_score" in ds.data_vars:
-        risk_min = float(ds.risk_score.min())
-        risk_max = float(ds.risk_score.max())
+        score = ds.risk_score
+        if score.chunks is not None:
+            # Dask: las cuatro reducciones en un único recorrido del grafo
+            import dask
+            risk_min, risk_max, risk_mean, risk_std = (
+                float(v) for v in dask.compute(score.min(), score.max(), score.mean(), score.std())
+            )
+        else:
+            risk_min, risk_max, risk_mean, risk_std = compute_risk_stats(score.values)
         
         if risk_min < 0 or risk_max > 100:
             results["errors"].append(f"risk_score fuera de rango [0,100]: [{risk_min:.2f}, {risk_max:.2f}]")
@@ -222,26 +697,20 @@ def validate_risk_dataset(ds: xr.Dataset) -> dict:
         results["stats"]["risk_score"] = {
             "min": risk_min,
             "max": risk_max,
-            "mean": float(ds.risk_score.mean()),
-            "std": float(ds.risk_score.std())
+            "mean": risk_mean,
+            "std": risk_std
         }
     
     # Verificar valores de risk_class
     if "risk_class" in ds.data_vars:
-        valid_classes = {"good", "moderate", "bad"}
-        unique_classes = set(ds.risk_class.values.flatten())
-        invalid_classes = unique_classes - valid_classes
+        class_counts = risk_class_counts(ds.risk_class)
+        invalid_classes = {cls for cls, count in class_counts.items()
+                           if cls not in RISK_CLASS_LABELS and count}
         
         if invalid_classes:
             results["errors"].append(f"Clases de riesgo inválidas: {invalid_classes}")
             results["valid"] = False
         
-        # Contar por clase
-        class_counts = {}
-        for cls in valid_classes:
-            count = int((ds.risk_class == cls).sum())
-            class_counts[cls] = count
-        
         results["stats"]["risk_class"] = class_counts
     
     return results
\ No newline at end of file
@@ -18,11 +18,22 @@ try:
     import xarray as xr
     import pandas as pd
     import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
     SCIENTIFIC_LIBS_AVAILABLE = True
 except ImportError as e:
     print(f"⚠️ Dependencias científicas no disponibles: {e}")
     SCIENTIFIC_LIBS_AVAILABLE = False
 
+# Bounding box de Los Ángeles compartido con la ingesta (oeste, sur, este, norte);
+# utils necesita numpy/pandas, igual que los validadores que lo usan
+if SCIENTIFIC_LIBS_AVAILABLE:
+    try:
+        from .utils import BBOX_LA
+    except ImportError:
+        from utils import BBOX_LA
+
 # Rutas de archivos
 DATA_DIR = Path(__file__).parent.parent / "data" / "zarr_store"
 CHECKS = {
@@ -35,6 +46,39 @@ CHECKS = {
     "MERRA2_DEMO": DATA_DIR / "merra2_weather_demo.csv",
 }
 
+def open_zarr_lazy(path: Path):
+    """Abrir Zarr de forma perezosa (chunks nativos, metadatos consolidados)."""
+    try:
+        return xr.open_zarr(path, chunks={}, consolidated=True, decode_times=False)
+    except (KeyError, FileNotFoundError):
+        # Store sin .zmetadata
+        return xr.open_zarr(path, chunks={}, consolidated=False, decode_times=False)
+
+def _coord_slice(coord, lo: float, hi: float) -> slice:
+    """Slice en el orden de la coordenada (soporta latitudes descendentes)."""
+    values = coord.values
+    if values.size > 1 and values[0] > values[-1]:
+        return slice(hi, lo)
+    return slice(lo, hi)
+
+def subset_la(ds):
+    """
+    Recortar el dataset al bbox de LA antes de reducir, para no leer la
+    rejilla completa. Falla si el store no cubre Los Ángeles.
+    """
+    lon_min, lat_min, lon_max, lat_max = BBOX_LA
+    lat = next((c for c in ('lat', 'latitude') if c in ds.coords), None)
+    lon = next((c for c in ('lon', 'longitude') if c in ds.coords), None)
+    if lat is None or lon is None:
+        return ds
+    sub = ds.sel({
+        lat: _coord_slice(ds[lat], lat_min, lat_max),
+        lon: _coord_slice(ds[lon], lon_min, lon_max),
+    })
+    assert sub.sizes[lat] > 0 and sub.sizes[lon] > 0, \
+        f"El dataset no cubre el bbox de Los Ángeles {BBOX_LA}"
+    return sub
+
 def log(status: str, msg: str):
     """Log con timestamp y emoji."""
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -50,7 +94,7 @@ def validate_tempo(zarr_path: Path, demo_path: Path) -> bool:
     
     try:
         if path_to_use.suffix == '.zarr':
-            ds = xr.open_zarr(path_to_use)
+            ds = open_zarr_lazy(path_to_use)
             # Verificar dimensiones espaciales
             has_lat = any(dim in ds.dims for dim in ['latitude', 'lat'])
             has_lon = any(dim in ds.dims for dim in ['longitude', 'lon']) 
@@ -60,7 +104,7 @@ def validate_tempo(zarr_path: Path, demo_path: Path) -> bool:
             no2_vars = [v for v in ds.data_vars if 'no2' in str(v).lower()]
             assert len(no2_vars) > 0, "No se encontró variable NO₂"
             
-            val = float(ds[no2_vars[0]].mean().item())
+            val = float(subset_la(ds[no2_vars[0]]).mean().compute())
             assert val > 0, f"Valor medio de NO₂ inválido: {val}"
             
             log("✔️", f"TEMPO Zarr válido ({val:.2e} molec/cm²)")
@@ -89,30 +133,62 @@ def validate_openaq(path: Path) -> bool:
         return validate_file_exists(path, "OpenAQ")
     
     try:
-        df = pd.read_parquet(path)
-        assert not df.empty, "Archivo vacío"
+        # Esquema y estadísticas desde el footer Parquet (sin leer datos)
+        parquet_file = pq.ParquetFile(path)
+        n_rows = parquet_file.metadata.num_rows
+        assert n_rows > 0, "Archivo vacío"
         
         # Verificar columnas esenciales
         essential_cols = ['location_id', 'latitude', 'longitude', 'parameter', 'value']
-        missing_cols = [col for col in essential_cols if col not in df.columns]
+        missing_cols = [col for col in essential_cols if col not in parquet_file.schema_arrow.names]
         assert not missing_cols, f"Columnas faltantes: {missing_cols}"
         
         # Verificar que hay valores válidos
-        assert df['value'].notna().any(), "Todos los valores son nulos"
+        value_nulls = _parquet_null_count(parquet_file, 'value')
+        if value_nulls is not None:
+            assert value_nulls < n_rows, "Todos los valores son nulos"
+        else:
+            values = read_parquet_columns(path, ['value'])['value']
+            assert values.notna().any(), "Todos los valores son nulos"
         
-        # Verificar parámetros esperados
-        params = df['parameter'].unique()
-        expected_params = {'pm25', 'no2', 'o3'}
-        found_params = set(params) & expected_params
-        assert len(found_params) >= 2, f"Parámetros insuficientes: {params}"
+        # Verificar parámetros esperados (solo se lee esa columna, en Arrow)
+        params = pc.unique(parquet_file.read(columns=['parameter'], use_threads=True)
+                           .column('parameter'))
+        expected_params = pa.array(['pm25', 'no2', 'o3'])
+        found_params = pc.sum(pc.is_in(params, value_set=expected_params)).as_py() or 0
+        params = params.to_pylist()
+        assert found_params >= 2, f"Parámetros insuficientes: {params}"
         
-        log("✔️", f"OpenAQ válido ({len(df)} registros, parámetros: {list(params)})")
+        log("✔️", f"OpenAQ válido ({n_rows} registros, parámetros: {params})")
         return True
         
     except Exception as e:
         log("❌", f"OpenAQ error: {e}")
         return False
 
+def read_parquet_columns(path: Path, columns: list) -> "pd.DataFrame":
+    """
+    Leer solo las columnas pedidas con el motor pyarrow multihilo, manteniendo
+    tipos Arrow (strings sin objetos Python).
+    """
+    return pd.read_parquet(path, engine='pyarrow', columns=columns,
+                           use_threads=True, dtype_backend='pyarrow')
+
+def _parquet_null_count(parquet_file, column: str):
+    """
+    Nulos de una columna según las estadísticas de los row groups, o None
+    si algún row group no las tiene.
+    """
+    index = parquet_file.schema_arrow.get_field_index(column)
+    metadata = parquet_file.metadata
+    total = 0
+    for i in range(metadata.num_row_groups):
+        stats = metadata.row_group(i).column(index).statistics
+        if stats is None or not stats.has_null_count:
+            return None
+        total += stats.null_count
+    return total
+
 def validate_imerg(zarr_path: Path, demo_path: Path) -> bool:
     """Validar datos IMERG precipitación."""
     if not zarr_path.exists() and not demo_path.exists():
@@ -126,12 +202,12 @@ def validate_imerg(zarr_path: Path, demo_path: Path) -> bool:
     
     try:
         if path_to_use.suffix == '.zarr':
-            ds = xr.open_zarr(path_to_use)
+            ds = open_zarr_lazy(path_to_use)
             precip_vars = [v for v in ds.data_vars if any(term in str(v).lower() 
                           for term in ['rain', 'precip', 'precipitation'])]
             assert len(precip_vars) > 0, "No se encontró variable de precipitación"
             
-            val = float(ds[precip_vars[0]].mean().item())
+            val = float(subset_la(ds[precip_vars[0]]).mean().compute())
             log("✔️", f"IMERG Zarr válido ({precip_vars[0]}: {val:.3f} mm/hr)")
             
         else:  # CSV demo
@@ -161,13 +237,13 @@ def validate_merra2(zarr_path: Path, demo_path: Path) -> bool:
     
     try:
         if path_to_use.suffix == '.zarr':
-            ds = xr.open_zarr(path_to_use)
+            ds = open_zarr_lazy(path_to_use)
             required_vars = ["T2M", "U2M", "V2M"]
             missing_vars = [var for var in required_vars if var not in ds.data_vars]
             assert not missing_vars, f"Variables faltantes: {missing_vars}"
             
             # Verificar rangos razonables
-            temp_mean = float(ds["T2M"].mean().item())
+            temp_mean = float(subset_la(ds["T2M"]).mean().compute())
             assert 250 < temp_mean < 350, f"Temperatura irreal: {temp_mean} K"
             
             log("✔️", f"MERRA-2 Zarr válido (T2M: {temp_mean:.1f} K)")
@@ -201,6 +277,13 @@ def validate_file_exists(path: Path, name: str) -> bool:
         log("❌", f"{name} no encontrado: {path}")
         return False
 
+def _lat_lon_ranges(df: "pd.DataFrame") -> tuple:
+    """Rangos (min, max) de latitud y longitud con una sola agregación."""
+    stats = df[['latitude', 'longitude']].agg(['min', 'max'])
+    lat_range = (stats.loc['min', 'latitude'], stats.loc['max', 'latitude'])
+    lon_range = (stats.loc['min', 'longitude'], stats.loc['max', 'longitude'])
+    return lat_range, lon_range
+
 def validate_data_consistency() -> bool:
     """Validar consistencia entre datasets."""
     if not SCIENTIFIC_LIBS_AVAILABLE:
@@ -213,18 +296,14 @@ def validate_data_consistency() -> bool:
         
         # OpenAQ
         if CHECKS["OpenAQ"].exists():
-            df = pd.read_parquet(CHECKS["OpenAQ"])
+            df = read_parquet_columns(CHECKS["OpenAQ"], ['latitude', 'longitude'])
             if not df.empty:
-                lat_range = (df['latitude'].min(), df['latitude'].max())
-                lon_range = (df['longitude'].min(), df['longitude'].max())
-                bbox_checks.append(('OpenAQ', lat_range, lon_range))
+                bbox_checks.append(('OpenAQ', *_lat_lon_ranges(df)))
         
         # TEMPO demo
         if CHECKS["TEMPO_DEMO"].exists():
-            df = pd.read_csv(CHECKS["TEMPO_DEMO"])
-            lat_range = (df['latitude'].min(), df['latitude'].max())
-            lon_range = (df['longitude'].min(), df['longitude'].max())
-            bbox_checks.append(('TEMPO', lat_range, lon_range))
+            df = pd.read_csv(CHECKS["TEMPO_DEMO"], usecols=['latitude', 'longitude'])
+            bbox_checks.append(('TEMPO', *_lat_lon_ranges(df)))
         
         if len(bbox_checks) >= 2:
             # Verificar que los rangos se solapan (están en LA)
@@ -241,6 +320,34 @@ def validate_data_consistency() -> bool:
         log("⚠️", f"Validación de consistencia: {e}")
         return True  # No crítico
 
+def _hash_file(path: Path, h) -> None:
+    """Añade el contenido de un archivo al hash leyendo en bloques de 1 MiB."""
+    with open(path, 'rb') as f:
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+
+def file_checksum(path: Path) -> str:
+    """
+    SHA-256 de un archivo o de un directorio (p.ej. un store .zarr).
+    
+    Los directorios se recorren en orden estable y cada archivo aporta su
+    ruta relativa y su contenido a un único hash. La memoria usada es
+    constante (~1 MiB) sea cual sea el tamaño.
+    """
+    if path.is_dir():
+        h = hashlib.sha256()
+        for file_path in sorted(p for p in path.rglob('*') if p.is_file()):
+            h.update(file_path.relative_to(path).as_posix().encode())
+            _hash_file(file_path, h)
+        return h.hexdigest()
+    
+    with open(path, 'rb') as f:
+        if hasattr(hashlib, "file_digest"):  # Python 3.11+
+            return hashlib.file_digest(f, "sha256").hexdigest()
+    h = hashlib.sha256()
+    _hash_file(path, h)
+    return h.hexdigest()
+
 def validate_reproducibility() -> bool:
     """Validar que los archivos son estables."""
     try:
@@ -248,9 +355,7 @@ def validate_reproducibility() -> bool:
         checksums = {}
         for name, path in CHECKS.items():
             if path.exists():
-                with open(path, 'rb') as f:
-                    content = f.read()
-                checksums[name] = hashlib.md5(content).hexdigest()[:8]
+                checksums[name] = file_checksum(path)[:8]
         
         if checksums:
             log("✔️", f"Checksums calculados: {len(checksums)} archivos")
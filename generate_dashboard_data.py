@@ -5,14 +5,21 @@ Crea datos sintéticos que se ven bien en el dashboard
 """
 
 import asyncio
+import os
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import json
 import sys
 import logging
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Agregar directorio raíz al path
 sys.path.append(str(Path(__file__).parent))
 
@@ -22,11 +29,63 @@ from config_multicity import SUPPORTED_CITIES
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _aqi_segments(upper, conc_lo, conc_hi, aqi_lo, aqi_hi, aqi_max):
+    """
+    Tabla de tramos AQI precalculada: límites superiores (inclusivos) para
+    searchsorted, y recta aqi = intercepto + pendiente * concentración por tramo.
+    """
+    conc_lo, conc_hi = np.asarray(conc_lo, dtype=float), np.asarray(conc_hi, dtype=float)
+    aqi_lo, aqi_hi = np.asarray(aqi_lo, dtype=float), np.asarray(aqi_hi, dtype=float)
+    slope = (aqi_hi - aqi_lo) / (conc_hi - conc_lo)
+    return np.asarray(upper, dtype=float), aqi_lo - slope * conc_lo, slope, float(aqi_max)
+
+# Tramos EPA de PM2.5 (µg/m³); el último se extiende más allá de 250.4 con tope 300
+_PM25_SEGMENTS = _aqi_segments(
+    upper=[12.0, 35.4, 55.4, 150.4],
+    conc_lo=[0.0, 12.1, 35.5, 55.5, 150.5],
+    conc_hi=[12.0, 35.4, 55.4, 150.4, 250.4],
+    aqi_lo=[0, 50, 100, 150, 200],
+    aqi_hi=[50, 100, 150, 200, 300],
+    aqi_max=300,
+)
+
+# Tramos aproximados de NO2 superficial (ppb); tope 200
+_NO2_SEGMENTS = _aqi_segments(
+    upper=[53, 100],
+    conc_lo=[0, 54, 101],
+    conc_hi=[53, 100, 360],
+    aqi_lo=[0, 50, 100],
+    aqi_hi=[50, 100, 150],
+    aqi_max=200,
+)
+
+def _piecewise_aqi(values: np.ndarray, upper: np.ndarray, intercept: np.ndarray,
+                   slope: np.ndarray, aqi_max: float) -> np.ndarray:
+    """AQI por tramos: un searchsorted para el tramo y una recta por elemento"""
+    segment = np.searchsorted(upper, values, side="left")
+    aqi = intercept[segment] + slope[segment] * values
+    return np.minimum(aqi, aqi_max)
+
+def _json_bytes(obj) -> bytes:
+    """
+    Serializa a JSON indentado (2 espacios). Usa orjson si está instalado
+    (encoder nativo, acepta escalares NumPy); si no, el módulo json estándar.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, indent=2).encode()
+
 class DashboardSampleDataGenerator:
     """Generador de datos de muestra específicos para el dashboard"""
     
-    def __init__(self):
+    def __init__(self, legacy_csv: bool = False, seed=None):
         self.output_dir = Path("data/multi_city_processed")
+        self.legacy_csv = legacy_csv  # además del Parquet, escribir el CSV antiguo
+        
+        # Generador PCG64 propio; de la misma SeedSequence salen las semillas
+        # independientes de cada proceso del pool
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.rng = np.random.default_rng(self.seed_sequence)
         self.output_dir.mkdir(exist_ok=True, parents=True)
         
         # Configuración de datos realistas por ciudad
@@ -98,17 +157,33 @@ class DashboardSampleDataGenerator:
         logger.info(f"🎲 Generando datos de muestra para {len(SUPPORTED_CITIES)} ciudades")
         logger.info(f"📊 {points_per_city} puntos por ciudad = {points_per_city * len(SUPPORTED_CITIES):,} puntos totales")
         
-        for city_id, city_config in SUPPORTED_CITIES.items():
-            logger.info(f"🏙️  Generando {city_id}...")
-            await self.generate_city_data(city_id, city_config, points_per_city)
-        
-        # Generar reporte final
-        await self.generate_summary_report()
+        # Ciudades independientes y limitadas por CPU: un proceso por ciudad.
+        # Cada proceso recibe su propia semilla (si no, los hijos heredarían
+        # el mismo estado aleatorio y todas las ciudades serían idénticas).
+        loop = asyncio.get_running_loop()
+        seeds = self.seed_sequence.spawn(len(SUPPORTED_CITIES))
+        max_workers = min(len(SUPPORTED_CITIES), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            summaries = await asyncio.gather(*[
+                loop.run_in_executor(
+                    pool, _generate_city_worker, city_id, city_config, points_per_city,
+                    seed, self.legacy_csv
+                )
+                for (city_id, city_config), seed in zip(SUPPORTED_CITIES.items(), seeds)
+            ])
+        
+        # Generar reporte final con los resúmenes ya en memoria
+        await self.generate_summary_report(dict(zip(SUPPORTED_CITIES, summaries)))
         
         logger.info("🎉 Generación de datos completada")
     
     async def generate_city_data(self, city_id: str, city_config: dict, num_points: int):
         """Genera datos realistas para una ciudad específica"""
+        return self.build_city_data(city_id, city_config, num_points)
+    
+    def build_city_data(self, city_id: str, city_config: dict, num_points: int) -> dict:
+        """Genera y guarda los datos de una ciudad (síncrono, apto para procesos); devuelve su resumen"""
+        logger.info(f"🏙️  Generando {city_id}...")
         
         # Crear directorio de ciudad
         city_dir = self.output_dir / city_id
@@ -129,81 +204,66 @@ class DashboardSampleDataGenerator:
         # Crear grilla uniforme con algo de variación
         grid_points = self.create_realistic_grid(bbox, num_points)
         
-        # Generar datos para cada punto
-        data_points = []
+        # Generar datos para todos los puntos en bloque (columnas NumPy)
+        lons, lats = grid_points[:, 0], grid_points[:, 1]
         
-        for i, (lon, lat) in enumerate(grid_points):
-            # Calcular distancia a hotspots para variación espacial
-            pollution_factor = self.calculate_pollution_factor(
-                lon, lat, characteristics["hotspots"], characteristics["base_pollution"]
-            )
-            
-            # Generar datos realistas
-            point_data = self.generate_point_data(
-                lon, lat, pollution_factor, characteristics["variability"]
-            )
-            
-            data_points.append(point_data)
+        # Calcular distancia a hotspots para variación espacial
+        pollution_factor = self.calculate_pollution_factor(
+            lons, lats, characteristics["hotspots"], characteristics["base_pollution"]
+        )
         
-        # Crear DataFrame
-        df = pd.DataFrame(data_points)
+        # Generar datos realistas
+        df = self.generate_points_data(lons, lats, pollution_factor, characteristics["variability"])
         
         # Guardar archivos
-        await self.save_city_data(city_id, city_config, df, characteristics)
+        summary = self.save_city_data(city_id, city_config, df, characteristics)
         
         logger.info(f"  ✅ {city_config['name']}: {len(df)} puntos generados")
+        return summary
     
-    def create_realistic_grid(self, bbox: list, num_points: int) -> list:
-        """Crea una grilla realista con distribución no uniforme"""
+    def create_realistic_grid(self, bbox: list, num_points: int) -> np.ndarray:
+        """Crea una grilla realista con distribución no uniforme (array (N, 2) de lon, lat)"""
         west, south, east, north = bbox
         
         # Calcular densidad aproximada
         area_width = east - west
         area_height = north - south
         
-        # Distribución más densa en el centro (área urbana)
-        points = []
-        
         # Grid base uniforme
         grid_size = int(np.sqrt(num_points * 0.7))  # 70% uniforme
         
         lon_step = area_width / grid_size
         lat_step = area_height / grid_size
         
-        # Puntos uniformes
-        for i in range(grid_size):
-            for j in range(grid_size):
-                lon = west + (i + 0.5) * lon_step + np.random.normal(0, lon_step * 0.1)
-                lat = south + (j + 0.5) * lat_step + np.random.normal(0, lat_step * 0.1)
-                
-                # Mantener dentro de bounds
-                lon = max(west, min(east, lon))
-                lat = max(south, min(north, lat))
-                
-                points.append((lon, lat))
+        # Puntos uniformes (centros de celda + jitter), manteniendo dentro de bounds
+        cells = np.arange(grid_size) + 0.5
+        lon = west + cells[:, None] * lon_step + self.rng.normal(0, lon_step * 0.1, (grid_size, grid_size))
+        lat = south + cells[None, :] * lat_step + self.rng.normal(0, lat_step * 0.1, (grid_size, grid_size))
+        np.clip(lon, west, east, out=lon)
+        np.clip(lat, south, north, out=lat)
         
         # Puntos adicionales aleatorios (30%)
-        remaining_points = num_points - len(points)
-        
-        for _ in range(remaining_points):
-            lon = np.random.uniform(west, east)
-            lat = np.random.uniform(south, north)
-            points.append((lon, lat))
-        
+        remaining_points = max(num_points - grid_size * grid_size, 0)
+        extra_lon = self.rng.uniform(west, east, remaining_points)
+        extra_lat = self.rng.uniform(south, north, remaining_points)
+        
+        points = np.column_stack([
+            np.concatenate([lon.ravel(), extra_lon]),
+            np.concatenate([lat.ravel(), extra_lat]),
+        ])
         return points[:num_points]
     
-    def calculate_pollution_factor(self, lon: float, lat: float, hotspots: list, base_pollution: float) -> float:
-        """Calcula factor de contaminación basado en distancia a hotspots"""
+    def calculate_pollution_factor(self, lons: np.ndarray, lats: np.ndarray,
+                                   hotspots: list, base_pollution: float) -> np.ndarray:
+        """Calcula factor de contaminación basado en distancia a hotspots (todos los puntos)"""
         
         if not hotspots:
-            return base_pollution
-        
-        # Calcular distancia mínima a hotspots
-        min_distance = float('inf')
+            return np.full(len(lons), float(base_pollution))
         
-        for hotspot_lat, hotspot_lon in hotspots:
-            distance = np.sqrt((lon - hotspot_lon)**2 + (lat - hotspot_lat)**2)
-            min_distance = min(min_distance, distance)
+        # Distancia mínima a hotspots: matriz (N puntos, H hotspots) por broadcasting
+        hs = np.asarray(hotspots, dtype=float)  # (H, 2) como (lat, lon)
+        distances = np.hypot(lons[:, None] - hs[None, :, 1], lats[:, None] - hs[None, :, 0])
+        min_distance = distances.min(axis=1)
         
         # Factor de distancia (más cerca = más contaminación)
         distance_factor = np.exp(-min_distance * 50)  # Decay exponencial
@@ -213,55 +273,63 @@ class DashboardSampleDataGenerator:
         
         return base_pollution + pollution_boost
     
-    def generate_point_data(self, lon: float, lat: float, pollution_factor: float, variability: float) -> dict:
-        """Genera datos realistas para un punto específico"""
+    _FLOAT32_COLUMNS = frozenset({
+        'no2_column', 'o3_column', 'pm25_surface', 'temperature', 'humidity',
+        'wind_speed', 'wind_direction', 'pressure', 'data_quality',
+        'aqi_pm25', 'aqi_no2', 'aqi_combined', 'risk_score'
+    })
+    
+    def generate_points_data(self, lons: np.ndarray, lats: np.ndarray,
+                             pollution_factor: np.ndarray, variability: float) -> pd.DataFrame:
+        """Genera datos realistas para todos los puntos a la vez (operaciones vectorizadas)"""
+        n = len(lons)
         
-        # Timestamp actual
+        # Timestamp actual (uno para todo el lote)
         timestamp = datetime.utcnow()
         
         # Risk score basado en pollution factor con variabilidad
-        risk_score = pollution_factor + np.random.normal(0, variability)
-        risk_score = max(0, min(100, risk_score))  # Clamp 0-100
+        risk_score = pollution_factor + self.rng.normal(0, variability, n)
+        np.clip(risk_score, 0, 100, out=risk_score)  # Clamp 0-100
         
         # NO2 columnar (correlacionado con risk score)
         no2_base = (risk_score / 100) * 8e15  # Rango típico TEMPO
-        no2_column = no2_base * (1 + np.random.normal(0, 0.3))
-        no2_column = max(1e14, no2_column)  # Mínimo realista
+        no2_column = no2_base * (1 + self.rng.normal(0, 0.3, n))
+        np.maximum(no2_column, 1e14, out=no2_column)  # Mínimo realista
         
         # PM2.5 superficial (correlacionado pero con más variabilidad)
         pm25_base = (risk_score / 100) * 40  # 0-40 μg/m³
-        pm25_surface = pm25_base * (1 + np.random.normal(0, 0.4))
-        pm25_surface = max(0, pm25_surface)
+        pm25_surface = pm25_base * (1 + self.rng.normal(0, 0.4, n))
+        np.maximum(pm25_surface, 0, out=pm25_surface)
         
         # O3 (anti-correlacionado parcialmente con NO2)
         o3_base = (80 - risk_score * 0.3) / 100 * 6e15
-        o3_column = o3_base * (1 + np.random.normal(0, 0.2))
-        o3_column = max(1e14, o3_column)
+        o3_column = o3_base * (1 + self.rng.normal(0, 0.2, n))
+        np.maximum(o3_column, 1e14, out=o3_column)
         
         # Datos meteorológicos
-        temperature = np.random.normal(20, 8)  # °C
-        humidity = np.random.normal(60, 15)    # %
-        humidity = max(20, min(90, humidity))
+        temperature = self.rng.normal(20, 8, n)  # °C
+        humidity = self.rng.normal(60, 15, n)    # %
+        np.clip(humidity, 20, 90, out=humidity)
         
-        wind_speed = np.random.exponential(3)  # m/s
-        wind_direction = np.random.uniform(0, 360)  # grados
+        wind_speed = self.rng.exponential(3, n)  # m/s
+        wind_direction = self.rng.uniform(0, 360, n)  # grados
         
-        pressure = np.random.normal(1013, 10)  # hPa
+        pressure = self.rng.normal(1013, 10, n)  # hPa
         
         # Calidad de datos (simulada)
-        data_quality = np.random.uniform(0.7, 1.0)
+        data_quality = self.rng.uniform(0.7, 1.0, n)
         
         # AQI calculado
         aqi_pm25 = self.pm25_to_aqi(pm25_surface)
         aqi_no2 = self.no2_column_to_aqi(no2_column)
-        aqi_combined = max(aqi_pm25, aqi_no2)
+        aqi_combined = np.maximum(aqi_pm25, aqi_no2)
         
         # Categoría de calidad del aire
         air_quality_category = self.aqi_to_category(aqi_combined)
         
-        return {
-            'longitude': round(lon, 6),
-            'latitude': round(lat, 6),
+        columns = {
+            'longitude': np.round(lons, 6),
+            'latitude': np.round(lats, 6),
             'timestamp': timestamp,
             'no2_column': no2_column,
             'o3_column': o3_column,
@@ -278,55 +346,60 @@ class DashboardSampleDataGenerator:
             'air_quality_category': air_quality_category,
             'risk_score': risk_score  # Para compatibilidad con dashboard
         }
+        
+        # Magnitudes en float32; lon/lat siguen en float64 para conservar los 6 decimales
+        return pd.DataFrame({
+            name: values.astype(np.float32) if name in self._FLOAT32_COLUMNS else values
+            for name, values in columns.items()
+        })
     
-    def pm25_to_aqi(self, pm25_val: float) -> float:
-        """Convierte PM2.5 a AQI (EPA)"""
-        if pm25_val <= 12.0:
-            return (50 / 12.0) * pm25_val
-        elif pm25_val <= 35.4:
-            return 50 + ((100 - 50) / (35.4 - 12.1)) * (pm25_val - 12.1)
-        elif pm25_val <= 55.4:
-            return 100 + ((150 - 100) / (55.4 - 35.5)) * (pm25_val - 35.5)
-        elif pm25_val <= 150.4:
-            return 150 + ((200 - 150) / (150.4 - 55.5)) * (pm25_val - 55.5)
-        else:
-            return min(300, 200 + ((300 - 200) / (250.4 - 150.5)) * (pm25_val - 150.5))
+    def pm25_to_aqi(self, pm25_val: np.ndarray) -> np.ndarray:
+        """Convierte PM2.5 a AQI (EPA), vectorizado por tramos"""
+        return _piecewise_aqi(np.asarray(pm25_val, dtype=float), *_PM25_SEGMENTS)
     
-    def no2_column_to_aqi(self, no2_column: float) -> float:
-        """Convierte NO2 columnar a AQI aproximado"""
+    def no2_column_to_aqi(self, no2_column: np.ndarray) -> np.ndarray:
+        """Convierte NO2 columnar a AQI aproximado, vectorizado por tramos"""
         # Conversión aproximada columna troposférica -> superficie -> AQI
-        surface_no2_approx = no2_column / 2.69e15 * 100
-        
-        if surface_no2_approx <= 53:
-            return (50 / 53) * surface_no2_approx
-        elif surface_no2_approx <= 100:
-            return 50 + ((100 - 50) / (100 - 54)) * (surface_no2_approx - 54)
-        else:
-            return min(200, 100 + ((150 - 100) / (360 - 101)) * (surface_no2_approx - 101))
+        surface_no2_approx = np.asarray(no2_column, dtype=float) / 2.69e15 * 100
+        return _piecewise_aqi(surface_no2_approx, *_NO2_SEGMENTS)
     
-    def aqi_to_category(self, aqi_val: float) -> str:
-        """Convierte AQI a categoría"""
-        if aqi_val <= 50:
-            return "Good"
-        elif aqi_val <= 100:
-            return "Moderate"
-        elif aqi_val <= 150:
-            return "Unhealthy for Sensitive Groups"
-        elif aqi_val <= 200:
-            return "Unhealthy"
-        elif aqi_val <= 300:
-            return "Very Unhealthy"
-        else:
-            return "Hazardous"
+    _AQI_BOUNDS = np.array([50, 100, 150, 200, 300])
+    _AQI_LABELS = [
+        "Good", "Moderate", "Unhealthy for Sensitive Groups",
+        "Unhealthy", "Very Unhealthy", "Hazardous"
+    ]
     
-    async def save_city_data(self, city_id: str, city_config: dict, df: pd.DataFrame, characteristics: dict):
-        """Guarda datos de ciudad en múltiples formatos"""
+    def aqi_to_category(self, aqi_val: np.ndarray) -> pd.Categorical:
+        """Convierte AQI a categoría (límites superiores inclusivos)"""
+        codes = np.searchsorted(self._AQI_BOUNDS, aqi_val, side="left")
+        return pd.Categorical.from_codes(codes, categories=self._AQI_LABELS)
+    
+    def save_city_data(self, city_id: str, city_config: dict, df: pd.DataFrame, characteristics: dict) -> dict:
+        """Guarda datos de ciudad en múltiples formatos y devuelve el resumen"""
         
         city_dir = self.output_dir / city_id
         
-        # CSV principal
-        csv_file = city_dir / f"{city_id}_latest.csv"
-        df.to_csv(csv_file, index=False)
+        # Parquet principal (columnar, Snappy)
+        parquet_file = city_dir / f"{city_id}_latest.parquet"
+        df.to_parquet(parquet_file, engine="pyarrow", compression="snappy", index=False)
+        
+        # CSV solo por compatibilidad: gzip rápido y escritura por bloques
+        if self.legacy_csv:
+            csv_file = city_dir / f"{city_id}_latest.csv.gz"
+            df.to_csv(csv_file, index=False, chunksize=10000,
+                      compression={'method': 'gzip', 'compresslevel': 1})
+        
+        # Estadísticas en una sola agregación; la moda de la categoría por
+        # conteo de códigos sobre el vocabulario fijo de etiquetas
+        stats = df.agg({
+            'data_quality': ['mean'],
+            'aqi_combined': ['mean', 'max', 'min'],
+            'no2_column': ['mean'],
+            'pm25_surface': ['mean'],
+            'temperature': ['mean'],
+        })
+        category = df['air_quality_category'].cat
+        category_counts = np.bincount(category.codes.to_numpy() + 1, minlength=len(category.categories) + 1)[1:]
         
         # Resumen JSON
         summary = {
@@ -339,29 +412,30 @@ class DashboardSampleDataGenerator:
             "total_points": len(df),
             "characteristics": characteristics,
             "data_quality": {
-                "mean_quality": float(df['data_quality'].mean()),
-                "points_high_quality": int((df['data_quality'] > 0.8).sum()),
+                "mean_quality": float(stats.at['mean', 'data_quality']),
+                "points_high_quality": int(np.count_nonzero(df['data_quality'].to_numpy() > 0.8)),
                 "coverage_percentage": 100.0
             },
             "air_quality_summary": {
-                "mean_aqi": float(df['aqi_combined'].mean()),
-                "max_aqi": float(df['aqi_combined'].max()),
-                "min_aqi": float(df['aqi_combined'].min()),
-                "dominant_category": df['air_quality_category'].mode().iloc[0]
+                "mean_aqi": float(stats.at['mean', 'aqi_combined']),
+                "max_aqi": float(stats.at['max', 'aqi_combined']),
+                "min_aqi": float(stats.at['min', 'aqi_combined']),
+                "dominant_category": category.categories[category_counts.argmax()]
             },
             "pollutant_stats": {
-                "mean_no2": float(df['no2_column'].mean()),
-                "mean_pm25": float(df['pm25_surface'].mean()),
-                "mean_temperature": float(df['temperature'].mean())
+                "mean_no2": float(stats.at['mean', 'no2_column']),
+                "mean_pm25": float(stats.at['mean', 'pm25_surface']),
+                "mean_temperature": float(stats.at['mean', 'temperature'])
             }
         }
         
         summary_file = city_dir / f"{city_id}_summary.json"
-        with open(summary_file, 'w') as f:
-            json.dump(summary, f, indent=2)
+        summary_file.write_bytes(_json_bytes(summary))
+        
+        return summary
     
-    async def generate_summary_report(self):
-        """Genera reporte resumen de todos los datos generados"""
+    async def generate_summary_report(self, summaries: dict):
+        """Genera reporte resumen a partir de los resúmenes por ciudad (city_id -> resumen)"""
         
         report = {
             "generation_summary": {
@@ -386,12 +460,9 @@ class DashboardSampleDataGenerator:
         total_aqi = 0
         
         for city_id in SUPPORTED_CITIES.keys():
-            summary_file = self.output_dir / city_id / f"{city_id}_summary.json"
+            city_summary = summaries.get(city_id)
             
-            if summary_file.exists():
-                with open(summary_file, 'r') as f:
-                    city_summary = json.load(f)
-                
+            if city_summary is not None:
                 report["cities"][city_id] = city_summary
                 report["global_stats"]["total_points"] += city_summary["total_points"]
                 
@@ -414,14 +485,20 @@ class DashboardSampleDataGenerator:
         
         # Guardar reporte
         report_file = self.output_dir / "dashboard_sample_data_report.json"
-        with open(report_file, 'w') as f:
-            json.dump(report, f, indent=2)
+        report_file.write_bytes(_json_bytes(report))
         
         logger.info(f"📊 Reporte guardado: {report_file}")
         logger.info(f"📈 Total puntos: {report['global_stats']['total_points']:,}")
         logger.info(f"🎯 AQI promedio: {report['global_stats']['average_aqi']:.1f}")
 
 
+def _generate_city_worker(city_id: str, city_config: dict, num_points: int,
+                          seed: np.random.SeedSequence, legacy_csv: bool):
+    """Genera una ciudad en un proceso del pool (función de módulo, serializable)"""
+    generator = DashboardSampleDataGenerator(legacy_csv=legacy_csv, seed=seed)
+    return generator.build_city_data(city_id, city_config, num_points)
+
+
 async def main():
     """Función principal"""
     import argparse
@@ -429,10 +506,12 @@ async def main():
     parser = argparse.ArgumentParser(description='Generar datos de muestra para dashboard')
     parser.add_argument('--points', type=int, default=3000, help='Puntos por ciudad')
     parser.add_argument('--cities', nargs='+', help='Ciudades específicas')
+    parser.add_argument('--legacy-csv', action='store_true', help='Escribir también el CSV antiguo (gzip)')
+    parser.add_argument('--seed', type=int, help='Semilla para datos reproducibles')
     
     args = parser.parse_args()
     
-    generator = DashboardSampleDataGenerator()
+    generator = DashboardSampleDataGenerator(legacy_csv=args.legacy_csv, seed=args.seed)
     
     if args.cities:
         # Solo ciudades específicas
@@ -1,5 +1,6 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from typing import Dict, Any, List
 import datetime as dt
 import os
@@ -19,6 +20,9 @@ except ImportError as e:
         API_PORT = int(os.getenv("PORT", "8000"))
     settings = FallbackSettings()
 
+# Stubs de /api/latest, /api/forecast, /api/alerts, /api/tiles
+from api.routes.stub import router as stub_router
+
 # Import multi-city routes with error handling
 try:
     from api.routes.multi_city import router as multi_city_router
@@ -52,6 +56,7 @@ app = FastAPI(
     description="API para monitoreo de calidad del aire en Norte América usando datos satelitales NASA TEMPO",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=ORJSONResponse,  # orjson en lugar de json stdlib
 )
 
 # CORS (permitir frontend local, vercel y railway)
@@ -75,9 +80,10 @@ if MULTI_CITY_OPTIMIZED_AVAILABLE:
 if DASHBOARD_AVAILABLE:
     app.include_router(dashboard_router)
 
-@app.get("/")
-def root():
-    """Endpoint raíz con información del sistema."""
+app.include_router(stub_router, prefix="/api")
+
+def _build_root_body() -> Dict[str, Any]:
+    """Cuerpo de "/": solo depende de las rutas cargadas al importar."""
     endpoints = {
         "health": "/health",
         "docs": "/docs",
@@ -133,6 +139,13 @@ def root():
         }
     }
 
+_ROOT_BODY = _build_root_body()
+
+@app.get("/")
+def root():
+    """Endpoint raíz con información del sistema."""
+    return _ROOT_BODY
+
 @app.get("/health")
 def health():
     """Health check endpoint con información del sistema."""
@@ -162,47 +175,3 @@ def health():
             "merra2": "NASA MERRA-2 (Meteorology)",
         },
     }
-
-# ---- Stubs de endpoints ----
-@app.get("/api/latest")
-def api_latest() -> Dict[str, Any]:
-    # TODO: Reemplazar con lectura real (Zarr/DB). Respuesta de ejemplo.
-    return {
-        "bbox": [-118.7, 33.6, -117.8, 34.4],
-        "generated_at": dt.datetime.utcnow().isoformat() + "Z",
-        "grid_resolution_deg": 0.05,
-        "variables": ["no2", "pm25", "o3", "temp", "wind", "rain"],
-        "cells": [
-            {"lat": 34.00, "lon": -118.30, "risk_score": 58, "class": "moderate"},
-            {"lat": 34.05, "lon": -118.25, "risk_score": 71, "class": "bad"},
-        ],
-    }
-
-@app.get("/api/forecast")
-def api_forecast() -> Dict[str, Any]:
-    horizon_hours = [1, 2, 3, 4, 5, 6]
-    # TODO: Sustituir por modelo ML/Advección
-    return {
-        "generated_at": dt.datetime.utcnow().isoformat() + "Z",
-        "forecasts": [{"hour": h, "risk_score": max(0, min(100, 60 + h*2))} for h in horizon_hours],
-    }
-
-@app.get("/api/alerts")
-def api_alerts() -> Dict[str, Any]:
-    # TODO: Generar desde análisis de rejilla
-    return {
-        "generated_at": dt.datetime.utcnow().isoformat() + "Z",
-        "alerts": [
-            {
-                "level": "high",
-                "risk_score": 72,
-                "message": "Calidad del aire mala. Evite actividades al aire libre.",
-                "centroid": {"lat": 34.05, "lon": -118.24},
-            }
-        ],
-    }
-
-@app.get("/api/tiles/{z}/{x}/{y}.png")
-def api_tiles(z: int, x: int, y: int):
-    # TODO: Render real de tiles. Por ahora retornamos 404 para indicar stub.
-    raise HTTPException(status_code=404, detail="Tiles not implemented yet")
@@ -8,11 +8,19 @@ import asyncio
 import logging
 import sys
 import os
+import time
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import json
 from datetime import datetime
 import argparse
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Agregar directorio raíz al path
 sys.path.append(str(Path(__file__).parent))
@@ -32,6 +40,24 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def _json_bytes(obj) -> bytes:
+    """
+    Serializa a JSON indentado (2 espacios). Usa orjson si está instalado
+    (acepta escalares NumPy); si no, el módulo json estándar. Lo que ninguno
+    sabe serializar se guarda como str().
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, indent=2, default=str).encode()
+
+# Orden estable de ciudades, calculado una vez
+CITY_IDS: Tuple[str, ...] = tuple(SUPPORTED_CITIES)
+CITY_INDEX: Dict[str, int] = {city_id: index for index, city_id in enumerate(CITY_IDS)}
+FIRST_CITY = CITY_IDS[0]
+
+# Categorías de calidad del aire de los datos de muestra
+SAMPLE_CATEGORIES = ('Good', 'Moderate', 'Unhealthy for Sensitive Groups')
+
 class MultiCitySetup:
     """Configurador completo del sistema multi-ciudad"""
     
@@ -86,7 +112,7 @@ class MultiCitySetup:
             await self.initialize()
             
             # Determinar ciudades a procesar
-            cities_to_process = cities or list(SUPPORTED_CITIES.keys())
+            cities_to_process = cities or list(CITY_IDS)
             logger.info(f"📍 Configurando {len(cities_to_process)} ciudades: {cities_to_process}")
             
             # 1. Configurar estructura de base de datos
@@ -161,56 +187,73 @@ class MultiCitySetup:
     
     async def _optimize_sqlite(self):
         """Optimizaciones específicas para SQLite"""
-        optimizations = [
-            "PRAGMA cache_size = 10000",
-            "PRAGMA synchronous = NORMAL", 
-            "PRAGMA journal_mode = WAL",
-            "PRAGMA temp_store = MEMORY",
-            "PRAGMA mmap_size = 268435456",
-            "PRAGMA optimize"
-        ]
+        # Un solo script: executescript confirma la transacción pendiente antes,
+        # así journal_mode=WAL no se ignora por correr dentro de una transacción
+        optimizations = """
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            PRAGMA cache_size = -64000;
+            PRAGMA temp_store = MEMORY;
+            PRAGMA mmap_size = 268435456;
+            PRAGMA wal_autocheckpoint = 1000;
+            PRAGMA optimize;
+        """
         
-        for opt in optimizations:
-            try:
-                self.storage.sqlite_conn.execute(opt)
-                logger.debug(f"✅ Aplicada: {opt}")
-            except Exception as e:
-                logger.warning(f"⚠️  No se pudo aplicar: {opt} - {e}")
+        try:
+            self.storage.sqlite_conn.executescript(optimizations)
+        except Exception as e:
+            logger.warning(f"⚠️  No se pudieron aplicar las optimizaciones SQLite: {e}")
+            return
         
-        self.storage.sqlite_conn.commit()
+        journal_mode = self.storage.sqlite_conn.execute("PRAGMA journal_mode").fetchone()[0]
+        if journal_mode.lower() != "wal":
+            logger.warning(f"⚠️  SQLite sigue en journal_mode={journal_mode} (se esperaba WAL)")
+        else:
+            logger.debug("✅ Optimizaciones SQLite aplicadas (WAL)")
     
     async def _optimize_filesystem(self):
         """Optimizaciones para sistema de archivos"""
         # Crear estructura de directorios optimizada
         base_dir = Path("data/multi_city_optimized")
         
-        # Directorio para índices y cache
-        (base_dir / "indexes").mkdir(exist_ok=True, parents=True)
-        (base_dir / "cache").mkdir(exist_ok=True, parents=True)
-        (base_dir / "stats").mkdir(exist_ok=True, parents=True)
-        (base_dir / "temp").mkdir(exist_ok=True, parents=True)
-        
-        # Configurar estructura por ciudad
-        for city_id in SUPPORTED_CITIES.keys():
-            city_dir = base_dir / city_id
-            city_dir.mkdir(exist_ok=True)
-            
-            # Subdirectorios optimizados
-            for subdir in ["latest", "historical", "cache", "stats", "tiles"]:
-                (city_dir / subdir).mkdir(exist_ok=True)
+        # Solo directorios hoja: mkdir(parents=True) crea base_dir y cada ciudad
+        leaf_dirs = [base_dir / subdir for subdir in ("indexes", "cache", "stats", "temp")]
+        leaf_dirs += [
+            base_dir / city_id / subdir
+            for city_id in CITY_IDS
+            for subdir in ("latest", "historical", "cache", "stats", "tiles")
+        ]
+        for leaf_dir in leaf_dirs:
+            leaf_dir.mkdir(parents=True, exist_ok=True)
         
         logger.info("📁 Estructura de directorios optimizada creada")
     
     async def _create_spatial_indexes(self):
         """Crea índices espaciales para búsquedas rápidas"""
         
-        # Crear índices por ciudad
-        for city_id in SUPPORTED_CITIES.keys():
-            try:
-                await self._create_city_spatial_index(city_id)
+        if self.storage.config.db_type.value == "postgresql":
+            # CREATE INDEX CONCURRENTLY toma SHARE UPDATE EXCLUSIVE sobre
+            # city_air_quality, que choca consigo mismo: en paralelo solo se
+            # serializarían ocupando conexiones del pool. Uno tras otro.
+            results = []
+            for city_id in CITY_IDS:
+                try:
+                    results.append(await self._create_city_spatial_index(city_id))
+                except Exception as e:
+                    results.append(e)
+        else:
+            # Resto de backends: el índice JSON del filesystem no espera I/O, así
+            # que gather no lo solapa; solo recoge el error de cada ciudad
+            results = await asyncio.gather(
+                *(self._create_city_spatial_index(city_id) for city_id in CITY_IDS),
+                return_exceptions=True
+            )
+        
+        for city_id, result in zip(CITY_IDS, results):
+            if isinstance(result, Exception):
+                logger.warning(f"⚠️  Error creando índice para {city_id}: {result}")
+            else:
                 logger.info(f"🗂️  Índice espacial creado para {city_id}")
-            except Exception as e:
-                logger.warning(f"⚠️  Error creando índice para {city_id}: {e}")
         
         logger.info("✅ Índices espaciales creados")
     
@@ -218,13 +261,26 @@ class MultiCitySetup:
         """Crea índice espacial para una ciudad específica"""
         
         if self.storage.config.db_type.value == "postgresql":
-            # Usar PostGIS para índices espaciales reales
+            # DDL no admite parámetros ($1): city_id solo puede venir del catálogo
+            # de ciudades y se escapa como literal SQL
+            if city_id not in SUPPORTED_CITIES:
+                raise ValueError(f"Ciudad no soportada: {city_id}")
+            city_literal = city_id.replace("'", "''")
+            
+            # Usar PostGIS para índices espaciales reales. CONCURRENTLY no bloquea
+            # escrituras en la tabla (debe ir fuera de una transacción)
             async with self.storage.connection_pool.acquire() as conn:
-                await conn.execute(f"""
-                    CREATE INDEX IF NOT EXISTS idx_{city_id}_spatial 
-                    ON city_air_quality USING GIST (ST_Point(longitude, latitude))
-                    WHERE city_id = '{city_id}'
-                """)
+                try:
+                    await conn.execute(f"""
+                        CREATE INDEX CONCURRENTLY IF NOT EXISTS "idx_{city_id}_spatial" 
+                        ON city_air_quality USING GIST (ST_Point(longitude, latitude))
+                        WHERE city_id = '{city_literal}'
+                    """)
+                except Exception:
+                    # Un CONCURRENTLY fallido deja el índice INVALID y IF NOT EXISTS
+                    # lo saltaría en cada setup posterior: eliminarlo antes de propagar
+                    await conn.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "idx_{city_id}_spatial"')
+                    raise
         
         elif self.storage.config.db_type.value == "filesystem":
             # Crear índice espacial simplificado en JSON
@@ -237,8 +293,7 @@ class MultiCitySetup:
             
             # Guardar índice
             index_file = Path("data/multi_city_optimized/indexes") / f"{city_id}_spatial.json"
-            with open(index_file, 'w') as f:
-                json.dump(grid_index, f, indent=2)
+            index_file.write_bytes(_json_bytes(grid_index))
     
     def _generate_grid_index(self, bbox: List[float], resolution: float) -> Dict:
         """Genera índice de grilla espacial"""
@@ -272,12 +327,15 @@ class MultiCitySetup:
             logger.info("🔄 Ejecutando ETL con datos reales...")
             return await self.etl.run_complete_etl(cities)
     
-    async def _generate_sample_data(self, cities: List[str]) -> Dict:
-        """Genera datos de muestra para testing"""
-        import pandas as pd
-        import numpy as np
-        from datetime import datetime, timedelta
+    async def _generate_sample_data(self, cities: List[str], seed: int = 42) -> Dict:
+        """
+        Genera datos de muestra para testing
         
+        Args:
+            cities: Ciudades a generar
+            seed: Semilla base; cada ciudad usa seed + su índice en SUPPORTED_CITIES,
+                  así sus datos son reproducibles sin importar el subconjunto pedido
+        """
         total_points = 0
         processed_cities = 0
         
@@ -294,31 +352,30 @@ class MultiCitySetup:
                 
                 lons = np.arange(west, east, resolution)
                 lats = np.arange(south, north, resolution)
-                lon_grid, lat_grid = np.meshgrid(lons, lats)
                 
-                # Crear DataFrame con datos sintéticos
-                points = []
-                for i in range(lon_grid.shape[0]):
-                    for j in range(lon_grid.shape[1]):
-                        # Datos sintéticos realistas
-                        point = {
-                            'longitude': lon_grid[i, j],
-                            'latitude': lat_grid[i, j],
-                            'timestamp': datetime.utcnow(),
-                            'no2_column': np.random.normal(5e15, 2e15),  # NO2 column
-                            'pm25_surface': np.random.normal(15, 8),     # PM2.5
-                            'temperature': np.random.normal(20, 10),      # Temperatura
-                            'humidity': np.random.normal(60, 20),         # Humedad
-                            'wind_speed': np.random.normal(5, 3),         # Viento
-                            'data_quality': np.random.uniform(0.7, 1.0), # Calidad
-                            'aqi_combined': np.random.normal(50, 25),     # AQI
-                            'air_quality_category': np.random.choice([
-                                'Good', 'Moderate', 'Unhealthy for Sensitive Groups'
-                            ])
-                        }
-                        points.append(point)
+                # Grilla aplanada fila por fila (latitud mayor) sin mallas 2-D intermedias
+                lon_flat = np.tile(lons, lats.size)
+                lat_flat = np.repeat(lats, lons.size)
                 
-                sample_data = pd.DataFrame(points)
+                # Crear DataFrame con datos sintéticos: una muestra vectorizada por columna
+                n_points = lon_flat.size
+                rng = np.random.default_rng(seed + CITY_INDEX[city_id])
+                sample_data = pd.DataFrame({
+                    'longitude': lon_flat,
+                    'latitude': lat_flat,
+                    'timestamp': datetime.utcnow(),
+                    'no2_column': rng.normal(5e15, 2e15, n_points),  # NO2 column
+                    'pm25_surface': rng.normal(15, 8, n_points),     # PM2.5
+                    'temperature': rng.normal(20, 10, n_points),     # Temperatura
+                    'humidity': rng.normal(60, 20, n_points),        # Humedad
+                    'wind_speed': rng.normal(5, 3, n_points),        # Viento
+                    'data_quality': rng.uniform(0.7, 1.0, n_points), # Calidad
+                    'aqi_combined': rng.normal(50, 25, n_points),    # AQI
+                    'air_quality_category': pd.Categorical.from_codes(
+                        rng.integers(0, len(SAMPLE_CATEGORIES), n_points, dtype=np.int8),
+                        categories=SAMPLE_CATEGORIES
+                    )
+                })
                 
                 # Almacenar datos
                 await self.storage.store_city_data(
@@ -357,20 +414,19 @@ class MultiCitySetup:
             # Test conexión a base de datos
             validation_results["database_status"] = "connected"
             
-            # Validar cada ciudad
-            for city_id in cities:
-                try:
-                    # Intentar cargar datos
-                    data = await self.storage.load_city_data(city_id, limit=10)
-                    
-                    if len(data) > 0:
-                        validation_results["cities_with_data"] += 1
-                        validation_results["total_points_found"] += len(data)
-                    
-                    validation_results["cities_validated"] += 1
-                    
-                except Exception as e:
-                    validation_results["issues"].append(f"{city_id}: {str(e)}")
+            # Validar todas las ciudades con un solo conteo (sin cargar datos)
+            try:
+                point_counts = await self.storage.count_city_points(cities)
+            except Exception as e:
+                validation_results["issues"].append(f"Conteo de puntos: {str(e)}")
+                point_counts = {}
+            
+            for city_id, points in point_counts.items():
+                if points > 0:
+                    validation_results["cities_with_data"] += 1
+                    validation_results["total_points_found"] += points
+                
+                validation_results["cities_validated"] += 1
             
             # Test de rendimiento básico
             if validation_results["cities_with_data"] > 0:
@@ -383,48 +439,50 @@ class MultiCitySetup:
         return validation_results
     
     async def _run_performance_tests(self) -> Dict:
-        """Ejecuta tests básicos de rendimiento"""
-        import time
+        """Ejecuta tests básicos de rendimiento (ambas consultas a la vez)"""
+        async def timed(query):
+            # perf_counter_ns: reloj monótono, no le afectan ajustes NTP
+            start_ns = time.perf_counter_ns()
+            data = await query
+            return data, (time.perf_counter_ns() - start_ns) / 1e9
+        
+        test_city = FIRST_CITY
+        bbox = SUPPORTED_CITIES[test_city]["bbox"]
+        # Consulta en un área pequeña
+        small_bbox = [
+            bbox[0], bbox[1], 
+            bbox[0] + (bbox[2] - bbox[0]) * 0.1,
+            bbox[1] + (bbox[3] - bbox[1]) * 0.1
+        ]
+        
+        # Test: Carga de datos de una ciudad / Test: Consulta espacial
+        load_result, spatial_result = await asyncio.gather(
+            timed(self.storage.load_city_data(test_city, limit=1000)),
+            timed(self.storage.load_city_data(test_city, bbox=small_bbox)),
+            return_exceptions=True
+        )
         
         perf_results = {}
         
-        # Test: Carga de datos de una ciudad
-        try:
-            start_time = time.time()
-            test_city = list(SUPPORTED_CITIES.keys())[0]
-            data = await self.storage.load_city_data(test_city, limit=1000)
-            load_time = time.time() - start_time
-            
+        if isinstance(load_result, Exception):
+            perf_results["data_load_test"] = {"error": str(load_result)}
+        else:
+            data, load_time = load_result
             perf_results["data_load_1000_points"] = {
                 "time_seconds": round(load_time, 3),
                 "points_loaded": len(data),
                 "performance": "good" if load_time < 1.0 else "needs_optimization"
             }
-        except Exception as e:
-            perf_results["data_load_test"] = {"error": str(e)}
         
-        # Test: Consulta espacial
-        try:
-            start_time = time.time()
-            test_city = list(SUPPORTED_CITIES.keys())[0]
-            bbox = SUPPORTED_CITIES[test_city]["bbox"]
-            # Consulta en un área pequeña
-            small_bbox = [
-                bbox[0], bbox[1], 
-                bbox[0] + (bbox[2] - bbox[0]) * 0.1,
-                bbox[1] + (bbox[3] - bbox[1]) * 0.1
-            ]
-            
-            data = await self.storage.load_city_data(test_city, bbox=small_bbox)
-            spatial_time = time.time() - start_time
-            
+        if isinstance(spatial_result, Exception):
+            perf_results["spatial_query"] = {"error": str(spatial_result)}
+        else:
+            data, spatial_time = spatial_result
             perf_results["spatial_query"] = {
                 "time_seconds": round(spatial_time, 3),
                 "points_found": len(data),
                 "performance": "good" if spatial_time < 0.5 else "needs_optimization"
             }
-        except Exception as e:
-            perf_results["spatial_query"] = {"error": str(e)}
         
         return perf_results
     
@@ -449,7 +507,7 @@ class MultiCitySetup:
                     "max_connections": self.storage.config.max_connections,
                     "cache_ttl": self.storage.config.cache_ttl
                 },
-                "supported_cities": list(SUPPORTED_CITIES.keys()),
+                "supported_cities": list(CITY_IDS),
                 "api_endpoints": [
                     "/api/v2/cities",
                     "/api/v2/cities/{city_id}/data", 
@@ -465,8 +523,7 @@ class MultiCitySetup:
         
         # Guardar reporte
         report_file = Path("data/multi_city_setup_report.json")
-        with open(report_file, 'w') as f:
-            json.dump(report, f, indent=2, default=str)
+        report_file.write_bytes(_json_bytes(report))
         
         logger.info(f"📋 Reporte guardado en: {report_file}")
         
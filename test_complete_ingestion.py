@@ -7,15 +7,53 @@ import pandas as pd
 from pathlib import Path
 import sys
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from numcodecs import Blosc
 
 # Agregar el directorio padre al path
 sys.path.append(str(Path(__file__).parent))
 
 from etl.utils import DATA_DIR, BBOX_LA, ensure_data_dirs, log_info, log_success, log_error
 
-def create_mock_tempo_data() -> str:
+# Los stores simulados más recientes que esto se reutilizan (salvo force=True)
+MOCK_TTL_SECONDS = 3600
+
+def fresh_mock_store(output_path: Path) -> bool:
+    """True si el store Zarr existe, tiene menos de MOCK_TTL_SECONDS y se puede abrir."""
+    if not output_path.exists():
+        return False
+    age = datetime.now().timestamp() - output_path.stat().st_mtime
+    if age >= MOCK_TTL_SECONDS:
+        return False
+    try:
+        xr.open_zarr(output_path, consolidated=True).close()
+    except Exception:
+        return False
+    return True
+
+def write_mock_zarr(ds: xr.Dataset, output_path: Path) -> None:
+    """
+    Guarda un dataset simulado en Zarr: floats en float32, un chunk por variable
+    (las grillas simuladas son pequeñas) y compresión Blosc/Zstd. Los metadatos
+    se consolidan en .zmetadata para que abrir el store sea una sola lectura.
+    """
+    ds = ds.astype({name: np.float32 for name, da in ds.data_vars.items() if da.dtype.kind == "f"})
+    encoding = {
+        name: {
+            "chunks": da.shape,
+            "compressor": Blosc(cname="zstd", clevel=3, shuffle=Blosc.SHUFFLE)
+        }
+        for name, da in ds.data_vars.items()
+    }
+    ds.to_zarr(output_path, mode='w', encoding=encoding, consolidated=True)
+
+def create_mock_tempo_data(force: bool = False) -> str:
     """Crear datos simulados de TEMPO NO₂ para pruebas."""
     ensure_data_dirs()
+    output_path = DATA_DIR / "tempo_no2.zarr"
+    if not force and fresh_mock_store(output_path):
+        log_info(f"♻️ Reutilizando TEMPO simulado reciente: {output_path}")
+        return str(output_path)
     
     log_info("🛰️ Creando datos simulados TEMPO NO₂...")
     
@@ -28,8 +66,8 @@ def create_mock_tempo_data() -> str:
     time = pd.date_range('2025-10-05', periods=1, freq='H')
     
     # Simular valores NO₂ (columna troposférica en molec/cm²)
-    np.random.seed(42)  # Para reproducibilidad
-    no2_values = np.random.uniform(1e15, 5e15, (len(time), len(lats), len(lons)))
+    rng = np.random.RandomState(42)  # Para reproducibilidad (propio de este builder)
+    no2_values = rng.uniform(1e15, 5e15, (len(time), len(lats), len(lons)))
     
     # Crear dataset
     ds = xr.Dataset({
@@ -48,15 +86,18 @@ def create_mock_tempo_data() -> str:
         'created': str(datetime.now())
     })
     
-    output_path = DATA_DIR / "tempo_no2.zarr"
-    ds.to_zarr(output_path, mode='w')
+    write_mock_zarr(ds, output_path)
     
     log_success(f"✅ TEMPO simulado guardado: {output_path}")
     return str(output_path)
 
-def create_mock_imerg_data() -> str:
+def create_mock_imerg_data(force: bool = False) -> str:
     """Crear datos simulados de IMERG precipitación."""
     ensure_data_dirs()
+    output_path = DATA_DIR / "imerg_precip.zarr"
+    if not force and fresh_mock_store(output_path):
+        log_info(f"♻️ Reutilizando IMERG simulado reciente: {output_path}")
+        return str(output_path)
     
     log_info("🌧️ Creando datos simulados IMERG precipitación...")
     
@@ -68,9 +109,11 @@ def create_mock_imerg_data() -> str:
     time = pd.date_range('2025-10-05', periods=24, freq='H')
     
     # Simular precipitación (mm/hr)
-    np.random.seed(123)
-    precip_values = np.random.exponential(0.5, (len(time), len(lats), len(lons)))
-    precip_values[precip_values > 10] = 0  # La mayoría del tiempo no llueve
+    # Exponencial(0.5) muestreada directamente en float32 y escalada in-place
+    rng = np.random.default_rng(123)
+    precip_values = rng.standard_exponential((len(time), len(lats), len(lons)), dtype=np.float32)
+    precip_values *= 0.5
+    np.copyto(precip_values, 0, where=precip_values > 10)  # La mayoría del tiempo no llueve
     
     # Crear dataset
     ds = xr.Dataset({
@@ -87,15 +130,18 @@ def create_mock_imerg_data() -> str:
         'units': 'mm/hr'
     })
     
-    output_path = DATA_DIR / "imerg_precip.zarr"
-    ds.to_zarr(output_path, mode='w')
+    write_mock_zarr(ds, output_path)
     
     log_success(f"✅ IMERG simulado guardado: {output_path}")
     return str(output_path)
 
-def create_mock_merra2_data() -> str:
+def create_mock_merra2_data(force: bool = False) -> str:
     """Crear datos simulados de MERRA-2 temperatura y viento."""
     ensure_data_dirs()
+    output_path = DATA_DIR / "merra2_temp.zarr"
+    if not force and fresh_mock_store(output_path):
+        log_info(f"♻️ Reutilizando MERRA-2 simulado reciente: {output_path}")
+        return str(output_path)
     
     log_info("🌡️ Creando datos simulados MERRA-2 temperatura/viento...")
     
@@ -106,10 +152,10 @@ def create_mock_merra2_data() -> str:
     time = pd.date_range('2025-10-05', periods=24, freq='H')
     
     # Simular datos meteorológicos
-    np.random.seed(456)
-    temp_values = np.random.normal(20, 5, (len(time), len(lats), len(lons))) + 273.15  # Kelvin
-    u_wind = np.random.normal(2, 3, (len(time), len(lats), len(lons)))  # m/s
-    v_wind = np.random.normal(1, 2, (len(time), len(lats), len(lons)))  # m/s
+    rng = np.random.RandomState(456)
+    temp_values = rng.normal(20, 5, (len(time), len(lats), len(lons))) + 273.15  # Kelvin
+    u_wind = rng.normal(2, 3, (len(time), len(lats), len(lons)))  # m/s
+    v_wind = rng.normal(1, 2, (len(time), len(lats), len(lons)))  # m/s
     
     # Crear dataset
     ds = xr.Dataset({
@@ -127,51 +173,55 @@ def create_mock_merra2_data() -> str:
         'source': 'Mock data for testing'
     })
     
-    output_path = DATA_DIR / "merra2_temp.zarr"
-    ds.to_zarr(output_path, mode='w')
+    write_mock_zarr(ds, output_path)
     
     log_success(f"✅ MERRA-2 simulado guardado: {output_path}")
     return str(output_path)
 
-def run_complete_ingestion_with_mocks():
-    """Ejecutar ingesta completa usando datos simulados cuando sea necesario."""
-    log_info("🚀 Iniciando ingesta CleanSky Los Ángeles con datos simulados...")
-    
-    results = {}
+def run_complete_ingestion_with_mocks(force: bool = False):
+    """
+    Ejecutar ingesta completa usando datos simulados cuando sea necesario.
     
-    # 1. TEMPO (simulado)
-    try:
-        tempo_path = create_mock_tempo_data()
-        results['tempo'] = tempo_path
-    except Exception as e:
-        log_error(f"Error TEMPO simulado: {e}")
-        results['tempo'] = None
-    
-    # 2. OpenAQ (real - ya funciona)
-    try:
-        from etl.ingest_openaq import fetch_latest_openaq
-        log_info("🌫️ Ejecutando OpenAQ real...")
-        openaq_path = fetch_latest_openaq()
-        results['openaq'] = openaq_path
-    except Exception as e:
-        log_error(f"Error OpenAQ: {e}")
-        results['openaq'] = None
-    
-    # 3. IMERG (simulado)
-    try:
-        imerg_path = create_mock_imerg_data()
-        results['imerg'] = imerg_path
-    except Exception as e:
-        log_error(f"Error IMERG simulado: {e}")
-        results['imerg'] = None
+    Args:
+        force: Regenerar los stores simulados aunque existan y sean recientes
+    """
+    log_info("🚀 Iniciando ingesta CleanSky Los Ángeles con datos simulados...")
     
-    # 4. MERRA-2 (simulado)
-    try:
-        merra2_path = create_mock_merra2_data()
-        results['merra2'] = merra2_path
-    except Exception as e:
-        log_error(f"Error MERRA-2 simulado: {e}")
-        results['merra2'] = None
+    # Los tres simulados son independientes (NumPy + escritura Zarr): se generan
+    # en hilos mientras OpenAQ descarga datos reales
+    mock_builders = {
+        'tempo': ("TEMPO simulado", create_mock_tempo_data),
+        'imerg': ("IMERG simulado", create_mock_imerg_data),
+        'merra2': ("MERRA-2 simulado", create_mock_merra2_data),
+    }
+    
+    with ThreadPoolExecutor(max_workers=len(mock_builders)) as executor:
+        futures = {name: executor.submit(builder, force) for name, (_, builder) in mock_builders.items()}
+        
+        # 1. OpenAQ (real - ya funciona)
+        try:
+            from etl.ingest_openaq import fetch_latest_openaq
+            log_info("🌫️ Ejecutando OpenAQ real...")
+            openaq_path = fetch_latest_openaq()
+        except Exception as e:
+            log_error(f"Error OpenAQ: {e}")
+            openaq_path = None
+        
+        # 2. TEMPO, IMERG y MERRA-2 (simulados)
+        mock_paths = {}
+        for name, future in futures.items():
+            try:
+                mock_paths[name] = future.result()
+            except Exception as e:
+                log_error(f"Error {mock_builders[name][0]}: {e}")
+                mock_paths[name] = None
+    
+    results = {
+        'tempo': mock_paths['tempo'],
+        'openaq': openaq_path,
+        'imerg': mock_paths['imerg'],
+        'merra2': mock_paths['merra2'],
+    }
     
     # Resumen final
     successful = sum(1 for r in results.values() if r)
@@ -193,5 +243,12 @@ def run_complete_ingestion_with_mocks():
         return False
 
 if __name__ == "__main__":
-    success = run_complete_ingestion_with_mocks()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Ingesta completa con datos simulados')
+    parser.add_argument('--force', action='store_true',
+                        help='Regenerar los datos simulados aunque existan y sean recientes')
+    args = parser.parse_args()
+    
+    success = run_complete_ingestion_with_mocks(force=args.force)
     sys.exit(0 if success else 1)
\ No newline at end of file
@@ -6,20 +6,82 @@ Muestra estadísticas de los datos generados y abre el dashboard
 
 import asyncio
 import aiohttp
+import functools
+import hashlib
+import heapq
 import json
+import numpy as np
+import os
+from collections import Counter
 from datetime import datetime
+from itertools import islice
 import webbrowser
-import time
 import subprocess
 import sys
+import time
 from pathlib import Path
+from typing import List
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import uvloop  # incluido en uvicorn[standard] (no disponible en Windows)
+except ImportError:
+    uvloop = None
+
+def _json_loads(body: bytes):
+    """Decodifica JSON desde bytes (orjson si está instalado, sin pasar por str)"""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+@functools.lru_cache(maxsize=4)
+def _load_report(path: str, mtime_ns: int) -> dict:
+    """Lee y parsea el reporte; la caché se invalida cuando cambia su mtime"""
+    return _json_loads(Path(path).read_bytes())
+
+# Default compartido para features sin "properties" (evita crear un dict por feature)
+_EMPTY = {}
 
 class DashboardTester:
     """Tester para el dashboard con datos generados"""
     
-    def __init__(self, base_url: str = "http://127.0.0.1:8000"):
+    def __init__(self, base_url: str = "http://127.0.0.1:8000", pool_size: int = None,
+                 reload: bool = False, verbose: bool = False):
         self.base_url = base_url
+        # Análisis detallado del payload (muestra de AQI, top de ciudades) sólo con --verbose
+        self.verbose = verbose
+        # --reload de uvicorn sólo bajo demanda (añade un proceso supervisor y un watcher)
+        self.reload = reload
         self.backend_dir = Path(__file__).parent
+        # Conexiones simultáneas del pool (env CLEANSKY_POOL, por defecto 64)
+        self.pool_size = pool_size or int(os.getenv("CLEANSKY_POOL", "64"))
+        # Caché local de /api/dashboard/all-data (cuerpo + ETag para GET condicional)
+        self.cache_dir = Path.home() / ".cache" / "cleansky"
+        self._session = None
+    
+    async def __aenter__(self):
+        """Una sola sesión HTTP (keep-alive) para todas las peticiones del tester"""
+        # Todas las peticiones van al mismo host: limit_per_host es el límite efectivo
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            limit_per_host=min(32, self.pool_size),
+            keepalive_timeout=30,
+            ttl_dns_cache=300,
+            enable_cleanup_closed=True
+        )
+        # base_url se parsea una sola vez; las peticiones usan rutas relativas
+        self._session = aiohttp.ClientSession(base_url=self.base_url,
+                                              connector=connector,
+                                              timeout=aiohttp.ClientTimeout(total=10))
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._session.close()
+        self._session = None
     
     async def test_api_endpoints(self):
         """Prueba todos los endpoints importantes"""
@@ -34,120 +96,176 @@ class DashboardTester:
             "cities": "/api/cities"
         }
         
-        async with aiohttp.ClientSession() as session:
-            for name, endpoint in endpoints.items():
-                try:
-                    url = f"{self.base_url}{endpoint}"
-                    async with session.get(url) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            print(f"  ✅ {name}: {response.status}")
-                            
-                            # Mostrar datos específicos
-                            if name == "dashboard_all":
-                                await self.analyze_dashboard_data(data)
-                            elif name == "cities":
-                                cities_count = len(data.get("cities", []))
-                                print(f"     📊 {cities_count} ciudades disponibles")
-                        else:
-                            print(f"  ❌ {name}: {response.status}")
-                            
-                except Exception as e:
-                    print(f"  🔥 {name}: Error - {str(e)}")
+        # Sólo se inspecciona el contenido de estos; del resto basta el status
+        inspected = {"dashboard_all", "cities"}
+        
+        # Todas las peticiones a la vez: el tiempo total es el de la más lenta
+        results = await asyncio.gather(
+            *(self._fetch_dashboard_all(name, endpoint) if name == "dashboard_all"
+              else self._fetch(name, endpoint, decode=name in inspected)
+              for name, endpoint in endpoints.items()),
+            return_exceptions=True
+        )
+        
+        # Una sola escritura en stdout para todo el bloque de resultados
+        lines = []
+        for name, result in zip(endpoints, results):
+            if isinstance(result, Exception):
+                lines.append(f"  🔥 {name}: Error - {str(result)}")
+                continue
+            
+            _, status, data = result
+            if status != 200:
+                lines.append(f"  ❌ {name}: {status}")
+                continue
+            
+            lines.append(f"  ✅ {name}: {status}")
+            
+            # Mostrar datos específicos
+            if name == "dashboard_all":
+                lines.extend(await self.analyze_dashboard_data(data))
+            elif name == "cities":
+                cities_count = len(data.get("cities", []))
+                lines.append(f"     📊 {cities_count} ciudades disponibles")
+        
+        sys.stdout.write("\n".join(lines) + "\n")
     
-    async def analyze_dashboard_data(self, data):
-        """Analiza los datos del dashboard"""
+    async def _fetch(self, name: str, endpoint: str, decode: bool = True):
+        """GET de un endpoint: (nombre, status, JSON o None si no es 200 o no se decodifica)"""
+        async with self._session.get(endpoint) as response:
+            # Leer siempre el cuerpo para que la conexión vuelva al pool
+            body = await response.read()
+            data = _json_loads(body) if decode and response.status == 200 else None
+            return name, response.status, data
+    
+    async def _fetch_dashboard_all(self, name: str, endpoint: str):
+        """GET condicional de all-data: con 304 se reutiliza el cuerpo guardado en disco"""
+        url = f"{self.base_url}{endpoint}"
+        cache_file = self.cache_dir / f"all_data_{hashlib.sha1(url.encode()).hexdigest()}.json"
+        etag_file = self.cache_dir / "etag.json"
+        
+        etags = _json_loads(etag_file.read_bytes()) if etag_file.exists() else {}
+        headers = {}
+        if url in etags and cache_file.exists():
+            headers["If-None-Match"] = etags[url]
         
-        print("    📊 Análisis de datos del dashboard:")
+        async with self._session.get(endpoint, headers=headers) as response:
+            if response.status == 304:
+                return name, 200, _json_loads(cache_file.read_bytes())
+            if response.status != 200:
+                return name, response.status, None
+            body = await response.read()
+            etag = response.headers.get("ETag")
+        
+        if etag:
+            await asyncio.to_thread(self._write_cache, url, etag, cache_file, body)
+        return name, 200, _json_loads(body)
+    
+    def _write_cache(self, url: str, etag: str, cache_file: Path, body: bytes):
+        """Guarda el cuerpo de la respuesta y su ETag (etag.json, indexado por URL)"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        etag_file = self.cache_dir / "etag.json"
+        etags = _json_loads(etag_file.read_bytes()) if etag_file.exists() else {}
+        etags[url] = etag
+        cache_file.write_bytes(body)
+        etag_file.write_text(json.dumps(etags, indent=2))
+    
+    async def analyze_dashboard_data(self, data) -> List[str]:
+        """Analiza los datos del dashboard (devuelve las líneas a mostrar)"""
+        
+        lines = ["    📊 Análisis de datos del dashboard:"]
         
         # Metadata
         metadata = data.get("metadata", {})
-        print(f"     📅 Última actualización: {metadata.get('last_update', 'N/A')}")
-        print(f"     🏙️  Total ciudades: {metadata.get('total_cities', 0)}")
+        lines.append(f"     📅 Última actualización: {metadata.get('last_update', 'N/A')}")
+        lines.append(f"     🏙️  Total ciudades: {metadata.get('total_cities', 0)}")
         
         # Status de ciudades
         cities_status = data.get("cities_status", {})
-        success_cities = sum(1 for status in cities_status.values() if status == "success")
-        print(f"     ✅ Ciudades con datos: {success_cities}/{len(cities_status)}")
+        success_cities = Counter(cities_status.values())["success"]
+        lines.append(f"     ✅ Ciudades con datos: {success_cities}/{len(cities_status)}")
         
         # Datos del mapa
         map_data = data.get("map_data", {})
         features = map_data.get("features", [])
-        print(f"     📍 Puntos en el mapa: {len(features):,}")
-        
-        if features:
-            # Analizar distribución de AQI
-            aqi_values = []
-            for feature in features[:1000]:  # Sample de 1000 puntos
-                props = feature.get("properties", {})
-                if "aqi" in props:
-                    aqi_values.append(props["aqi"])
+        lines.append(f"     📍 Puntos en el mapa: {len(features):,}")
+        
+        if features and self.verbose:
+            # Analizar distribución de AQI (sample de 1000 puntos)
+            aqi_values = np.fromiter(
+                (aqi for aqi in (feature.get("properties", _EMPTY).get("aqi")
+                                 for feature in islice(features, 1000))
+                 if aqi is not None),
+                dtype=float
+            )
             
-            if aqi_values:
-                avg_aqi = sum(aqi_values) / len(aqi_values)
-                max_aqi = max(aqi_values)
-                min_aqi = min(aqi_values)
-                print(f"     🎯 AQI promedio: {avg_aqi:.1f}")
-                print(f"     📈 AQI rango: {min_aqi:.1f} - {max_aqi:.1f}")
+            if aqi_values.size:
+                avg_aqi = float(aqi_values.mean())
+                max_aqi = float(aqi_values.max())
+                min_aqi = float(aqi_values.min())
+                lines.append(f"     🎯 AQI promedio: {avg_aqi:.1f}")
+                lines.append(f"     📈 AQI rango: {min_aqi:.1f} - {max_aqi:.1f}")
         
         # Datos tabulares
         tabular_data = data.get("tabular_data", [])
-        print(f"     📋 Filas en tabla: {len(tabular_data):,}")
+        lines.append(f"     📋 Filas en tabla: {len(tabular_data):,}")
         
         # Resumen por ciudad
         city_summaries = data.get("city_summaries", {})
         if city_summaries:
-            print(f"     🌆 Resúmenes de ciudad: {len(city_summaries)}")
-            
-            # Mostrar top 3 ciudades por AQI
-            city_aqis = []
-            for city_id, summary in city_summaries.items():
-                aqi = summary.get("average_aqi", 0)
-                city_name = summary.get("name", city_id)
-                city_aqis.append((city_name, aqi))
-            
-            city_aqis.sort(key=lambda x: x[1], reverse=True)
+            lines.append(f"     🌆 Resúmenes de ciudad: {len(city_summaries)}")
             
-            print("     🔝 Top 3 ciudades con mayor AQI:")
-            for i, (city, aqi) in enumerate(city_aqis[:3], 1):
-                print(f"        {i}. {city}: {aqi:.1f}")
+            if self.verbose:
+                # Mostrar top 3 ciudades por AQI (selección parcial, sin lista intermedia)
+                top = heapq.nlargest(3, city_summaries.items(),
+                                     key=lambda item: item[1].get("average_aqi", 0))
+                
+                lines.append("     🔝 Top 3 ciudades con mayor AQI:")
+                for i, (city_id, summary) in enumerate(top, 1):
+                    lines.append(f"        {i}. {summary.get('name', city_id)}: {summary.get('average_aqi', 0):.1f}")
+        
+        return lines
     
-    def check_server_status(self):
+    async def check_server_status(self):
         """Verifica si el servidor está corriendo"""
         
         try:
-            import requests
-            response = requests.get(f"{self.base_url}/health", timeout=5)
-            return response.status_code == 200
-        except:
+            async with self._session.get("/health",
+                                         timeout=aiohttp.ClientTimeout(total=1)) as response:
+                return response.status == 200
+        except (aiohttp.ClientError, asyncio.TimeoutError):
             return False
     
-    def start_server_if_needed(self):
+    async def start_server_if_needed(self):
         """Inicia el servidor si no está corriendo"""
         
-        if not self.check_server_status():
+        if not await self.check_server_status():
             print("🚀 Iniciando servidor...")
             
             # Cambiar al directorio del backend
-            import os
             os.chdir(self.backend_dir)
             
-            # Iniciar uvicorn en background
-            subprocess.Popen([
+            # Iniciar uvicorn en background, en su propia sesión (sobrevive a Ctrl+C del tester)
+            command = [
                 "uvicorn", "main:app", 
                 "--host", "127.0.0.1", 
-                "--port", "8000",
-                "--reload"
-            ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                "--port", "8000"
+            ]
+            if self.reload:
+                command.append("--reload")
+            subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                             start_new_session=True)
             
-            # Esperar que inicie
+            # Esperar que inicie (backoff exponencial de 50 ms a 500 ms, hasta 15 s)
             print("⏳ Esperando que el servidor inicie...")
-            for i in range(10):
-                time.sleep(1)
-                if self.check_server_status():
+            delay = 0.05
+            deadline = time.monotonic() + 15
+            while time.monotonic() < deadline:
+                await asyncio.sleep(delay)
+                if await self.check_server_status():
                     print("✅ Servidor iniciado correctamente")
                     return True
-                print(f"   Esperando... {i+1}/10")
+                delay = min(delay * 1.6, 0.5)
             
             print("❌ Error: No se pudo iniciar el servidor")
             return False
@@ -176,15 +294,15 @@ class DashboardTester:
         except:
             print("⚠️ No se pudo abrir el navegador automáticamente")
     
-    def show_data_summary(self):
+    async def show_data_summary(self):
         """Muestra resumen de los datos generados"""
         
-        # Leer el reporte de datos generados
+        # Leer el reporte de datos generados (en un hilo, sin bloquear el event loop)
         report_file = self.backend_dir / "data" / "multi_city_processed" / "dashboard_sample_data_report.json"
         
         if report_file.exists():
-            with open(report_file, 'r') as f:
-                report = json.load(f)
+            report = await asyncio.to_thread(_load_report, str(report_file),
+                                             report_file.stat().st_mtime_ns)
             
             print("📊 Resumen de datos generados:")
             
@@ -209,25 +327,25 @@ async def main():
     print("🎯 CleanSky Dashboard Tester")
     print("=" * 50)
     
-    tester = DashboardTester()
-    
-    # 1. Mostrar resumen de datos
-    tester.show_data_summary()
-    print()
-    
-    # 2. Verificar/iniciar servidor
-    if not tester.start_server_if_needed():
-        print("❌ No se pudo iniciar el servidor. Terminando...")
-        return
-    print()
-    
-    # 3. Probar endpoints
-    await tester.test_api_endpoints()
-    print()
-    
-    # 4. Mostrar URLs
-    tester.open_dashboard_urls()
-    print()
+    args = sys.argv[1:]
+    async with DashboardTester(reload="--reload" in args, verbose="--verbose" in args) as tester:
+        # 1-2. Resumen de datos y verificar/iniciar servidor, solapando lectura y arranque
+        report_task = asyncio.create_task(tester.show_data_summary())
+        server_ok = await tester.start_server_if_needed()
+        await report_task
+        
+        if not server_ok:
+            print("❌ No se pudo iniciar el servidor. Terminando...")
+            return
+        print()
+        
+        # 3. Probar endpoints
+        await tester.test_api_endpoints()
+        print()
+        
+        # 4. Mostrar URLs
+        tester.open_dashboard_urls()
+        print()
     
     print("🎉 Testing completado!")
     print()
@@ -239,4 +357,7 @@ async def main():
     print("🚀 Tu dashboard puede conectarse a estos endpoints!")
 
 if __name__ == "__main__":
+    # Event loop de libuv si está instalado; si no, el de asyncio
+    if uvloop is not None:
+        uvloop.install()
     asyncio.run(main())
\ No newline at end of file